@@ -6,7 +6,7 @@ from rest_framework.authentication import BasicAuthentication
 from rest_framework import exceptions
 
 from framework.auth import cas
-from framework.sessions.model import Session
+from framework.sessions import store
 from framework.auth.core import User, get_user
 from website import settings
 
@@ -14,7 +14,7 @@ from website import settings
 def get_session_from_cookie(cookie_val):
     """Given a cookie value, return the `Session` object or `None`."""
     session_id = itsdangerous.Signer(settings.SECRET_KEY).unsign(cookie_val)
-    return Session.load(session_id)
+    return store.load(session_id)
 
 # http://www.django-rest-framework.org/api-guide/authentication/#custom-authentication
 class OSFSessionAuthentication(authentication.BaseAuthentication):
@@ -1,7 +1,9 @@
 from pymongo.errors import OperationFailure
 from raven.contrib.django.raven_compat.models import sentry_exception_handler
 
+from framework.mongo.handlers import client_pool
 from framework.transactions import commands, messages, utils
+from website import settings
 
 from .api_globals import api_globals
 
@@ -12,7 +14,11 @@ class TokuTransactionsMiddleware(object):
     """TokuMX transaction middleware."""
 
     def process_request(self, request):
-        """Begin a transaction if one doesn't already exist."""
+        """Check out a pooled connection if pooling is enabled, then begin a
+        transaction if one doesn't already exist.
+        """
+        if settings.DB_POOL:
+            client_pool.checkout()
         try:
             commands.begin()
         except OperationFailure as err:
@@ -1,14 +1,24 @@
 #!/usr/bin/env python
 # encoding: utf-8
 
+import time
+import atexit
+import logging
 import functools
+import threading
 from datetime import datetime
+from collections import OrderedDict
 
 from framework.mongo import database
 from framework.sessions import session
+from framework.analytics.visited import VisitedPages
 
 from flask import request
 
+from website import settings
+
+
+logger = logging.getLogger(__name__)
 
 collection = database['pagecounters']
 
@@ -72,49 +82,157 @@ def build_page(rex, kwargs):
         return None
 
 
-def update_counter(page, db=None):
-    """Update counters for page.
+class CounterBuffer(object):
+    """In-process buffer of `pagecounters` increments.
 
-    :param str page: Colon-delimited page key in analytics collection
+    Increments to the same page are merged, so a burst of downloads of one
+    file costs a single write when the buffer is flushed. Counts still in the
+    buffer are lost if the process dies, which is acceptable for analytics.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.increments = {}
+        self.started = None
+
+    def add(self, page, increments):
+        """Buffer increments for a page.
+
+        :return: `True` if the buffer is due to be flushed
+        """
+        with self.lock:
+            if self.started is None:
+                self.started = time.time()
+            counters = self.increments.setdefault(page, {})
+            for key, value in increments.iteritems():
+                counters[key] = counters.get(key, 0) + value
+            return (
+                len(self.increments) >= settings.ANALYTICS_FLUSH_SIZE or
+                time.time() - self.started >= settings.ANALYTICS_FLUSH_INTERVAL
+            )
+
+    def drain(self):
+        """Remove and return all buffered increments, keyed by page."""
+        with self.lock:
+            increments, self.increments = self.increments, {}
+            self.started = None
+            return increments
+
+
+counter_buffer = CounterBuffer()
+
+
+def write_counters(increments, db=None):
+    """Apply increments to `pagecounters`.
+
+    :param dict increments: Dicts of counter increments keyed by page
     :param db: MongoDB database or `None`
     """
     db = db or database
     collection = db['pagecounters']
+    for page, counters in increments.iteritems():
+        collection.update({'_id': page}, {'$inc': counters}, True, False)
+    counter_cache.delete_many(increments.keys())
+
+
+def flush_counters():
+    """Write buffered increments from a task. Increments that could not be
+    handed off are put back in the buffer for the next flush.
+    """
+    # Avoid circular imports
+    from framework.analytics import tasks
+    increments = counter_buffer.drain()
+    if not increments:
+        return
+    try:
+        if settings.USE_CELERY:
+            tasks.write_counters.delay(increments)
+        else:
+            tasks.write_counters(increments)
+    except Exception as error:
+        logger.error('Could not flush page counters: {0}'.format(error))
+        for page, counters in increments.iteritems():
+            counter_buffer.add(page, counters)
+
+
+atexit.register(flush_counters)
+
+
+class CounterFlusher(object):
+    """Daemon thread that flushes `counter_buffer` every
+    ``ANALYTICS_FLUSH_INTERVAL`` seconds, or sooner when woken because the
+    buffer is due. Flushing from this thread keeps the writes out of the
+    transaction and task queue of whichever request filled the buffer, and
+    flushes the counts of processes that stop receiving requests.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.event = threading.Event()
+        self.thread = None
+
+    def start(self):
+        """Start the thread unless it is running, e.g. in a forked worker."""
+        with self.lock:
+            if self.thread is not None and self.thread.is_alive():
+                return
+            self.thread = threading.Thread(target=self.run)
+            self.thread.daemon = True
+            self.thread.start()
+
+    def wake(self):
+        self.start()
+        self.event.set()
+
+    def run(self):
+        while True:
+            self.event.wait(settings.ANALYTICS_FLUSH_INTERVAL)
+            self.event.clear()
+            try:
+                flush_counters()
+            except Exception as error:
+                logger.exception(error)
 
+
+counter_flusher = CounterFlusher()
+
+
+def update_counter(page, db=None):
+    """Update counters for page.
+
+    :param str page: Colon-delimited page key in analytics collection
+    :param db: MongoDB database or `None`
+    """
     date = datetime.utcnow()
     date = date.strftime('%Y/%m/%d')
 
     page = clean_page(page)
 
-    d = {'$inc': {}}
+    increments = {
+        'total': 1,
+        'date.%s.total' % date: 1,
+    }
 
     visited_by_date = session.data.get('visited_by_date')
-    if not visited_by_date:
-        visited_by_date = {'date': date, 'pages': []}
-
-    if date == visited_by_date['date']:
-        if page not in visited_by_date['pages']:
-            d['$inc']['date.%s.unique' % date] = 1
-            visited_by_date['pages'].append(page)
-            session.data['visited_by_date'] = visited_by_date
-    else:
-        visited_by_date['date'] = date
-        visited_by_date['pages'] = []
-        d['$inc']['date.%s.unique' % date] = 1
-        visited_by_date['pages'].append(page)
-        session.data['visited_by_date'] = visited_by_date
+    if not visited_by_date or visited_by_date['date'] != date:
+        visited_by_date = {'date': date, 'pages': None}
+    visited_today = VisitedPages.load(visited_by_date['pages'])
+    if visited_today.add(page):
+        increments['date.%s.unique' % date] = 1
+        session.data['visited_by_date'] = {'date': date, 'pages': visited_today.dump()}
 
-    d['$inc']['date.%s.total' % date] = 1
+    visited = VisitedPages.load(session.data.get('visited'))
+    if visited.add(page):
+        increments['unique'] = 1
+        session.data['visited'] = visited.dump()
 
-    visited = session.data.get('visited')  # '/project/x/, project/y/'
-    if not visited:
-        visited = []
-    if page not in visited:
-        d['$inc']['unique'] = 1
-        visited.append(page)
-        session.data['visited'] = visited
-    d['$inc']['total'] = 1
-    collection.update({'_id': page}, d, True, False)
+    if settings.ANALYTICS_BUFFER_COUNTERS:
+        if counter_buffer.add(page, increments):
+            counter_flusher.wake()
+        else:
+            counter_flusher.start()
+    else:
+        write_counters({page: increments}, db=db)
 
 
 def update_counters(rex, db=None):
@@ -154,3 +272,78 @@ def get_basic_counters(page, db=None):
         return unique, total
     else:
         return None, None
+
+
+class CounterCache(object):
+    """In-process cache of recently read page counters, evicting the least
+    recently stored when full. Entries for pages whose counters are written
+    by this process are dropped; increments written by other processes are
+    seen once entries expire.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()
+
+    def get_many(self, pages, ttl):
+        """Return cached counters no older than ``ttl`` seconds, keyed by
+        page.
+        """
+        now = time.time()
+        ret = {}
+        with self.lock:
+            for page in pages:
+                entry = self.entries.get(page)
+                if entry is not None and now - entry[0] <= ttl:
+                    ret[page] = entry[1]
+        return ret
+
+    def set_many(self, counters, size):
+        now = time.time()
+        with self.lock:
+            for page, value in counters.iteritems():
+                self.entries.pop(page, None)
+                self.entries[page] = (now, value)
+            while len(self.entries) > size:
+                self.entries.popitem(last=False)
+
+    def delete_many(self, pages):
+        with self.lock:
+            for page in pages:
+                self.entries.pop(page, None)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+
+counter_cache = CounterCache()
+
+
+def get_basic_counters_many(pages, db=None):
+    """Get counters of many pages with a single query. Counters read in the
+    last ``ANALYTICS_COUNTER_CACHE_TTL`` seconds may be served from an
+    in-process cache.
+
+    :param list pages: Colon-delimited page keys in analytics collection
+    :param db: MongoDB database or `None`
+    :return dict: Tuples of (unique, total) keyed by page; (None, None) for
+        pages without counters
+    """
+    db = db or database
+    keys = dict((page, clean_page(page)) for page in pages)
+    ttl = settings.ANALYTICS_COUNTER_CACHE_TTL
+    counters = counter_cache.get_many(set(keys.values()), ttl) if ttl else {}
+    missing = list(set(keys.values()) - set(counters))
+    if missing:
+        fetched = dict((key, (None, None)) for key in missing)
+        cursor = db['pagecounters'].find(
+            {'_id': {'$in': missing}},
+            {'total': 1, 'unique': 1},
+        )
+        for result in cursor:
+            fetched[result['_id']] = (result.get('unique', 0), result.get('total', 0))
+        if ttl:
+            counter_cache.set_many(fetched, settings.ANALYTICS_COUNTER_CACHE_SIZE)
+        counters.update(fetched)
+    return dict((page, counters[key]) for page, key in keys.iteritems())
@@ -30,3 +30,11 @@ def update_node(self, node_id, updated_fields=None):
         piwik._update_node_object(node, updated_fields)
     except Exception as error:
         raise self.retry(exc=error)
+
+
+@app.task(ignore_result=True)
+@transaction()
+def write_counters(increments):
+    # Avoid circular imports
+    from framework import analytics
+    analytics.write_counters(increments)
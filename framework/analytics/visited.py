@@ -0,0 +1,104 @@
+# -*- coding: utf-8 -*-
+"""Compact record of the pages a session has visited.
+
+Unique page counts used to keep every visited page key in the session, so
+session documents grew with every download. `VisitedPages` keeps the MD5
+digests of the pages instead, which is exact, until they would take as much
+room as a Bloom filter of ``ANALYTICS_VISITED_FILTER_BITS`` bits; it then
+switches to the filter. The filter may occasionally report an unvisited page
+as visited, undercounting unique visits slightly, but never the reverse.
+"""
+
+import base64
+import hashlib
+import struct
+
+from website import settings
+
+
+class VisitedPages(object):
+
+    HASHES = 4
+
+    # Marks dumps of the exact set of digests; base64 never contains ":"
+    EXACT_PREFIX = 'exact:'
+    DIGEST_SIZE = 16
+
+    def __init__(self, data=None, size=None):
+        self.size = size or settings.ANALYTICS_VISITED_FILTER_BITS
+        self.length = (self.size + 7) // 8
+        self.digests = set()
+        self.bits = None
+        if data and data.startswith(self.EXACT_PREFIX):
+            raw = base64.b64decode(data[len(self.EXACT_PREFIX):])
+            self.digests = set(
+                raw[start:start + self.DIGEST_SIZE]
+                for start in range(0, len(raw), self.DIGEST_SIZE)
+            )
+        elif data:
+            raw = base64.b64decode(data)
+            # Discard filters built with a different size
+            if len(raw) == self.length:
+                self.bits = bytearray(raw)
+
+    @classmethod
+    def load(cls, value):
+        """Load the pages from a session value, converting the lists of page
+        keys stored by older sessions.
+        """
+        if isinstance(value, list):
+            visited = cls()
+            for page in value:
+                visited.add(page)
+            return visited
+        return cls(value)
+
+    def dump(self):
+        if self.bits is None:
+            return self.EXACT_PREFIX + base64.b64encode(b''.join(sorted(self.digests)))
+        return base64.b64encode(bytes(self.bits))
+
+    def _digest(self, page):
+        if isinstance(page, unicode):
+            page = page.encode('utf-8')
+        return hashlib.md5(page).digest()
+
+    def _positions(self, digest):
+        for index in range(self.HASHES):
+            yield struct.unpack_from('>I', digest, index * 4)[0] % self.size
+
+    def _add_to_filter(self, digest):
+        added = False
+        for position in self._positions(digest):
+            mask = 1 << (position % 8)
+            if not self.bits[position // 8] & mask:
+                self.bits[position // 8] |= mask
+                added = True
+        return added
+
+    def __contains__(self, page):
+        digest = self._digest(page)
+        if self.bits is None:
+            return digest in self.digests
+        return all(
+            self.bits[position // 8] & (1 << (position % 8))
+            for position in self._positions(digest)
+        )
+
+    def add(self, page):
+        """Add a page.
+
+        :return: `True` if the page was not already visited
+        """
+        digest = self._digest(page)
+        if self.bits is None:
+            if digest in self.digests:
+                return False
+            if (len(self.digests) + 1) * self.DIGEST_SIZE < self.length:
+                self.digests.add(digest)
+                return True
+            self.bits = bytearray(self.length)
+            for each in self.digests:
+                self._add_to_filter(each)
+            self.digests = set()
+        return self._add_to_filter(digest)
@@ -2,10 +2,8 @@
 import re
 import logging
 import urlparse
-import itertools
 import datetime as dt
 
-import bson
 import pytz
 import itsdangerous
 
@@ -17,7 +15,8 @@ from modularodm.exceptions import ValidationError, ValidationValueError
 import framework
 from framework import analytics
 from framework.sessions import session
-from framework.auth import exceptions, utils, signals
+from framework.sessions import store as session_store
+from framework.auth import exceptions, utils, signals, watched_logs
 from framework.sentry import log_exception
 from framework.addons import AddonModelMixin
 from framework.sessions.model import Session
@@ -293,7 +292,7 @@ class User(GuidStoredObject, AddonModelMixin):
                                            index=True)
 
     # watched nodes are stored via a list of WatchConfigs
-    watched = fields.ForeignField("WatchConfig", list=True, backref="watched")
+    watched = fields.ForeignField("WatchConfig", list=True, backref="watched", index=True)
 
     # list of users recently added to nodes as a contributor
     recently_added = fields.ForeignField("user", list=True, backref="recently_added")
@@ -448,6 +447,17 @@ class User(GuidStoredObject, AddonModelMixin):
         """Attempt to load a user from their signed cookie
         :returns: None if a user cannot be loaded else User
         """
+        user_id = cls.user_id_from_cookie(cookie, secret=secret)
+        if user_id is None:
+            return None
+        return cls.load(user_id)
+
+    @staticmethod
+    def user_id_from_cookie(cookie, secret=None):
+        """Find the id of the user logged in to the session of a signed
+        cookie, without loading the user
+        :returns: None if the session is not found or not logged in
+        """
         if not cookie:
             return None
 
@@ -458,12 +468,12 @@ class User(GuidStoredObject, AddonModelMixin):
         except itsdangerous.BadSignature:
             return None
 
-        user_session = Session.load(token)
+        user_session = session_store.load(token)
 
         if user_session is None:
             return None
 
-        return cls.load(user_session.data.get('auth_user_id'))
+        return user_session.data.get('auth_user_id')
 
     def get_or_create_cookie(self, secret=None):
         """Find the cookie for the given user
@@ -473,24 +483,19 @@ class User(GuidStoredObject, AddonModelMixin):
         :returns: The signed cookie
         """
         secret = secret or settings.SECRET_KEY
-        sessions = Session.find(
-            Q('data.auth_user_id', 'eq', self._id)
-        ).sort(
-            '-date_modified'
-        ).limit(1)
-
-        if sessions.count() > 0:
-            user_session = sessions[0]
-        else:
+        session_id = session_store.find_user_session(self._id)
+
+        if session_id is None:
             user_session = Session(data={
                 'auth_user_id': self._id,
                 'auth_user_username': self.username,
                 'auth_user_fullname': self.fullname,
             })
-            user_session.save()
+            session_store.save(user_session)
+            session_id = user_session._id
 
         signer = itsdangerous.Signer(secret)
-        return signer.sign(user_session._id)
+        return signer.sign(session_id)
 
     def update_guessed_names(self):
         """Updates the CSL name fields inferred from the the full name.
@@ -996,8 +1001,11 @@ class User(GuidStoredObject, AddonModelMixin):
         # TODO: Update mailchimp subscription on username change
         # Avoid circular import
         from framework.analytics import tasks as piwik_tasks
+        from website.util import waterbutler_auth_cache
         self.username = self.username.lower().strip() if self.username else None
         ret = super(User, self).save(*args, **kwargs)
+        if waterbutler_auth_cache.USER_FIELDS.intersection(ret):
+            waterbutler_auth_cache.invalidate(user_id=self._id)
         if self.SEARCH_UPDATE_FIELDS.intersection(ret) and self.is_confirmed:
             self.update_search()
             self.update_search_nodes_contributors()
@@ -1047,6 +1055,7 @@ class User(GuidStoredObject, AddonModelMixin):
             raise ValueError('Node is already being watched.')
         watch_config.save()
         self.watched.append(watch_config)
+        watched_logs.add_node(self._id, watch_config.node)
         return None
 
     def unwatch(self, watch_config):
@@ -1060,6 +1069,7 @@ class User(GuidStoredObject, AddonModelMixin):
         for each in self.watched:
             if watch_config.node._id == each.node._id:
                 each.__class__.remove_one(each)
+                watched_logs.remove_node(self._id, watch_config.node._id)
                 return None
         raise ValueError('Node not being watched.')
 
@@ -1069,7 +1079,8 @@ class User(GuidStoredObject, AddonModelMixin):
         return node._id in watched_node_ids
 
     def get_recent_log_ids(self, since=None):
-        '''Return a generator of recent logs' ids.
+        '''Return a generator of recent logs' ids, newest first, read from the
+        user's watched-log timeline (see `framework.auth.watched_logs`).
 
         :param since: A datetime specifying the oldest time to retrieve logs
         from. If ``None``, defaults to 60 days before today. Must be a tz-aware
@@ -1077,22 +1088,11 @@ class User(GuidStoredObject, AddonModelMixin):
 
         :rtype: generator of log ids (strings)
         '''
-        log_ids = []
-        # Default since to 60 days before today if since is None
-        # timezone aware utcnow
-        utcnow = dt.datetime.utcnow().replace(tzinfo=pytz.utc)
-        since_date = since or (utcnow - dt.timedelta(days=60))
-        for config in self.watched:
-            # Extract the timestamps for each log from the log_id (fast!)
-            # The first 4 bytes of Mongo's ObjectId encodes time
-            # This prevents having to load each Log Object and access their
-            # date fields
-            node_log_ids = [log_id for log_id in config.node.logs._to_primary_keys()
-                                   if bson.ObjectId(log_id).generation_time > since_date and
-                                   log_id not in log_ids]
-            # Log ids in reverse chronological order
-            log_ids = _merge_into_reversed(log_ids, node_log_ids)
-        return (l_id for l_id in log_ids)
+        return (l_id for l_id in watched_logs.find_log_ids(self._id, since=since))
+
+    def count_recent_logs(self, since=None):
+        '''Return the number of logs `get_recent_log_ids` would generate.'''
+        return watched_logs.count_logs(self._id, since=since)
 
     def get_daily_digest_log_ids(self):
         '''Return a generator of log ids generated in the past day
@@ -1180,6 +1180,7 @@ class User(GuidStoredObject, AddonModelMixin):
             if watched not in self.watched:
                 self.watched.append(watched)
         user.watched = []
+        watched_logs.move_timeline(user._id, self._id)
 
         for account in user.external_accounts:
             if account not in self.external_accounts:
@@ -1265,9 +1266,3 @@ class User(GuidStoredObject, AddonModelMixin):
     def n_projects_in_common(self, other_user):
         """Returns number of "shared projects" (projects that both users are contributors for)"""
         return len(self.get_projects_in_common(other_user, primary_keys=True))
-
-
-def _merge_into_reversed(*iterables):
-    '''Merge multiple sorted inputs into a single output in reverse order.
-    '''
-    return sorted(itertools.chain(*iterables), reverse=True)
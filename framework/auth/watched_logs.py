@@ -0,0 +1,193 @@
+# -*- coding: utf-8 -*-
+"""Per-user timelines of logs on watched nodes, maintained on write.
+
+When logs are added to a node they are fanned out to the timelines of every
+user watching it, so a user's watched feed is a single indexed range query
+instead of a merge over the full log lists of every watched node:
+
+    {
+        '_id': '<user_id>:<log_id>',
+        'user': '<user_id>',
+        'log': '<log_id>',
+        'nodes': ['<node_id>', ...],  # Watched nodes whose `logs` contain the log
+        'date': <datetime>,  # Creation time of the log
+    }
+
+Log ids are ObjectId strings, so comparing them orders logs by creation time,
+the same ordering `User.get_recent_log_ids` has always used. Timelines are
+only read ``BACKFILL_DAYS`` back, so entries expire after that long through a
+TTL index on `date`; run `scripts/migrate_watched_logs.py` to date, or
+prune, entries written before they had one.
+"""
+
+import datetime as dt
+
+import bson
+import pytz
+
+from framework.mongo import database
+from framework.mongo.utils import bulk_insert_or_merge
+
+
+COLLECTION_NAME = 'watchedlogs'
+
+# Logs older than this are not backfilled when a user starts watching a node,
+# and expire from timelines
+BACKFILL_DAYS = 60
+
+
+def get_collection(db=None):
+    return (db or database)[COLLECTION_NAME]
+
+
+def ensure_indices(db=None):
+    collection = get_collection(db)
+    collection.ensure_index([('user', 1), ('log', -1)])
+    collection.ensure_index([('nodes', 1), ('user', 1)])
+    collection.ensure_index('date', expireAfterSeconds=BACKFILL_DAYS * 24 * 60 * 60)
+
+
+def log_id_since(since):
+    """Return the smallest log id that could have been generated at or after
+    the tz-aware datetime ``since``.
+    """
+    return str(bson.ObjectId.from_datetime(since))
+
+
+def _default_since():
+    utcnow = dt.datetime.utcnow().replace(tzinfo=pytz.utc)
+    return utcnow - dt.timedelta(days=BACKFILL_DAYS)
+
+
+def get_watcher_ids(node_id, db=None):
+    """Return ids of users watching the node ``node_id``."""
+    db = db or database
+    config_ids = [
+        each['_id']
+        for each in db['watchconfig'].find({'node': node_id}, {'_id': 1})
+    ]
+    if not config_ids:
+        return []
+    return [
+        each['_id']
+        for each in db['user'].find({'watched': {'$in': config_ids}}, {'_id': 1})
+    ]
+
+
+def _build_entries(user_ids, node_id, log_ids):
+    return [
+        {
+            '_id': '{0}:{1}'.format(user_id, log_id),
+            'user': user_id,
+            'log': log_id,
+            'nodes': [node_id],
+            'date': bson.ObjectId(log_id).generation_time,
+        }
+        for user_id in user_ids
+        for log_id in log_ids
+    ]
+
+
+def _remove_node_from_entries(query, node_id, db=None):
+    collection = get_collection(db)
+    collection.update(query, {'$pull': {'nodes': node_id}}, multi=True)
+    query = dict(query, nodes={'$size': 0})
+    collection.remove(query)
+
+
+def fan_out(node_id, log_ids, db=None):
+    """Add logs newly appended to a node to the timelines of its watchers."""
+    if not log_ids:
+        return
+    user_ids = get_watcher_ids(node_id, db=db)
+    bulk_insert_or_merge(
+        get_collection(db),
+        _build_entries(user_ids, node_id, log_ids),
+        'nodes',
+    )
+
+
+def retract(node_id, log_ids, db=None):
+    """Remove logs no longer belonging to a node from its watchers' timelines."""
+    if not log_ids:
+        return
+    _remove_node_from_entries({'log': {'$in': list(log_ids)}, 'nodes': node_id}, node_id, db=db)
+
+
+def add_node(user_id, node, since=None, db=None):
+    """Backfill a user's timeline with recent logs of a newly watched node.
+
+    :param str user_id: Watching user
+    :param Node node: Watched node
+    :param datetime since: Oldest log time to backfill; defaults to
+        ``BACKFILL_DAYS`` ago
+    """
+    oldest = log_id_since(since or _default_since())
+    log_ids = [
+        log_id for log_id in node.logs._to_primary_keys()
+        if log_id >= oldest
+    ]
+    bulk_insert_or_merge(
+        get_collection(db),
+        _build_entries([user_id], node._id, log_ids),
+        'nodes',
+    )
+
+
+def remove_node(user_id, node_id, db=None):
+    """Remove the logs of a node that is no longer watched from a timeline."""
+    _remove_node_from_entries({'user': user_id, 'nodes': node_id}, node_id, db=db)
+
+
+def move_timeline(from_user_id, to_user_id, db=None):
+    """Merge one user's timeline into another's, e.g. when merging accounts."""
+    collection = get_collection(db)
+    entries = [
+        dict(entry, _id='{0}:{1}'.format(to_user_id, entry['log']), user=to_user_id)
+        for entry in collection.find({'user': from_user_id})
+    ]
+    bulk_insert_or_merge(collection, entries, 'nodes')
+    collection.remove({'user': from_user_id})
+
+
+def prune(db=None):
+    """Remove entries without a `date` whose logs are older than
+    ``BACKFILL_DAYS``, which the TTL index cannot expire.
+    """
+    get_collection(db).remove({
+        'date': {'$exists': False},
+        'log': {'$lt': log_id_since(_default_since())},
+    })
+
+
+def _timeline_query(user_id, since=None, before=None):
+    log_range = {'$gte': log_id_since(since or _default_since())}
+    if before:
+        log_range['$lt'] = before
+    return {'user': user_id, 'log': log_range}
+
+
+def count_logs(user_id, since=None, db=None):
+    """Count the logs in a user's timeline generated after ``since``."""
+    return get_collection(db).find(_timeline_query(user_id, since=since)).count()
+
+
+def find_log_ids(user_id, limit=None, skip=0, since=None, before=None, db=None):
+    """Return ids of logs in a user's timeline, newest first.
+
+    :param int limit: Maximum number of ids to return; all if ``None``
+    :param int skip: Number of ids to skip, for offset pagination
+    :param datetime since: Oldest log time to include; defaults to
+        ``BACKFILL_DAYS`` ago
+    :param str before: Return only logs older than this log id, for keyset
+        pagination
+    """
+    cursor = get_collection(db).find(
+        _timeline_query(user_id, since=since, before=before),
+        {'log': 1},
+    ).sort('log', -1)
+    if skip:
+        cursor = cursor.skip(skip)
+    if limit:
+        cursor = cursor.limit(limit)
+    return [each['log'] for each in cursor]
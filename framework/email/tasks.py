@@ -1,12 +1,132 @@
+"""Email sending tasks.
+
+Messages are sent over SMTP sessions that are kept open between messages,
+one per mail server and credentials in each thread of each worker process.
+A session is re-established when the server drops it, after
+``SMTP_MAX_MESSAGES`` messages, and when it has been idle for longer than
+``SMTP_IDLE_TIMEOUT`` seconds. Counters of the messages sent by the current
+process are available from `get_stats`.
+"""
+
+import time
+import socket
 import smtplib
 import logging
+import threading
 from email.mime.text import MIMEText
 
 from framework.tasks import app
+from framework.utils import Counters, ratio
 from website import settings
 
 logger = logging.getLogger(__name__)
 
+# Errors after which a session is discarded and the message sent again
+CONNECTION_ERRORS = (smtplib.SMTPServerDisconnected, socket.error)
+
+
+class SMTPStats(Counters):
+    """Thread-safe counters of the messages sent by this process."""
+    FIELDS = ('sent', 'failed', 'connections', 'reconnects', 'seconds')
+
+    def add_rates(self, counts):
+        counts['mean_seconds'] = ratio(counts['seconds'], counts['sent'])
+
+
+stats = SMTPStats()
+
+
+def get_stats():
+    """Return message and connection counters, and the mean time to send a
+    message, for the current process.
+    """
+    return stats.to_dict()
+
+
+class SMTPSession(object):
+    """An SMTP connection, logged in and ready to send."""
+
+    def __init__(self, mail_server, ttls, login, username, password):
+        self.server = smtplib.SMTP(mail_server)
+        self.server.ehlo()
+        if ttls:
+            self.server.starttls()
+            self.server.ehlo()
+        if login:
+            self.server.login(username, password)
+        self.messages = 0
+        self.last_used = time.time()
+        stats.increment('connections')
+
+    @property
+    def expired(self):
+        return (
+            self.messages >= settings.SMTP_MAX_MESSAGES or
+            time.time() - self.last_used > settings.SMTP_IDLE_TIMEOUT
+        )
+
+    def sendmail(self, from_addr, to_addr, msg):
+        self.server.sendmail(from_addr=from_addr, to_addrs=[to_addr], msg=msg)
+        self.messages += 1
+        self.last_used = time.time()
+
+    def close(self):
+        try:
+            self.server.quit()
+        except (smtplib.SMTPException, socket.error):
+            # Already disconnected
+            self.server.close()
+
+
+class SMTPPool(object):
+    """SMTP sessions kept open for reuse, per thread."""
+
+    def __init__(self):
+        self._local = threading.local()
+
+    @property
+    def sessions(self):
+        try:
+            return self._local.sessions
+        except AttributeError:
+            self._local.sessions = {}
+            return self._local.sessions
+
+    def get(self, key):
+        session = self.sessions.get(key)
+        if session is not None and (session.expired or not settings.SMTP_POOL):
+            self.discard(key)
+            session = None
+        if session is None:
+            session = self.sessions[key] = SMTPSession(*key)
+        return session
+
+    def discard(self, key):
+        session = self.sessions.pop(key, None)
+        if session is not None:
+            session.close()
+
+    def close(self):
+        for key in list(self.sessions):
+            self.discard(key)
+
+    def sendmail(self, key, from_addr, to_addr, msg):
+        """Send a message over the session for ``key``, reconnecting once if
+        the session was dropped.
+        """
+        try:
+            self.get(key).sendmail(from_addr, to_addr, msg)
+        except CONNECTION_ERRORS as error:
+            logger.warning('SMTP session lost, reconnecting: {0!r}'.format(error))
+            self.discard(key)
+            stats.increment('reconnects')
+            self.get(key).sendmail(from_addr, to_addr, msg)
+        if not settings.SMTP_POOL:
+            self.discard(key)
+
+
+pool = SMTPPool()
+
 
 @app.task
 def send_email(from_addr, to_addr, subject, message, mimetype='html', ttls=True, login=True,
@@ -37,17 +157,34 @@ def send_email(from_addr, to_addr, subject, message, mimetype='html', ttls=True,
     msg['From'] = from_addr
     msg['To'] = to_addr
 
-    s = smtplib.SMTP(mail_server)
-    s.ehlo()
-    if ttls:
-        s.starttls()
-        s.ehlo()
-    if login:
-        s.login(username, password)
-    s.sendmail(
-        from_addr=from_addr,
-        to_addrs=[to_addr],
-        msg=msg.as_string()
-    )
-    s.quit()
+    start = time.time()
+    try:
+        pool.sendmail(
+            (mail_server, ttls, login, username, password),
+            from_addr, to_addr, msg.as_string(),
+        )
+    except Exception:
+        stats.increment('failed')
+        raise
+    stats.increment('sent')
+    stats.increment('seconds', time.time() - start)
     return True
+
+
+@app.task
+def send_emails(messages):
+    """Send a batch of emails over the same SMTP session. A failure to send
+    one email is logged and does not stop the others.
+
+    :param list messages: Keyword arguments for `send_email` for each email
+    :return: Number of emails sent
+    """
+    sent = 0
+    for kwargs in messages:
+        try:
+            if send_email(**kwargs):
+                sent += 1
+        except Exception as error:
+            logger.error('Could not send email to {0}'.format(kwargs.get('to_addr')))
+            logger.exception(error)
+    return sent
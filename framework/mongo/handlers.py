@@ -1,21 +1,33 @@
 # -*- coding: utf-8 -*-
 
+import os
+import time
 import logging
+import threading
 
 import pymongo
+from pymongo.errors import AutoReconnect, ConnectionFailure
 from flask import g
 from werkzeug.local import LocalProxy
 
+from framework.utils import Counters
 from website import settings
 
 
 logger = logging.getLogger(__name__)
 
 
-def get_mongo_client():
+def get_mongo_client(max_pool_size=None):
     """Create MongoDB client and authenticate database.
+
+    :param int max_pool_size: Number of idle sockets the client may keep open;
+        defaults to `settings.DB_POOL_SIZE`
     """
-    client = pymongo.MongoClient(settings.DB_HOST, settings.DB_PORT)
+    client = pymongo.MongoClient(
+        settings.DB_HOST,
+        settings.DB_PORT,
+        max_pool_size=max_pool_size or settings.DB_POOL_SIZE,
+    )
 
     db = client[settings.DB_NAME]
 
@@ -25,20 +37,145 @@ def get_mongo_client():
     return client
 
 
+class PoolStats(Counters):
+    """Thread-safe counters for checkouts from a `MongoClientPool`. A wait is
+    a checkout made while every pooled socket was already in use, i.e. one
+    that had to open a fresh connection; a steady stream of waits means
+    `DB_POOL_SIZE` is too small.
+    """
+    FIELDS = ('checkouts', 'checkins', 'waits', 'in_use', 'max_in_use', 'reconnects')
+
+    def record_checkout(self, pool_size):
+        with self._lock:
+            self.checkouts += 1
+            if self.in_use >= pool_size:
+                self.waits += 1
+            self.in_use += 1
+            self.max_in_use = max(self.max_in_use, self.in_use)
+
+    def record_checkin(self):
+        with self._lock:
+            self.checkins += 1
+            self.in_use = max(self.in_use - 1, 0)
+
+    def record_reconnect(self):
+        self.increment('reconnects')
+
+
+class MongoClientPool(object):
+    """Process-wide pooled MongoDB client. The underlying `MongoClient` is
+    created lazily and re-created whenever the process id changes, so workers
+    forked by uwsgi or gunicorn never share sockets inherited from the master.
+
+    Each request checks out a socket with `MongoClient.start_request`, which
+    pins it to the current thread; TokuMX transactions are bound to a
+    connection, so every command issued during the request must use it.
+    """
+    def __init__(self, pool_size=None, health_check_interval=None):
+        self.pool_size = pool_size or settings.DB_POOL_SIZE
+        self.health_check_interval = (
+            health_check_interval
+            if health_check_interval is not None
+            else settings.DB_POOL_HEALTH_CHECK_INTERVAL
+        )
+        self.stats = PoolStats()
+        self._lock = threading.Lock()
+        self._client = None
+        self._pid = None
+        self._last_checked = 0
+
+    @property
+    def client(self):
+        pid = os.getpid()
+        if self._client is None or self._pid != pid:
+            with self._lock:
+                if self._client is None or self._pid != pid:
+                    # Don't close a client inherited across a fork; its sockets
+                    # still belong to the parent process
+                    self._client = get_mongo_client(max_pool_size=self.pool_size)
+                    self._pid = pid
+                    self._last_checked = time.time()
+        return self._client
+
+    def reset(self):
+        """Discard the current client; the next access reconnects."""
+        with self._lock:
+            client, self._client = self._client, None
+        if client is not None and self._pid == os.getpid():
+            client.close()
+
+    def check_health(self):
+        """Ping the server if the last check is older than the health check
+        interval, reconnecting if the ping fails.
+
+        :return: False if the client had to be discarded, else True
+        """
+        now = time.time()
+        if now - self._last_checked < self.health_check_interval:
+            return True
+        self._last_checked = now
+        try:
+            self.client.admin.command('ping')
+        except (AutoReconnect, ConnectionFailure) as error:
+            logger.warning('MongoDB health check failed; reconnecting: {0}'.format(error))
+            self.reset()
+            self.stats.record_reconnect()
+            return False
+        return True
+
+    def checkout(self):
+        """Pin a pooled socket to the current thread.
+
+        :return: The shared `MongoClient`
+        """
+        self.check_health()
+        client = self.client
+        self.stats.record_checkout(self.pool_size)
+        client.start_request()
+        return client
+
+    def checkin(self, client=None):
+        """Return the socket pinned by `checkout` to the pool. Safe to call
+        more than once per checkout.
+        """
+        client = client or self._client
+        if client is None or not client.in_request():
+            return
+        client.end_request()
+        self.stats.record_checkin()
+
+
+client_pool = MongoClientPool()
+
+
+def get_pool_stats():
+    """Return checkout counters for the current process's client pool."""
+    return client_pool.stats.to_dict()
+
+
 def connection_before_request():
     """Attach MongoDB client to `g`.
     """
-    g._mongo_client = get_mongo_client()
+    if settings.DB_POOL:
+        g._mongo_client = client_pool.checkout()
+    else:
+        g._mongo_client = get_mongo_client()
 
 
 def connection_teardown_request(error=None):
-    """Close MongoDB client if attached to `g`.
+    """Release the pooled socket, or close the MongoDB client if pooling is
+    disabled.
     """
     try:
-        g._mongo_client.close()
+        client = g._mongo_client
     except AttributeError:
         if not settings.DEBUG_MODE:
             logger.error('MongoDB client not attached to request.')
+        return
+    if settings.DB_POOL:
+        client_pool.checkin(client)
+    else:
+        client.close()
 
 
 handlers = {
@@ -47,18 +184,14 @@ handlers = {
 }
 
 
-# Set up getters for `LocalProxy` objects
-_mongo_client = get_mongo_client()
-
-
 def _get_current_client():
-    """Getter for `client` proxy. Return default client if no client attached
-    to `g` or no request context.
+    """Getter for `client` proxy. Return the process-wide client if no client
+    attached to `g` or no request context.
     """
     try:
         return g._mongo_client
     except (AttributeError, RuntimeError):
-        return _mongo_client
+        return client_pool.client
 
 
 def _get_current_database():
@@ -1,13 +1,19 @@
 # -*- coding: utf-8 -*-
 
 import re
+import logging
 import httplib as http
 
 import pymongo
+from bson.errors import InvalidDocument
+from pymongo.errors import DuplicateKeyError, OperationFailure
 from modularodm.exceptions import ValidationValueError
 
 from framework.exceptions import HTTPError
 
+
+logger = logging.getLogger(__name__)
+
 # MongoDB forbids field names that begin with "$" or contain ".". These
 # utilities map to and from Mongo field names.
 
@@ -61,6 +67,53 @@ def unique_on(*groups):
     return wrapper
 
 
+def bulk_insert_or_merge(collection, documents, merge_key):
+    """Insert ``documents`` into ``collection`` in a single batch. Documents
+    whose ``_id`` already exists are merged instead: the list field
+    ``merge_key`` is unioned and all other fields are overwritten.
+
+    :param collection: PyMongo collection
+    :param list documents: Documents to write; each must have an ``_id``
+    :param str merge_key: Name of a list field to union on conflict
+    """
+    if not documents:
+        return
+    try:
+        collection.insert(documents, continue_on_error=True, manipulate=False)
+    except DuplicateKeyError:
+        # Non-conflicting documents have been inserted; upserting everything
+        # again is idempotent and merges the conflicting ones
+        for document in documents:
+            fields = dict(
+                (key, value) for key, value in document.iteritems()
+                if key not in ('_id', merge_key)
+            )
+            collection.update(
+                {'_id': document['_id']},
+                {
+                    '$set': fields,
+                    '$addToSet': {merge_key: {'$each': document[merge_key]}},
+                },
+                upsert=True,
+            )
+
+
+def save_cache_entry(collection, document, description):
+    """Save ``document`` to the cache ``collection``. Concurrent requests may
+    race to fill the same entry and large documents may not fit, so failures
+    are logged rather than raised.
+
+    :param str description: What is cached, for the log message
+    :return: Whether the entry was saved
+    """
+    try:
+        collection.save(document)
+    except (InvalidDocument, OperationFailure) as error:
+        logger.warning('Could not cache {0}: {1}'.format(description, error))
+        return False
+    return True
+
+
 def get_or_http_error(Model, pk):
     instance = Model.load(pk)
     if getattr(instance, 'is_deleted', False):
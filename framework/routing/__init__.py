@@ -5,6 +5,7 @@ import copy
 import json
 import functools
 import httplib as http
+from multiprocessing.pool import ThreadPool
 
 import lxml.html
 import werkzeug.wrappers
@@ -12,6 +13,7 @@ from werkzeug.exceptions import NotFound
 from mako.template import Template
 from mako.lookup import TemplateLookup
 from flask import request, make_response
+from flask.globals import _app_ctx_stack, _request_ctx_stack
 
 from framework import sentry
 from framework.flask import app, redirect
@@ -295,6 +297,35 @@ def call_url(url, view_kwargs=None):
 
     return rv
 
+def map_in_request(func, items, workers):
+    """Call ``func`` on each of ``items`` in a pool of threads that share the
+    current app and request contexts. Exceptions raised by ``func`` are
+    re-raised here.
+
+    :return: List of return values, in the order of ``items``
+    """
+    app_ctx = _app_ctx_stack.top
+    request_ctx = _request_ctx_stack.top
+
+    def call(item):
+        # Push the contexts onto this thread's stacks directly; pushing them
+        # through their own methods would run teardown handlers on pop
+        _app_ctx_stack.push(app_ctx)
+        _request_ctx_stack.push(request_ctx)
+        try:
+            return func(item)
+        finally:
+            _request_ctx_stack.pop()
+            _app_ctx_stack.pop()
+
+    pool = ThreadPool(min(workers, len(items)))
+    try:
+        return pool.map(call, items)
+    finally:
+        pool.close()
+        pool.join()
+
+
 ### Renderers ###
 
 class Renderer(object):
@@ -547,14 +578,26 @@ class WebRenderer(Renderer):
         except IOError:
             return '<div>Template {} not found.</div>'.format(template_name)
 
+        # Output without embeds needs no parsing; the parser lowercases
+        # attribute names
+        if 'mod-meta' not in rendered.lower():
+            return rendered
+
         html = lxml.html.fragment_fromstring(rendered, create_parent='remove')
 
+        # Each replacement covers every copy of an embed, so embeds repeated
+        # by loops in the template are rendered only once
+        replaced = set()
         for element in html.findall('.//*[@mod-meta]'):
 
+            original = lxml.html.tostring(element)
+            if original in replaced:
+                continue
+            replaced.add(original)
+
             # Render nested template
             template_rendered, is_replace = self.render_element(element, data)
 
-            original = lxml.html.tostring(element)
             if is_replace:
                 replacement = template_rendered
             else:
@@ -563,32 +606,6 @@ class WebRenderer(Renderer):
 
             rendered = rendered.replace(original, replacement)
 
-        ## Parse HTML using html5lib; lxml is too strict and e.g. throws
-        ## errors if missing parent container; htmlparser mangles whitespace
-        ## and breaks replacement
-        #parsed = BeautifulSoup(rendered, 'html5lib')
-        #subtemplates = parsed.find_all(
-        #    lambda tag: tag.has_attr('mod-meta')
-        #)
-        #
-        #for element in subtemplates:
-        #
-        #    # Extract HTML of original element
-        #    element_html = str(element)
-        #
-        #    # Render nested template
-        #    template_rendered, is_replace = self.render_element(element, data)
-        #
-        #    # Build replacement
-        #    if is_replace:
-        #        replacement = template_rendered
-        #    else:
-        #        element.string = template_rendered
-        #        replacement = str(element)
-        #
-        #    # Replace
-        #    rendered = rendered.replace(element_html, replacement)
-
         return rendered
 
     def render(self, data, redirect_url, *args, **kwargs):
@@ -15,6 +15,7 @@ from framework.flask import redirect
 
 from website import settings
 
+from . import store
 from .model import Session
 
 
@@ -80,9 +81,17 @@ def prepare_private_key():
 
 
 def get_session():
-    session = sessions.get(request._get_current_object())
+    """Return the session of the current request, loading it on first access
+    if the request carried a session cookie.
+    """
+    current_request = request._get_current_object()
+    session = sessions.get(current_request)
     if not session:
-        session = Session()
+        session_id = session_ids.pop(current_request, None)
+        if session_id:
+            session = store.load(session_id) or Session(_id=session_id)
+        else:
+            session = Session()
         set_session(session)
     return session
 
@@ -95,12 +104,12 @@ def create_session(response, data=None):
     current_session = get_session()
     if current_session:
         current_session.data.update(data or {})
-        current_session.save()
+        store.save(current_session)
         cookie_value = itsdangerous.Signer(settings.SECRET_KEY).sign(current_session._id)
     else:
         session_id = str(bson.objectid.ObjectId())
         session = Session(_id=session_id, data=data or {})
-        session.save()
+        store.save(session)
         cookie_value = itsdangerous.Signer(settings.SECRET_KEY).sign(session_id)
         set_session(session)
     if response is not None:
@@ -109,6 +118,8 @@ def create_session(response, data=None):
 
 
 sessions = WeakKeyDictionary()
+# Ids of sessions not loaded yet, keyed by request
+session_ids = WeakKeyDictionary()
 session = LocalProxy(get_session)
 
 # Request callbacks
@@ -172,15 +183,17 @@ def before_request():
     if cookie:
         try:
             session_id = itsdangerous.Signer(settings.SECRET_KEY).unsign(cookie)
-            session = Session.load(session_id) or Session(_id=session_id)
-            set_session(session)
+        except itsdangerous.BadSignature:
             return
-        except:
-            pass
+        # Loaded by `get_session` if the request uses it
+        current_request = request._get_current_object()
+        sessions.pop(current_request, None)
+        session_ids[current_request] = session_id
 
 
 def after_request(response):
-    if session.data.get('auth_user_id'):
-        session.save()
+    current_session = sessions.get(request._get_current_object())
+    if current_session is not None and current_session.data.get('auth_user_id'):
+        store.save(current_session)
 
     return response
@@ -0,0 +1,229 @@
+# -*- coding: utf-8 -*-
+"""Loading and saving of request sessions.
+
+Sessions are stored in MongoDB as `Session` documents and expire through a
+TTL index on `date_modified`. A session is loaded only when a request first
+touches it, and saved with `$set` / `$unset` of the keys of `data` that
+changed during the request. Sessions that did not change are written only to
+refresh their expiry, at most once per ``SESSION_TOUCH_INTERVAL``.
+
+All reads and writes of sessions go through this module, so that the cache
+below never serves a stale document.
+
+Loaded documents may also be kept in a cache, selected by
+``SESSION_CACHE_BACKEND``:
+
+- `None`: no cache
+- ``'memory'``: an in-process LRU cache. Only suitable when a single process
+  serves all requests, since writes by other processes are not seen
+- ``'redis'``: a Redis-compatible server at ``SESSION_REDIS_URL``; requires
+  the `redis` package
+"""
+
+import copy
+import json
+import time
+import logging
+import datetime
+import threading
+from collections import OrderedDict
+
+from bson import json_util
+
+from website import settings
+
+from .model import Session
+
+
+logger = logging.getLogger(__name__)
+
+
+class LRUCache(object):
+    """In-process cache of session documents, evicting the least recently
+    used when full.
+    """
+
+    def __init__(self, size, ttl):
+        self.size = size
+        self.ttl = ttl
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()
+
+    def get(self, key):
+        with self.lock:
+            try:
+                stored, value = self.entries.pop(key)
+            except KeyError:
+                return None
+            if time.time() - stored > self.ttl:
+                return None
+            self.entries[key] = (stored, value)
+            # Callers may modify the document
+            return copy.deepcopy(value)
+
+    def set(self, key, value):
+        with self.lock:
+            self.entries.pop(key, None)
+            self.entries[key] = (time.time(), copy.deepcopy(value))
+            while len(self.entries) > self.size:
+                self.entries.popitem(last=False)
+
+    def delete(self, key):
+        with self.lock:
+            self.entries.pop(key, None)
+
+
+class RedisCache(object):
+    """Cache of session documents in a Redis-compatible server."""
+
+    PREFIX = 'session:'
+
+    def __init__(self, url, ttl):
+        import redis
+        self.client = redis.StrictRedis.from_url(url)
+        self.ttl = ttl
+
+    def get(self, key):
+        value = self.client.get(self.PREFIX + key)
+        if value is None:
+            return None
+        return json.loads(value, object_hook=json_util.object_hook)
+
+    def set(self, key, value):
+        self.client.setex(
+            self.PREFIX + key,
+            self.ttl,
+            json.dumps(value, default=json_util.default),
+        )
+
+    def delete(self, key):
+        self.client.delete(self.PREFIX + key)
+
+
+_cache = {}
+
+
+def get_cache():
+    """Return the configured session cache, or `None`."""
+    backend = settings.SESSION_CACHE_BACKEND
+    if backend is None:
+        return None
+    if backend not in _cache:
+        if backend == 'memory':
+            _cache[backend] = LRUCache(settings.SESSION_CACHE_SIZE, settings.SESSION_CACHE_TTL)
+        elif backend == 'redis':
+            _cache[backend] = RedisCache(settings.SESSION_REDIS_URL, settings.SESSION_CACHE_TTL)
+        else:
+            raise ValueError('Unknown session cache backend {0!r}'.format(backend))
+    return _cache[backend]
+
+
+def get_collection():
+    return Session._storage[0].store
+
+
+def ensure_indices():
+    get_collection().ensure_index('date_modified', expireAfterSeconds=settings.SESSION_TTL)
+
+
+def _is_expired(doc):
+    age = datetime.datetime.utcnow() - doc['date_modified']
+    return age > datetime.timedelta(seconds=settings.SESSION_TTL)
+
+
+def _remember(session, date_modified):
+    """Record the stored state of ``session`` to find changes against."""
+    session._stored_data = copy.deepcopy(session.data)
+    session._stored_modified = date_modified
+
+
+def load(session_id):
+    """Load a session by id.
+
+    :return: `Session`, or `None` if not found or expired
+    """
+    cache = get_cache()
+    doc = cache.get(session_id) if cache else None
+    if doc is None:
+        doc = get_collection().find_one({'_id': session_id})
+        if doc is not None and cache:
+            cache.set(session_id, doc)
+    if doc is None or _is_expired(doc):
+        return None
+    session = Session(_id=doc['_id'], data=doc.get('data') or {})
+    _remember(session, doc['date_modified'])
+    return session
+
+
+def save(session):
+    """Save the changes made to ``session`` since it was loaded or last
+    saved.
+
+    :return: `True` if the session was written
+    """
+    now = datetime.datetime.utcnow()
+    stored = getattr(session, '_stored_data', None)
+    if stored is None:
+        # Not stored yet, or not loaded through `load`
+        update = {
+            '$set': {'data': session.data, 'date_modified': now},
+            '$setOnInsert': {'date_created': now},
+        }
+    else:
+        changed = dict(
+            ('data.{0}'.format(key), value)
+            for key, value in session.data.iteritems()
+            if key not in stored or stored[key] != value
+        )
+        removed = dict(
+            ('data.{0}'.format(key), True)
+            for key in stored
+            if key not in session.data
+        )
+        age = now - session._stored_modified
+        if not changed and not removed and age < datetime.timedelta(seconds=settings.SESSION_TOUCH_INTERVAL):
+            return False
+        changed['date_modified'] = now
+        update = {'$set': changed}
+        if removed:
+            update['$unset'] = removed
+    get_collection().update({'_id': session._id}, update, upsert=True)
+    _remember(session, now)
+
+    cache = get_cache()
+    if cache:
+        cache.set(session._id, {
+            '_id': session._id,
+            'data': session.data,
+            'date_modified': now,
+        })
+    return True
+
+
+def find_user_session(user_id):
+    """Return the id of the most recently modified session of the user with
+    ``user_id``, or `None`.
+    """
+    cursor = get_collection().find(
+        {'data.auth_user_id': user_id},
+        {'_id': True},
+    ).sort('date_modified', -1).limit(1)
+    return next((doc['_id'] for doc in cursor), None)
+
+
+def remove_user_sessions(user_id):
+    """Remove every session of the user with ``user_id``."""
+    query = {'data.auth_user_id': user_id}
+    if get_cache():
+        forget(each['_id'] for each in get_collection().find(query, {'_id': True}))
+    get_collection().remove(query)
+
+
+def forget(session_ids):
+    """Drop sessions from the cache after they are changed or removed
+    without `save`.
+    """
+    cache = get_cache()
+    if cache:
+        for session_id in session_ids:
+            cache.delete(session_id)
@@ -1,6 +1,4 @@
-from modularodm import Q
-
-from .model import Session
+from . import store
 
 
 def remove_sessions_for_user(user):
@@ -8,4 +6,4 @@ def remove_sessions_for_user(user):
 
     :param User user:
     """
-    Session.remove(Q('data.auth_user_id', 'eq', user._id))
+    store.remove_user_sessions(user._id)
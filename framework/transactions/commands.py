@@ -1,6 +1,7 @@
 # -*- coding: utf-8 -*-
 import logging
 from framework.mongo import database as proxy_database
+from framework.mongo.handlers import client_pool
 from website import settings as osfsettings
 
 logger = logging.getLogger(__name__)
@@ -27,9 +28,15 @@ def show_live(database=None):
 
 
 def disconnect(database=None):
+    """Release the connection used by the current transaction. Pooled
+    clients are returned to the pool rather than closed.
+    """
     database = database or proxy_database
     try:
-        database.connection.close()
+        if osfsettings.DB_POOL:
+            client_pool.checkin(database.connection)
+        else:
+            database.connection.close()
     except AttributeError:
         if not osfsettings.DEBUG_MODE:
             logger.error('MongoDB client not attached to request.')
@@ -1,5 +1,6 @@
 from __future__ import absolute_import
 import re
+import threading
 
 from werkzeug.utils import secure_filename as werkzeug_secure_filename
 
@@ -28,3 +29,38 @@ def secure_filename(filename):
         pass
 
     return secure
+
+
+def ratio(part, whole):
+    """Return ``part / whole`` as a float, or 0 if ``whole`` is 0."""
+    return float(part) / whole if whole else 0
+
+
+class Counters(object):
+    """Thread-safe counters, named in ``FIELDS``. Subclasses add values
+    derived from the counters, e.g. hit rates, in `add_rates`.
+    """
+    FIELDS = ()
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            for field in self.FIELDS:
+                setattr(self, field, 0)
+
+    def increment(self, field, value=1):
+        with self._lock:
+            setattr(self, field, getattr(self, field) + value)
+
+    def add_rates(self, counts):
+        """Add derived values to ``counts``, a dict of the counters."""
+        pass
+
+    def to_dict(self):
+        with self._lock:
+            ret = dict((field, getattr(self, field)) for field in self.FIELDS)
+        self.add_rates(ret)
+        return ret
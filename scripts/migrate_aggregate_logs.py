@@ -0,0 +1,47 @@
+# -*- coding: utf-8 -*-
+"""Backfill the activity feed index in `website.project.aggregate_logs`.
+Indexes every top-level node together with its descendants; safe to re-run.
+"""
+import sys
+import logging
+
+from modularodm import Q
+
+from framework.transactions.context import TokuTransaction
+from website.app import init_app
+from website.models import Node
+from website.project import aggregate_logs
+from scripts import utils as script_utils
+
+logger = logging.getLogger(__name__)
+
+
+def do_migration(records, dry=False):
+    count = 0
+    for node in records:
+        if node.node__parent:
+            # Indexed along with its top-level ancestor
+            continue
+        logger.info('Indexing logs for node tree {}'.format(node._id))
+        count += 1
+        if dry:
+            continue
+        with TokuTransaction():
+            aggregate_logs.index_subtree(node, root_ids=[])
+    logger.info('{}Indexed {} node trees'.format('[dry] ' if dry else '', count))
+
+
+def get_targets():
+    return Node.find(Q('is_folder', 'ne', True))
+
+
+def main():
+    init_app(routes=False)  # Sets the storage backends on all models
+    dry = 'dry' in sys.argv
+    if not dry:
+        script_utils.add_file_logger(logger, __file__)
+    do_migration(get_targets(), dry)
+
+
+if __name__ == '__main__':
+    main()
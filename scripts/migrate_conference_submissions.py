@@ -0,0 +1,45 @@
+# -*- coding: utf-8 -*-
+"""Rebuild the conference submission index in
+`website.conferences.submissions` for every conference, and store the
+lowercased endpoint of each conference; safe to re-run.
+"""
+import sys
+import logging
+
+from framework.transactions.context import TokuTransaction
+from website.app import init_app
+from website.conferences.model import Conference
+from website.conferences import submissions
+from scripts import utils as script_utils
+
+logger = logging.getLogger(__name__)
+
+
+def do_migration(records, dry=False):
+    count = 0
+    for conference in records:
+        logger.info('Indexing submissions to conference {}'.format(conference.endpoint))
+        count += 1
+        if dry:
+            continue
+        with TokuTransaction():
+            conference.save()
+            indexed = submissions.index_conference(conference.endpoint)
+        logger.info('Indexed {} submissions'.format(indexed))
+    logger.info('{}Indexed {} conferences'.format('[dry] ' if dry else '', count))
+
+
+def get_targets():
+    return Conference.find()
+
+
+def main():
+    init_app(routes=False)  # Sets the storage backends on all models
+    dry = 'dry' in sys.argv
+    if not dry:
+        script_utils.add_file_logger(logger, __file__)
+    do_migration(get_targets(), dry)
+
+
+if __name__ == '__main__':
+    main()
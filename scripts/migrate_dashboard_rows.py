@@ -0,0 +1,44 @@
+# -*- coding: utf-8 -*-
+"""Rebuild the rows of the dashboard projection in
+`website.project.dashboard_rows` for every node; safe to re-run.
+"""
+import sys
+import logging
+
+from modularodm import Q
+
+from framework.transactions.context import TokuTransaction
+from website.app import init_app
+from website.models import Node
+from website.project import dashboard_rows
+from scripts import utils as script_utils
+
+logger = logging.getLogger(__name__)
+
+
+def do_migration(records, dry=False):
+    count = 0
+    for node in records:
+        logger.info('Syncing dashboard rows of node {}'.format(node._id))
+        count += 1
+        if dry:
+            continue
+        with TokuTransaction():
+            dashboard_rows.sync_node(node)
+    logger.info('{}Synced {} nodes'.format('[dry] ' if dry else '', count))
+
+
+def get_targets():
+    return Node.find(Q('is_deleted', 'eq', False))
+
+
+def main():
+    init_app(routes=False)  # Sets the storage backends on all models
+    dry = 'dry' in sys.argv
+    if not dry:
+        script_utils.add_file_logger(logger, __file__)
+    do_migration(get_targets(), dry)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,49 @@
+# -*- coding: utf-8 -*-
+"""Backfill the watched-log timelines in `framework.auth.watched_logs` with
+the last 60 days of logs on every watched node, and prune older entries.
+Safe to re-run.
+"""
+import sys
+import logging
+
+from modularodm import Q
+
+from framework.auth import watched_logs
+from framework.transactions.context import TokuTransaction
+from website.app import init_app
+from website.models import User
+from scripts import utils as script_utils
+
+logger = logging.getLogger(__name__)
+
+
+def do_migration(records, dry=False):
+    count = 0
+    for user in records:
+        logger.info('Building watched-log timeline for user {}'.format(user._id))
+        count += 1
+        if dry:
+            continue
+        with TokuTransaction():
+            for config in user.watched:
+                if config.node:
+                    watched_logs.add_node(user._id, config.node)
+    if not dry:
+        watched_logs.prune()
+    logger.info('{}Migrated {} users'.format('[dry] ' if dry else '', count))
+
+
+def get_targets():
+    return User.find(Q('watched', 'ne', []))
+
+
+def main():
+    init_app(routes=False)  # Sets the storage backends on all models
+    dry = 'dry' in sys.argv
+    if not dry:
+        script_utils.add_file_logger(logger, __file__)
+    do_migration(get_targets(), dry)
+
+
+if __name__ == '__main__':
+    main()
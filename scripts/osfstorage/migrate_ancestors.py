@@ -0,0 +1,100 @@
+#!/usr/bin/env python
+# encoding: utf-8
+"""Backfill `OsfStorageFileNode.ancestors` for existing file trees.
+
+Each tree is read with a single query on `node_settings`, ancestors are
+computed in memory, and only records whose stored ancestors differ are
+written. Safe to re-run.
+"""
+
+import sys
+import logging
+
+from framework.transactions.context import TokuTransaction
+
+from website.app import init_app
+from website.addons.osfstorage.model import OsfStorageFileNode
+
+from scripts import utils as script_utils
+
+
+logger = logging.getLogger(__name__)
+
+
+def get_collection():
+    return OsfStorageFileNode._storage[0].store
+
+
+def compute_ancestors(parents):
+    """Compute ancestor lists from a mapping of node id to parent id.
+
+    :param dict parents: Parent id, or `None`, keyed by node id
+    :return: Dict of ancestor id lists, root first, keyed by node id
+    """
+    ancestors = {}
+
+    def resolve(node_id):
+        chain = []
+        current = node_id
+        while current is not None and current not in ancestors:
+            chain.append(current)
+            current = parents.get(current)
+        known = ancestors[current] + [current] if current is not None else []
+        for each in reversed(chain):
+            ancestors[each] = known
+            known = known + [each]
+
+    for node_id in parents:
+        resolve(node_id)
+    return ancestors
+
+
+def migrate_tree(node_settings_id, dry=True):
+    collection = get_collection()
+    records = list(collection.find(
+        {'node_settings': node_settings_id},
+        {'parent': 1, 'ancestors': 1},
+    ))
+    parents = dict((each['_id'], each.get('parent')) for each in records)
+    computed = compute_ancestors(parents)
+    updated = 0
+    for record in records:
+        ancestors = computed[record['_id']]
+        if record.get('ancestors') == ancestors:
+            continue
+        updated += 1
+        if not dry:
+            collection.update({'_id': record['_id']}, {'$set': {'ancestors': ancestors}})
+    return updated
+
+
+def get_targets():
+    return get_collection().distinct('node_settings')
+
+
+def main(dry=True):
+    targets = get_targets()
+    logger.info('Migrating {0} file trees'.format(len(targets)))
+    total = 0
+    for node_settings_id in targets:
+        try:
+            with TokuTransaction():
+                count = migrate_tree(node_settings_id, dry=dry)
+        except Exception as error:
+            logger.error('Could not migrate file tree of {0}'.format(node_settings_id))
+            logger.exception(error)
+            continue
+        if count:
+            logger.info('Updated {0} records of {1}'.format(count, node_settings_id))
+        total += count
+    logger.info('Updated {0} records'.format(total))
+    # Objects cached before the migration hold stale ancestors
+    OsfStorageFileNode._clear_caches()
+
+
+if __name__ == '__main__':
+    dry = 'dry' in sys.argv
+    if not dry:
+        script_utils.add_file_logger(logger, __file__)
+    init_app(set_backends=True, routes=False)
+    main(dry=dry)
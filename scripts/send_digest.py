@@ -1,14 +1,29 @@
-"""Script for sending OSF email digests to subscribed users and removing the records once sent."""
+"""Script for sending OSF email digests to subscribed users and removing the records once sent.
+
+Digests are read in order of user, a batch of ``DIGEST_BATCH_SIZE`` users at
+a time. The emails of a batch are rendered and sent by
+``DIGEST_SEND_WORKERS`` threads. The digests of the emails that were
+delivered are then removed with a single query. When sending through Celery,
+emails are only queued, so each user's digests are removed by a callback of
+the mail task instead, once it is delivered.
+
+Progress is checkpointed: the last user of each finished batch, and each user
+of the batch in flight, with the digests delivered to them, as soon as their
+email is sent or queued. A run that is interrupted removes those digests and
+resumes with the batch in flight, skipping the users it already sent to.
+"""
 
 import datetime
+import itertools
 import logging
-from bson.code import Code
+import operator
 
 from modularodm import Q
 
 from framework import sentry
 from framework.auth.core import User
 from framework.mongo import database as db
+from framework.routing import map_in_request
 from framework.tasks import app as celery_app
 from scripts import utils as script_utils
 from website import mails
@@ -28,50 +43,144 @@ if not settings.DEBUG_MODE:
     for logger_name in SILENT_LOGGERS:
         logging.getLogger(logger_name).setLevel(logging.CRITICAL)
 
+CHECKPOINT_COLLECTION = 'digestrun'
+RUN_ID = 'send_digest'
+
 
 def main():
     script_utils.add_file_logger(logger, __file__)
     app = init_app(attach_request_handlers=False)
     celery_app.main = 'scripts.send_digest'
-    grouped_digests = group_digest_notifications_by_user()
     with app.test_request_context():
-        send_digest(grouped_digests)
+        run()
+
+
+def get_checkpoints():
+    return db[CHECKPOINT_COLLECTION]
 
 
-def send_digest(grouped_digests):
-    """ Send digest emails and remove digests for sent messages in a callback.
-    :param grouped_digests: digest notification messages from the past 24 hours grouped by user
-    :return:
+def run(batch_size=None, workers=None):
+    """Send all digests created before the run started, resuming an
+    interrupted run.
     """
-    for group in grouped_digests:
-        user = User.load(group['user_id'])
-        if not user:
-            sentry.log_exception()
-            sentry.log_message("A user with this username does not exist.")
-            return
+    batch_size = batch_size or settings.DIGEST_BATCH_SIZE
+    checkpoints = get_checkpoints()
+    checkpoint = checkpoints.find_one({'_id': RUN_ID})
+    if checkpoint is None:
+        checkpoint = {
+            '_id': RUN_ID,
+            'cutoff': datetime.datetime.utcnow(),
+            'last_user_id': None,
+            'sent': [],
+            'delivered': [],
+        }
+        checkpoints.save(checkpoint)
+    else:
+        logger.info('Resuming digest run after user {0}'.format(checkpoint['last_user_id']))
+        remove_sent_digest_notifications(digest_notification_ids=checkpoint.get('delivered'))
+
+    def record_sent(user_id, delivered):
+        checkpoints.update({'_id': RUN_ID}, {'$push': {
+            'sent': user_id,
+            'delivered': {'$each': delivered},
+        }})
+
+    last_user_id = checkpoint['last_user_id']
+    # Users of the batch in flight that were already sent or queued to
+    sent = set(checkpoint.get('sent') or [])
+    users = 0
+    while True:
+        batch = list(itertools.islice(
+            group_digest_notifications_by_user(checkpoint['cutoff'], after=last_user_id),
+            batch_size,
+        ))
+        if not batch:
+            break
+        send_digest(
+            [group for group in batch if group['user_id'] not in sent],
+            workers=workers,
+            on_sent=record_sent,
+        )
+        last_user_id = batch[-1]['user_id']
+        checkpoints.update({'_id': RUN_ID}, {'$set': {
+            'last_user_id': last_user_id,
+            'sent': [],
+            'delivered': [],
+        }})
+        sent = set()
+        users += len(batch)
+        logger.info('Sent digests to {0} users'.format(users))
+
+    checkpoints.remove({'_id': RUN_ID})
+
+
+def send_digest(grouped_digests, workers=None, on_sent=None):
+    """ Send digest emails in parallel and remove the digests of delivered
+    emails with a single query, or in a callback of each mail task when using
+    Celery. Digests of messages that could not be sent are kept for the next
+    run.
+    :param grouped_digests: digest notification messages grouped by user
+    :param function on_sent: called with the id of each user whose email was
+        sent, or queued when using Celery, and the ids of the digests
+        delivered to them, which are left to the callback when using Celery
+    :return: ids of the users whose emails were sent or queued
+    """
+    if not grouped_digests:
+        return []
+    users = dict(
+        (user._id, user)
+        for user in User.find(Q('_id', 'in', [group['user_id'] for group in grouped_digests]))
+    )
 
+    def send(group):
         info = group['info']
         digest_notification_ids = [message['_id'] for message in info]
-        sorted_messages = group_messages_by_node(info)
-
-        if sorted_messages:
-            logger.info('Sending email digest to user {0!r}'.format(user))
+        user = users.get(group['user_id'])
+        if not user:
+            sentry.log_message('A user with this username does not exist.')
+            # Nobody to send these to
+            return None, digest_notification_ids
+
+        logger.info('Sending email digest to user {0!r}'.format(user))
+        if settings.USE_CELERY:
+            # Emails are only queued; remove the digests once the mail task
+            # has delivered them
+            callback = remove_sent_digest_notifications.si(
+                digest_notification_ids=digest_notification_ids
+            )
+            delivered = []
+        else:
+            callback = None
+            delivered = digest_notification_ids
+        try:
             mails.send_mail(
                 to_addr=user.username,
                 mimetype='html',
                 mail=mails.DIGEST,
                 name=user.fullname,
-                message=sorted_messages,
-                callback=remove_sent_digest_notifications.si(
-                    digest_notification_ids=digest_notification_ids
-                )
+                message=group_messages_by_node(info),
+                callback=callback,
             )
+        except Exception as error:
+            logger.error('Could not send email digest to user {0!r}'.format(user))
+            logger.exception(error)
+            sentry.log_exception()
+            return None, []
+        if on_sent is not None:
+            on_sent(user._id, delivered)
+        return user._id, delivered
+
+    results = map_in_request(send, grouped_digests, workers or settings.DIGEST_SEND_WORKERS)
+    remove_sent_digest_notifications(digest_notification_ids=list(itertools.chain.from_iterable(
+        delivered for _, delivered in results
+    )))
+    return [user_id for user_id, _ in results if user_id is not None]
 
 
 @celery_app.task
 def remove_sent_digest_notifications(digest_notification_ids=None):
-    for digest_id in digest_notification_ids:
-        NotificationDigest.remove(Q('_id', 'eq', digest_id))
+    if digest_notification_ids:
+        NotificationDigest.remove(Q('_id', 'in', digest_notification_ids))
 
 
 def group_messages_by_node(notifications):
@@ -81,9 +190,12 @@ def group_messages_by_node(notifications):
     return d
 
 
-def group_digest_notifications_by_user():
-    """ Group digest notification messages from the past 24 hours by user
-    :return: [{
+def group_digest_notifications_by_user(cutoff=None, after=None):
+    """ Group digest notification messages created before ``cutoff`` by
+    user, streaming them in order of user id.
+    :param datetime cutoff: defaults to now
+    :param str after: only yield users with greater ids
+    :return: iterator of {
                 'user_id': 'se8ea',
                 'info': [{
                     'message': {
@@ -94,31 +206,27 @@ def group_digest_notifications_by_user():
                     '_id': NotificationDigest._id
                 }, ...
                 }]
-              },
-              {
-                'user_id': ...
-              }]
+              }
     """
-    return db['notificationdigest'].group(
-        key={'user_id': 1},
-        condition={
-            'timestamp': {
-                '$lt': datetime.datetime.utcnow()
-            }
-        },
-        initial={'info': []},
-        reduce=Code(
-            """
-            function(curr, result) {
-                result.info.push({
-                    'message': curr.message,
-                    'node_lineage': curr.node_lineage,
-                    '_id': curr._id
-                });
-            };
-            """
-        )
-    )
+    query = {'timestamp': {'$lt': cutoff or datetime.datetime.utcnow()}}
+    if after is not None:
+        query['user_id'] = {'$gt': after}
+    cursor = db['notificationdigest'].find(
+        query,
+        fields=['user_id', 'message', 'node_lineage'],
+    ).sort([('user_id', 1), ('_id', 1)])
+    for user_id, records in itertools.groupby(cursor, key=operator.itemgetter('user_id')):
+        yield {
+            'user_id': user_id,
+            'info': [
+                {
+                    'message': record.get('message'),
+                    'node_lineage': record.get('node_lineage'),
+                    '_id': record['_id'],
+                }
+                for record in records
+            ],
+        }
 
 
 if __name__ == '__main__':
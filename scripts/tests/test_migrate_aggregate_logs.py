@@ -0,0 +1,33 @@
+from nose.tools import *  # noqa
+
+from framework.auth import Auth
+
+from tests.base import OsfTestCase
+from tests.factories import ProjectFactory, NodeFactory
+
+from website.project import aggregate_logs
+from scripts.migrate_aggregate_logs import do_migration, get_targets
+
+
+class TestMigrateAggregateLogs(OsfTestCase):
+
+    def test_do_migration(self):
+        project = ProjectFactory()
+        component = NodeFactory(parent=project)
+        aggregate_logs.get_collection().remove()
+        aggregate_logs.get_member_collection().remove()
+
+        do_migration(get_targets())
+
+        auth = Auth(user=project.creator)
+        logs, total = project.get_aggregate_logs(auth, count=100)
+        assert_equal(len(logs), len(project.logs) + len(component.logs))
+        assert_equal(total, len(logs))
+        logs, total = component.get_aggregate_logs(auth, count=100)
+        assert_equal(len(logs), len(component.logs))
+
+    def test_do_migration_dry(self):
+        ProjectFactory()
+        aggregate_logs.get_collection().remove()
+        do_migration(get_targets(), dry=True)
+        assert_equal(aggregate_logs.get_collection().count(), 0)
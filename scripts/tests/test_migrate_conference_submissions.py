@@ -0,0 +1,43 @@
+from nose.tools import *  # noqa
+
+from framework.auth.core import Auth
+
+from tests.base import OsfTestCase
+from tests.factories import ProjectFactory
+from tests.test_conferences import ConferenceFactory
+
+from website.conferences import submissions
+from website.conferences.model import Conference
+from scripts.migrate_conference_submissions import do_migration, get_targets
+
+
+class TestMigrateConferenceSubmissions(OsfTestCase):
+
+    def setUp(self):
+        super(TestMigrateConferenceSubmissions, self).setUp()
+        self.conference = ConferenceFactory()
+        self.node = ProjectFactory(is_public=True)
+        self.node.add_tag(self.conference.endpoint, Auth(self.node.creator))
+        submissions.get_collection().remove()
+
+    def test_do_migration(self):
+        do_migration(get_targets())
+        rows, total = submissions.get_rows(self.conference.endpoint)
+        assert_equal(total, 1)
+        assert_equal(rows[0]['title'], self.node.title)
+
+    def test_do_migration_stores_lowercased_endpoint(self):
+        Conference._storage[0].store.update(
+            {'_id': self.conference._id},
+            {'$unset': {'endpoint_lower': True}},
+        )
+        Conference._clear_caches()
+        do_migration(get_targets())
+        assert_equal(
+            submissions.get_endpoints([self.conference.endpoint.upper()]),
+            [self.conference.endpoint],
+        )
+
+    def test_do_migration_dry(self):
+        do_migration(get_targets(), dry=True)
+        assert_equal(submissions.get_collection().count(), 0)
@@ -0,0 +1,23 @@
+from nose.tools import *  # noqa
+
+from tests.base import OsfTestCase
+from tests.factories import ProjectFactory
+
+from website.project import dashboard_rows
+from scripts.migrate_dashboard_rows import do_migration, get_targets
+
+
+class TestMigrateDashboardRows(OsfTestCase):
+
+    def setUp(self):
+        super(TestMigrateDashboardRows, self).setUp()
+        self.node = ProjectFactory()
+        dashboard_rows.get_collection().remove()
+
+    def test_do_migration(self):
+        do_migration(get_targets())
+        assert_equal(dashboard_rows.get_project_ids(self.node.creator._id), [self.node._id])
+
+    def test_do_migration_dry(self):
+        do_migration(get_targets(), dry=True)
+        assert_equal(dashboard_rows.get_collection().count(), 0)
@@ -0,0 +1,43 @@
+from nose.tools import *  # noqa
+
+from tests.base import OsfTestCase
+from tests.factories import ProjectFactory
+
+from website.addons.osfstorage import model
+
+from scripts.osfstorage import migrate_ancestors as migration
+
+
+class TestMigrateAncestors(OsfTestCase):
+
+    def setUp(self):
+        super(TestMigrateAncestors, self).setUp()
+        self.project = ProjectFactory()
+        self.node_settings = self.project.get_addon('osfstorage')
+        self.root = self.node_settings.root_node
+        self.folder = self.root.append_folder('Cloud')
+        self.child = self.folder.append_file('Carp')
+        migration.get_collection().update(
+            {'node_settings': self.node_settings._id},
+            {'$unset': {'ancestors': True}},
+            multi=True,
+        )
+
+    def test_compute_ancestors(self):
+        parents = {'root': None, 'folder': 'root', 'child': 'folder'}
+        assert_equal(
+            migration.compute_ancestors(parents),
+            {'root': [], 'folder': ['root'], 'child': ['root', 'folder']},
+        )
+
+    def test_migrate_tree(self):
+        assert_equal(migration.migrate_tree(self.node_settings._id, dry=False), 3)
+        model.OsfStorageFileNode._clear_caches()
+        child = model.OsfStorageFileNode.load(self.child._id)
+        assert_equal(child.ancestors, [self.root._id, self.folder._id])
+        assert_equal(migration.migrate_tree(self.node_settings._id, dry=False), 0)
+
+    def test_dry_run(self):
+        migration.migrate_tree(self.node_settings._id, dry=True)
+        record = migration.get_collection().find_one({'_id': self.child._id})
+        assert_not_in('ancestors', record)
@@ -618,14 +618,6 @@ def analytics():
         module.main()
 
 
-@task
-def clear_sessions(months=1, dry_run=False):
-    from website.app import init_app
-    init_app(routes=False, set_backends=True)
-    from scripts import clear_sessions
-    clear_sessions.clear_sessions_relative(months=months, dry_run=dry_run)
-
-
 # Release tasks
 
 @task
@@ -113,6 +113,28 @@ class DbTestCase(unittest.TestCase):
 
         cls._original_bcrypt_log_rounds = settings.BCRYPT_LOG_ROUNDS
         settings.BCRYPT_LOG_ROUNDS = 1
+        # Index synchronously so tests can search right after saving
+        cls._original_elastic_queue_updates = settings.ELASTIC_QUEUE_UPDATES
+        settings.ELASTIC_QUEUE_UPDATES = False
+        cls._original_elastic_refresh_on_write = settings.ELASTIC_REFRESH_ON_WRITE
+        settings.ELASTIC_REFRESH_ON_WRITE = True
+        cls._original_elastic_reindex_workers = settings.ELASTIC_REINDEX_WORKERS
+        settings.ELASTIC_REINDEX_WORKERS = 1
+        # Write page counters immediately so tests can read them back
+        cls._original_analytics_buffer_counters = settings.ANALYTICS_BUFFER_COUNTERS
+        settings.ANALYTICS_BUFFER_COUNTERS = False
+        cls._original_analytics_counter_cache_ttl = settings.ANALYTICS_COUNTER_CACHE_TTL
+        settings.ANALYTICS_COUNTER_CACHE_TTL = 0
+        cls._original_hgrid_cache = settings.HGRID_CACHE
+        settings.HGRID_CACHE = False
+        cls._original_waterbutler_auth_cache = settings.WATERBUTLER_AUTH_CACHE
+        settings.WATERBUTLER_AUTH_CACHE = False
+        cls._original_waterbutler_metadata_cache = settings.WATERBUTLER_METADATA_CACHE
+        settings.WATERBUTLER_METADATA_CACHE = False
+        cls._original_addon_http_cache_backend = settings.ADDON_HTTP_CACHE_BACKEND
+        settings.ADDON_HTTP_CACHE_BACKEND = None
+        cls._original_citation_cache = settings.CITATION_CACHE
+        settings.CITATION_CACHE = False
 
         teardown_database(database=database_proxy._get_current_object())
         # TODO: With `database` as a `LocalProxy`, we should be able to simply
@@ -136,6 +158,16 @@ class DbTestCase(unittest.TestCase):
         settings.PIWIK_HOST = cls._original_piwik_host
         settings.ENABLE_EMAIL_SUBSCRIPTIONS = cls._original_enable_email_subscriptions
         settings.BCRYPT_LOG_ROUNDS = cls._original_bcrypt_log_rounds
+        settings.ELASTIC_QUEUE_UPDATES = cls._original_elastic_queue_updates
+        settings.ELASTIC_REFRESH_ON_WRITE = cls._original_elastic_refresh_on_write
+        settings.ELASTIC_REINDEX_WORKERS = cls._original_elastic_reindex_workers
+        settings.ANALYTICS_BUFFER_COUNTERS = cls._original_analytics_buffer_counters
+        settings.ANALYTICS_COUNTER_CACHE_TTL = cls._original_analytics_counter_cache_ttl
+        settings.HGRID_CACHE = cls._original_hgrid_cache
+        settings.WATERBUTLER_AUTH_CACHE = cls._original_waterbutler_auth_cache
+        settings.WATERBUTLER_METADATA_CACHE = cls._original_waterbutler_metadata_cache
+        settings.ADDON_HTTP_CACHE_BACKEND = cls._original_addon_http_cache_backend
+        settings.CITATION_CACHE = cls._original_citation_cache
 
 
 class AppTestCase(unittest.TestCase):
@@ -10,8 +10,12 @@ from flask import Flask
 
 from datetime import datetime
 
+import mock
+
 from framework import analytics, sessions
+from framework.analytics.visited import VisitedPages
 from framework.sessions import session
+from website import settings
 
 from tests.base import OsfTestCase
 from tests.factories import UserFactory, ProjectFactory
@@ -40,6 +44,58 @@ class TestAnalytics(OsfTestCase):
         assert_equal(user.get_activity_points(db=self.db), 1)
 
 
+class TestGetBasicCountersMany(OsfTestCase):
+
+    def setUp(self):
+        super(TestGetBasicCountersMany, self).setUp()
+        analytics.counter_cache.clear()
+        analytics.write_counters({
+            'download:abc:foo': {'total': 3, 'unique': 2},
+            'download:abc:bar': {'total': 1},
+        }, db=self.db)
+
+    def tearDown(self):
+        super(TestGetBasicCountersMany, self).tearDown()
+        analytics.counter_cache.clear()
+
+    def test_get_basic_counters_many(self):
+        counters = analytics.get_basic_counters_many(
+            ['download:abc:foo', 'download:abc:bar', 'download:abc:baz'],
+            db=self.db,
+        )
+        assert_equal(counters, {
+            'download:abc:foo': (2, 3),
+            'download:abc:bar': (0, 1),
+            'download:abc:baz': (None, None),
+        })
+
+    def test_get_basic_counters_many_matches_single(self):
+        pages = ['download:abc:foo', 'download:abc:baz']
+        counters = analytics.get_basic_counters_many(pages, db=self.db)
+        for page in pages:
+            assert_equal(counters[page], analytics.get_basic_counters(page, db=self.db))
+
+    def test_get_basic_counters_many_empty(self):
+        assert_equal(analytics.get_basic_counters_many([], db=self.db), {})
+
+    @mock.patch.object(settings, 'ANALYTICS_COUNTER_CACHE_TTL', 60)
+    def test_cache(self):
+        page = 'download:abc:foo'
+        analytics.get_basic_counters_many([page], db=self.db)
+        self.db['pagecounters'].update({'_id': page}, {'$inc': {'total': 1}})
+        # Changes made by other processes are not seen until entries expire
+        assert_equal(analytics.get_basic_counters_many([page], db=self.db)[page], (2, 3))
+        with mock.patch.object(settings, 'ANALYTICS_COUNTER_CACHE_TTL', 0):
+            assert_equal(analytics.get_basic_counters_many([page], db=self.db)[page], (2, 4))
+
+    @mock.patch.object(settings, 'ANALYTICS_COUNTER_CACHE_TTL', 60)
+    def test_cache_dropped_on_write(self):
+        page = 'download:abc:foo'
+        analytics.get_basic_counters_many([page], db=self.db)
+        analytics.write_counters({page: {'total': 1}}, db=self.db)
+        assert_equal(analytics.get_basic_counters_many([page], db=self.db)[page], (2, 4))
+
+
 class UpdateCountersTestCase(OsfTestCase):
 
     def setUp(self):
@@ -75,9 +131,6 @@ class TestUpdateCounters(UpdateCountersTestCase):
         count = analytics.get_basic_counters('download:{0}:{1}'.format(self.node, self.fid), db=self.db)
         assert_equal(count, (1, 1))
 
-        page = 'download:{0}:{1}'.format(self.node, self.fid)
-
-        session.data['visited'].append(page)
         download_file_(node=self.node, fid=self.fid)
 
         count = analytics.get_basic_counters('download:{0}:{1}'.format(self.node, self.fid), db=self.db)
@@ -96,14 +149,24 @@ class TestUpdateCounters(UpdateCountersTestCase):
         count = analytics.get_basic_counters('download:{0}:{1}:{2}'.format(self.node, self.fid, self.vid), db=self.db)
         assert_equal(count, (1, 1))
 
-        page = 'download:{0}:{1}:{2}'.format(self.node, self.fid, self.vid)
-
-        session.data['visited'].append(page)
         download_file_version_(node=self.node, fid=self.fid, vid=self.vid)
 
         count = analytics.get_basic_counters('download:{0}:{1}:{2}'.format(self.node, self.fid, self.vid), db=self.db)
         assert_equal(count, (1, 2))
 
+    def test_update_counters_converts_legacy_visited_list(self):
+        @analytics.update_counters('download:{target_id}:{fid}', db=self.db)
+        def download_file_(**kwargs):
+            return kwargs.get('node') or kwargs.get('project')
+
+        page = 'download:{0}:{1}'.format(self.node._id, self.fid)
+        session.data['visited'] = [page]
+        download_file_(node=self.node, fid=self.fid)
+
+        count = analytics.get_basic_counters(page, db=self.db)
+        assert_equal(count, (0, 1))
+        assert_in(page, VisitedPages.load(session.data['visited']))
+
     def test_get_basic_counters(self):
         page = 'node:' + str(self.node._id)
 
@@ -133,9 +196,6 @@ class TestUpdateCounters(UpdateCountersTestCase):
         count = analytics.get_basic_counters('download:{0}:{1}'.format(self.node, fid2), db=self.db)
         assert_equal(count, (None, None))
 
-        page = 'download:{0}:{1}'.format(self.node, fid1)
-
-        session.data['visited'].append(page)
         download_file_(node=self.node, fid=fid1)
         download_file_(node=self.node, fid=fid2)
 
@@ -143,3 +203,120 @@ class TestUpdateCounters(UpdateCountersTestCase):
         assert_equal(count, (1, 2))
         count = analytics.get_basic_counters('download:{0}:{1}'.format(self.node, fid2), db=self.db)
         assert_equal(count, (1, 1))
+
+
+
+class TestVisitedPages(unittest.TestCase):
+
+    def test_add(self):
+        visited = VisitedPages(size=1024)
+        assert_true(visited.add('download:abc:def'))
+        assert_false(visited.add('download:abc:def'))
+        assert_in('download:abc:def', visited)
+        assert_not_in('download:abc:ghi', visited)
+
+    def test_dump_and_load(self):
+        visited = VisitedPages(size=1024)
+        visited.add(u'download:abc:d\xe9f')
+        loaded = VisitedPages(visited.dump(), size=1024)
+        assert_in(u'download:abc:d\xe9f', loaded)
+
+    def test_load_legacy_list(self):
+        visited = VisitedPages.load(['one', 'two'])
+        assert_in('one', visited)
+        assert_in('two', visited)
+
+    def test_exact_below_filter_size(self):
+        visited = VisitedPages(size=1024)
+        for index in range(7):
+            visited.add('page{0}'.format(index))
+        assert_is_none(visited.bits)
+        dumped = visited.dump()
+        assert_true(dumped.startswith(VisitedPages.EXACT_PREFIX))
+        loaded = VisitedPages(dumped, size=1024)
+        assert_in('page6', loaded)
+        assert_not_in('page7', loaded)
+
+    def test_switch_to_filter(self):
+        visited = VisitedPages(size=1024)
+        for index in range(8):
+            assert_true(visited.add('page{0}'.format(index)))
+        assert_equal(len(visited.bits), 1024 // 8)
+        loaded = VisitedPages(visited.dump(), size=1024)
+        for index in range(8):
+            assert_in('page{0}'.format(index), loaded)
+            assert_false(loaded.add('page{0}'.format(index)))
+
+    def test_size_change_discards_filter(self):
+        visited = VisitedPages(size=1024)
+        for index in range(8):
+            visited.add('page{0}'.format(index))
+        assert_not_in('page0', VisitedPages(visited.dump(), size=2048))
+
+
+class TestCounterBuffer(UpdateCountersTestCase):
+
+    def setUp(self):
+        super(TestCounterBuffer, self).setUp()
+        self.buffer_patch = mock.patch.object(settings, 'ANALYTICS_BUFFER_COUNTERS', True)
+        self.buffer_patch.start()
+        self.flusher_patch = mock.patch.object(analytics, 'counter_flusher')
+        self.mock_flusher = self.flusher_patch.start()
+        analytics.counter_buffer.drain()
+
+    def tearDown(self):
+        analytics.counter_buffer.drain()
+        self.flusher_patch.stop()
+        self.buffer_patch.stop()
+        super(TestCounterBuffer, self).tearDown()
+
+    def test_increments_are_merged(self):
+        buffer = analytics.CounterBuffer()
+        buffer.add('page', {'total': 1, 'unique': 1})
+        buffer.add('page', {'total': 1})
+        assert_equal(buffer.drain(), {'page': {'total': 2, 'unique': 1}})
+        assert_equal(buffer.drain(), {})
+
+    @mock.patch.object(settings, 'ANALYTICS_FLUSH_SIZE', 2)
+    def test_add_reports_when_due(self):
+        buffer = analytics.CounterBuffer()
+        assert_false(buffer.add('one', {'total': 1}))
+        assert_false(buffer.add('one', {'total': 1}))
+        assert_true(buffer.add('two', {'total': 1}))
+
+    def test_update_counter_is_buffered(self):
+        analytics.update_counter('download:abc:def', db=self.db)
+        analytics.update_counter('download:abc:def', db=self.db)
+        assert_equal(analytics.get_basic_counters('download:abc:def', db=self.db), (None, None))
+        assert_true(self.mock_flusher.start.called)
+        assert_false(self.mock_flusher.wake.called)
+        assert_equal(analytics.counter_buffer.increments['download:abc:def']['total'], 2)
+
+    @mock.patch.object(settings, 'ANALYTICS_FLUSH_SIZE', 1)
+    def test_update_counter_wakes_flusher_when_due(self):
+        analytics.update_counter('download:abc:def', db=self.db)
+        assert_true(self.mock_flusher.wake.called)
+
+    @mock.patch.object(settings, 'USE_CELERY', False)
+    def test_flush_writes_counters(self):
+        analytics.update_counter('download:abc:def', db=self.db)
+        analytics.flush_counters()
+        assert_equal(analytics.get_basic_counters('download:abc:def', db=self.db), (1, 1))
+        assert_equal(analytics.counter_buffer.increments, {})
+
+    @mock.patch.object(settings, 'USE_CELERY', True)
+    @mock.patch('framework.analytics.tasks.write_counters')
+    def test_flush_dispatches_task(self, mock_write):
+        analytics.update_counter('download:abc:def', db=self.db)
+        analytics.flush_counters()
+        mock_write.delay.assert_called_once_with({'download:abc:def': mock.ANY})
+        assert_equal(analytics.counter_buffer.increments, {})
+
+    @mock.patch.object(settings, 'USE_CELERY', True)
+    @mock.patch('framework.analytics.tasks.write_counters')
+    def test_failed_flush_keeps_increments(self, mock_write):
+        mock_write.delay.side_effect = Exception('Broker unavailable')
+        analytics.update_counter('download:abc:def', db=self.db)
+        analytics.flush_counters()
+        analytics.update_counter('download:abc:def', db=self.db)
+        assert_equal(analytics.counter_buffer.increments['download:abc:def']['total'], 2)
@@ -1,10 +1,15 @@
 # -*- coding: utf-8 -*-
+import smtpd
+import asyncore
 import unittest
 import smtplib
+import threading
 
+import mock
 from nose.tools import *  # PEP8 asserts
 
-from framework.email.tasks import send_email
+from framework.email import tasks
+from framework.email.tasks import send_email, send_emails
 from website import settings
 
 # Check if local mail server is running
@@ -27,5 +32,129 @@ class TestEmail(unittest.TestCase):
                                  message="<h1>Greetings!</h1>", ttls=False, login=False))
 
 
+class DebuggingServer(smtpd.SMTPServer):
+    """SMTP server that records connections and messages."""
+
+    def __init__(self):
+        smtpd.SMTPServer.__init__(self, ('127.0.0.1', 0), None)
+        self.connections = 0
+        self.messages = []
+
+    @property
+    def address(self):
+        return '{0}:{1}'.format(*self.socket.getsockname())
+
+    def handle_accept(self):
+        self.connections += 1
+        smtpd.SMTPServer.handle_accept(self)
+
+    def process_message(self, peer, mailfrom, rcpttos, data):
+        self.messages.append((mailfrom, rcpttos, data))
+
+
+class TestSMTPPool(unittest.TestCase):
+
+    def setUp(self):
+        self.server = DebuggingServer()
+        self.running = True
+        self.thread = threading.Thread(target=self.serve)
+        self.thread.start()
+        self.patches = [
+            mock.patch.object(settings, 'USE_EMAIL', True),
+            mock.patch.object(settings, 'SMTP_POOL', True),
+            mock.patch.object(settings, 'SMTP_MAX_MESSAGES', 100),
+            mock.patch.object(settings, 'SMTP_IDLE_TIMEOUT', 60),
+        ]
+        for patch in self.patches:
+            patch.start()
+        tasks.pool.close()
+        tasks.stats.reset()
+
+    def tearDown(self):
+        tasks.pool.close()
+        for patch in self.patches:
+            patch.stop()
+        self.running = False
+        self.thread.join()
+        asyncore.close_all()
+
+    def serve(self):
+        while self.running:
+            asyncore.loop(timeout=0.05, count=1)
+
+    def message(self, to_addr='baz@quux.com', **kwargs):
+        return dict(
+            from_addr='foo@bar.com', to_addr=to_addr, subject='no subject',
+            message='<h1>Greetings!</h1>', ttls=False, login=False,
+            mail_server=self.server.address, **kwargs
+        )
+
+    def test_send_emails_uses_one_connection(self):
+        messages = [self.message('user{0}@quux.com'.format(i)) for i in range(5)]
+        assert_equal(send_emails(messages), 5)
+        assert_equal(len(self.server.messages), 5)
+        assert_equal(self.server.connections, 1)
+        assert_equal(
+            [rcpttos for _, rcpttos, _ in self.server.messages],
+            [['user{0}@quux.com'.format(i)] for i in range(5)],
+        )
+
+    def test_send_email_reuses_connection(self):
+        assert_true(send_email(**self.message()))
+        assert_true(send_email(**self.message()))
+        assert_equal(self.server.connections, 1)
+
+    def test_reconnects_when_session_is_dropped(self):
+        send_email(**self.message())
+        for session in tasks.pool.sessions.values():
+            session.server.sock.close()
+        assert_true(send_email(**self.message()))
+        assert_equal(len(self.server.messages), 2)
+        assert_equal(self.server.connections, 2)
+        assert_equal(tasks.get_stats()['reconnects'], 1)
+
+    def test_replaces_session_after_max_messages(self):
+        with mock.patch.object(settings, 'SMTP_MAX_MESSAGES', 2):
+            send_emails([self.message() for _ in range(5)])
+        assert_equal(len(self.server.messages), 5)
+        assert_equal(self.server.connections, 3)
+
+    def test_replaces_idle_session(self):
+        send_email(**self.message())
+        with mock.patch.object(settings, 'SMTP_IDLE_TIMEOUT', -1):
+            send_email(**self.message())
+        assert_equal(self.server.connections, 2)
+
+    def test_no_pool(self):
+        with mock.patch.object(settings, 'SMTP_POOL', False):
+            send_emails([self.message() for _ in range(3)])
+            assert_equal(tasks.pool.sessions, {})
+        assert_equal(len(self.server.messages), 3)
+        assert_equal(self.server.connections, 3)
+
+    def test_send_emails_continues_after_failure(self):
+        sendmail = tasks.pool.sendmail
+
+        def refuse(key, from_addr, to_addr, msg):
+            if to_addr == 'refused@quux.com':
+                raise smtplib.SMTPRecipientsRefused({to_addr: (550, 'No such user')})
+            return sendmail(key, from_addr, to_addr, msg)
+
+        messages = [self.message(), self.message('refused@quux.com'), self.message()]
+        with mock.patch.object(tasks.pool, 'sendmail', side_effect=refuse):
+            assert_equal(send_emails(messages), 2)
+        assert_equal(len(self.server.messages), 2)
+        assert_equal(tasks.get_stats()['failed'], 1)
+
+    def test_stats(self):
+        send_emails([self.message() for _ in range(3)])
+        stats = tasks.get_stats()
+        assert_equal(stats['sent'], 3)
+        assert_equal(stats['failed'], 0)
+        assert_equal(stats['connections'], 1)
+        assert_equal(stats['reconnects'], 0)
+        assert_greater(stats['mean_seconds'], 0)
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -7,6 +7,7 @@ import json
 import unittest
 import os
 
+import mock
 import flask
 from lxml.html import fragment_fromstring
 import werkzeug.wrappers
@@ -319,6 +320,34 @@ class WebRendererTemplateTestCase(OsfTestCase):
         )
 
 
+class WebRendererSpliceTestCase(OsfTestCase):
+
+    def setUp(self):
+        super(WebRendererSpliceTestCase, self).setUp()
+        self.app.app.preprocess_request()
+
+    def get_renderer(self, template_name):
+        return WebRenderer(
+            template_name,
+            render_mako_string,
+            template_dir=TEMPLATES_PATH,
+        )
+
+    def test_identical_embeds_rendered_once(self):
+        r = self.get_renderer('nested_parent_many.html')
+        with mock.patch.object(WebRenderer, 'render_element', wraps=r.render_element) as render:
+            rendered = r._render({})
+        self.assertEqual(render.call_count, 4)
+        self.assertEqual(rendered.count('child template content'), 5)
+        self.assertNotIn('"replace": true', rendered)
+
+    def test_render_without_embeds_skips_parsing(self):
+        r = self.get_renderer('nested_child.html')
+        with mock.patch('lxml.html.fragment_fromstring') as parse:
+            self.assertEqual(r._render({}), '<p>child template content</p>')
+            self.assertFalse(parse.called)
+
+
 class JSONRendererEncoderTestCase(unittest.TestCase):
 
     def test_encode_custom_class(self):
@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+"""Unit tests for the pooled MongoDB client in framework/mongo/handlers.py"""
+
+import unittest
+
+import mock
+from nose.tools import *  # noqa (PEP8 asserts)
+from pymongo.errors import AutoReconnect
+
+from framework.mongo import handlers
+
+
+class TestPoolStats(unittest.TestCase):
+
+    def setUp(self):
+        self.stats = handlers.PoolStats()
+
+    def test_checkout_and_checkin(self):
+        self.stats.record_checkout(pool_size=2)
+        self.stats.record_checkout(pool_size=2)
+        self.stats.record_checkin()
+        stats = self.stats.to_dict()
+        assert_equal(stats['checkouts'], 2)
+        assert_equal(stats['checkins'], 1)
+        assert_equal(stats['in_use'], 1)
+        assert_equal(stats['max_in_use'], 2)
+        assert_equal(stats['waits'], 0)
+
+    def test_checkout_over_pool_size_counts_wait(self):
+        self.stats.record_checkout(pool_size=1)
+        self.stats.record_checkout(pool_size=1)
+        assert_equal(self.stats.to_dict()['waits'], 1)
+
+    def test_reset(self):
+        self.stats.record_checkout(pool_size=1)
+        self.stats.reset()
+        assert_equal(self.stats.to_dict()['checkouts'], 0)
+
+
+@mock.patch('framework.mongo.handlers.get_mongo_client')
+class TestMongoClientPool(unittest.TestCase):
+
+    def setUp(self):
+        self.pool = handlers.MongoClientPool(pool_size=5, health_check_interval=60)
+
+    def test_client_is_reused(self, mock_get_client):
+        assert_is(self.pool.client, self.pool.client)
+        assert_equal(mock_get_client.call_count, 1)
+        mock_get_client.assert_called_with(max_pool_size=5)
+
+    @mock.patch('framework.mongo.handlers.os.getpid')
+    def test_client_recreated_after_fork(self, mock_getpid, mock_get_client):
+        mock_get_client.side_effect = [mock.Mock(), mock.Mock()]
+        mock_getpid.return_value = 1
+        parent_client = self.pool.client
+        mock_getpid.return_value = 2
+        child_client = self.pool.client
+        assert_is_not(parent_client, child_client)
+        assert_false(parent_client.close.called)
+
+    def test_checkout_and_checkin(self, mock_get_client):
+        client = mock_get_client.return_value
+        client.in_request.return_value = True
+        assert_is(self.pool.checkout(), client)
+        client.start_request.assert_called_once_with()
+        self.pool.checkin(client)
+        client.end_request.assert_called_once_with()
+        stats = self.pool.stats.to_dict()
+        assert_equal(stats['checkouts'], 1)
+        assert_equal(stats['checkins'], 1)
+
+    def test_checkin_outside_request_is_noop(self, mock_get_client):
+        client = mock_get_client.return_value
+        client.in_request.return_value = False
+        self.pool.checkin(client)
+        assert_false(client.end_request.called)
+        assert_equal(self.pool.stats.to_dict()['checkins'], 0)
+
+    def test_health_check_skipped_within_interval(self, mock_get_client):
+        client = self.pool.client
+        assert_true(self.pool.check_health())
+        assert_false(client.admin.command.called)
+
+    def test_health_check_failure_reconnects(self, mock_get_client):
+        bad_client, good_client = mock.Mock(), mock.Mock()
+        bad_client.admin.command.side_effect = AutoReconnect('gone')
+        mock_get_client.side_effect = [bad_client, good_client]
+        self.pool.health_check_interval = 0
+        assert_false(self.pool.check_health())
+        bad_client.close.assert_called_once_with()
+        assert_is(self.pool.client, good_client)
+        assert_equal(self.pool.stats.to_dict()['reconnects'], 1)
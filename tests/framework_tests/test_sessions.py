@@ -1,8 +1,16 @@
+import time
+import datetime
+import unittest
+
+import mock
+from flask import request
 from nose.tools import *
 
-from framework.sessions import utils
+from framework import sessions
+from framework.sessions import store, utils
 from tests import factories
-from tests.base import DbTestCase
+from tests.base import DbTestCase, OsfTestCase
+from website import settings
 from website.models import User
 from website.models import Session
 
@@ -34,3 +42,176 @@ class SessionUtilsTestCase(DbTestCase):
 
         utils.remove_sessions_for_user(self.user)
         assert_equal(1, Session.find().count())
+
+
+class TestSessionStore(OsfTestCase):
+
+    def setUp(self):
+        super(TestSessionStore, self).setUp()
+        store._cache.clear()
+        self.session = Session(data={'auth_user_id': 'abc12', 'status': ['hi']})
+        self.session.save()
+
+    def tearDown(self):
+        super(TestSessionStore, self).tearDown()
+        store._cache.clear()
+        Session.remove()
+
+    def get_doc(self):
+        return store.get_collection().find_one({'_id': self.session._id})
+
+    def test_load(self):
+        loaded = store.load(self.session._id)
+        assert_equal(loaded._id, self.session._id)
+        assert_equal(loaded.data, {'auth_user_id': 'abc12', 'status': ['hi']})
+
+    def test_load_missing(self):
+        assert_is_none(store.load('notasession'))
+
+    def test_load_expired(self):
+        store.get_collection().update(
+            {'_id': self.session._id},
+            {'$set': {'date_modified': datetime.datetime.utcnow() - datetime.timedelta(days=365)}},
+        )
+        assert_is_none(store.load(self.session._id))
+
+    def test_save_writes_changed_keys(self):
+        loaded = store.load(self.session._id)
+        loaded.data['status'].append('there')
+        loaded.data['oauth_states'] = {'box': {'state': 'xyz'}}
+        # Written by a concurrent request
+        store.get_collection().update(
+            {'_id': self.session._id},
+            {'$set': {'data.unreg_user': {'uid': 'def34'}}},
+        )
+        assert_true(store.save(loaded))
+        assert_equal(
+            self.get_doc()['data'],
+            {
+                'auth_user_id': 'abc12',
+                'status': ['hi', 'there'],
+                'oauth_states': {'box': {'state': 'xyz'}},
+                'unreg_user': {'uid': 'def34'},
+            },
+        )
+
+    def test_save_removes_deleted_keys(self):
+        loaded = store.load(self.session._id)
+        del loaded.data['status']
+        store.save(loaded)
+        assert_equal(self.get_doc()['data'], {'auth_user_id': 'abc12'})
+
+    def test_save_unchanged_skipped(self):
+        loaded = store.load(self.session._id)
+        with mock.patch.object(store, 'get_collection') as get_collection:
+            assert_false(store.save(loaded))
+            assert_false(get_collection.called)
+
+    def test_save_unchanged_touches_stale_expiry(self):
+        loaded = store.load(self.session._id)
+        loaded._stored_modified -= datetime.timedelta(seconds=settings.SESSION_TOUCH_INTERVAL + 1)
+        before = self.get_doc()['date_modified']
+        assert_true(store.save(loaded))
+        assert_greater_equal(self.get_doc()['date_modified'], before)
+
+    def test_save_new_session(self):
+        session = Session(data={'auth_user_id': 'abc12'})
+        store.save(session)
+        doc = store.get_collection().find_one({'_id': session._id})
+        assert_equal(doc['data'], {'auth_user_id': 'abc12'})
+        assert_in('date_created', doc)
+
+    def test_memory_cache(self):
+        with mock.patch.object(settings, 'SESSION_CACHE_BACKEND', 'memory'):
+            store.load(self.session._id)
+            with mock.patch.object(store, 'get_collection') as get_collection:
+                loaded = store.load(self.session._id)
+                assert_false(get_collection.called)
+            assert_equal(loaded.data['status'], ['hi'])
+            loaded.data['status'] = []
+            store.save(loaded)
+            assert_equal(store.load(self.session._id).data['status'], [])
+
+    def test_remove_sessions_for_user_clears_cache(self):
+        with mock.patch.object(settings, 'SESSION_CACHE_BACKEND', 'memory'):
+            store.load(self.session._id)
+            user = mock.Mock(_id='abc12')
+            utils.remove_sessions_for_user(user)
+            assert_is_none(store.load(self.session._id))
+
+    def test_find_user_session(self):
+        store.get_collection().update(
+            {'_id': self.session._id},
+            {'$set': {'date_modified': datetime.datetime.utcnow() - datetime.timedelta(minutes=1)}},
+        )
+        newer = Session(data={'auth_user_id': 'abc12'})
+        store.save(newer)
+        assert_equal(store.find_user_session('abc12'), newer._id)
+        assert_is_none(store.find_user_session('notauser'))
+
+    def test_get_or_create_cookie_saves_through_store(self):
+        user = factories.UserFactory()
+        with mock.patch.object(settings, 'SESSION_CACHE_BACKEND', 'memory'):
+            with mock.patch.object(store, 'save', wraps=store.save) as save:
+                cookie = user.get_or_create_cookie()
+            assert_true(save.called)
+            with mock.patch.object(store, 'get_collection') as get_collection:
+                assert_equal(User.from_cookie(cookie), user)
+                assert_false(get_collection.called)
+
+
+class TestLRUCache(unittest.TestCase):
+
+    def test_evicts_least_recently_used(self):
+        cache = store.LRUCache(size=2, ttl=60)
+        cache.set('a', {'data': 1})
+        cache.set('b', {'data': 2})
+        cache.get('a')
+        cache.set('c', {'data': 3})
+        assert_equal(cache.get('a'), {'data': 1})
+        assert_is_none(cache.get('b'))
+        assert_equal(cache.get('c'), {'data': 3})
+
+    def test_expires(self):
+        cache = store.LRUCache(size=2, ttl=60)
+        cache.set('a', {'data': 1})
+        with mock.patch('time.time', return_value=time.time() + 61):
+            assert_is_none(cache.get('a'))
+
+    def test_returns_copies(self):
+        cache = store.LRUCache(size=2, ttl=60)
+        cache.set('a', {'data': [1]})
+        cache.get('a')['data'].append(2)
+        assert_equal(cache.get('a'), {'data': [1]})
+
+
+class TestLazySession(OsfTestCase):
+
+    def setUp(self):
+        super(TestLazySession, self).setUp()
+        self.session = Session(data={'auth_user_id': 'abc12'})
+        self.session.save()
+
+    def tearDown(self):
+        super(TestLazySession, self).tearDown()
+        Session.remove()
+
+    def test_loaded_on_access(self):
+        current_request = request._get_current_object()
+        sessions.sessions.pop(current_request, None)
+        sessions.session_ids[current_request] = self.session._id
+        with mock.patch.object(store, 'load', wraps=store.load) as load:
+            sessions.after_request(None)
+            assert_false(load.called)
+            assert_equal(sessions.session.data['auth_user_id'], 'abc12')
+            assert_equal(sessions.session.data['auth_user_id'], 'abc12')
+            load.assert_called_once_with(self.session._id)
+
+    def test_after_request_saves_changes(self):
+        current_request = request._get_current_object()
+        sessions.sessions.pop(current_request, None)
+        sessions.session_ids[current_request] = self.session._id
+        sessions.session.data['status'] = ['hi']
+        sessions.after_request(None)
+        doc = store.get_collection().find_one({'_id': self.session._id})
+        assert_equal(doc['data']['status'], ['hi'])
@@ -0,0 +1,147 @@
+# -*- coding: utf-8 -*-
+"""Tests for the shared add-on HTTP layer in website/addons/base/http_client.py"""
+
+import time
+import unittest
+
+import mock
+import httpretty
+from nose.tools import *  # noqa (PEP8 asserts)
+
+from website import settings
+from website.addons.base import http_client
+
+
+class TestLRUCache(unittest.TestCase):
+
+    def test_bounded_by_size(self):
+        cache = http_client.LRUCache(max_bytes=10, ttl=60)
+        cache.set('a', 'aaaa')
+        cache.set('b', 'bbbb')
+        cache.get('a')
+        cache.set('c', 'cccc')
+        assert_equal(cache.get('a'), 'aaaa')
+        assert_is_none(cache.get('b'))
+        assert_equal(cache.get('c'), 'cccc')
+        assert_equal(cache.size, 8)
+
+    def test_oversized_value_not_stored(self):
+        cache = http_client.LRUCache(max_bytes=3, ttl=60)
+        cache.set('a', 'aaaa')
+        assert_is_none(cache.get('a'))
+        assert_equal(cache.size, 0)
+
+    def test_replace_and_delete(self):
+        cache = http_client.LRUCache(max_bytes=10, ttl=60)
+        cache.set('a', 'aaaa')
+        cache.set('a', 'aa')
+        assert_equal(cache.size, 2)
+        cache.delete('a')
+        assert_is_none(cache.get('a'))
+        assert_equal(cache.size, 0)
+
+    def test_expires(self):
+        cache = http_client.LRUCache(max_bytes=10, ttl=60)
+        cache.set('a', 'aaaa')
+        with mock.patch('time.time', return_value=time.time() + 61):
+            assert_is_none(cache.get('a'))
+        assert_equal(cache.size, 0)
+
+    def test_namespaces_isolated(self):
+        cache = http_client.LRUCache(max_bytes=10, ttl=60)
+        first = http_client.NamespacedCache(cache, 'first:')
+        second = http_client.NamespacedCache(cache, 'second:')
+        first.set('url', 'data')
+        assert_equal(first.get('url'), 'data')
+        assert_is_none(second.get('url'))
+
+
+class TestProviderStats(unittest.TestCase):
+
+    def test_record(self):
+        stats = http_client.ProviderStats()
+        stats.record('github', True, 0.5)
+        stats.record('github', False, 1.5)
+        stats.record('figshare', False, 1)
+        assert_equal(
+            stats.to_dict(),
+            {
+                'github': {'requests': 2, 'hits': 1, 'misses': 1, 'seconds': 2.0, 'mean_seconds': 1.0},
+                'figshare': {'requests': 1, 'hits': 0, 'misses': 1, 'seconds': 1, 'mean_seconds': 1},
+            },
+        )
+
+
+class TestAdapters(unittest.TestCase):
+
+    URL = 'https://api.example.com/items'
+
+    def setUp(self):
+        http_client._caches.clear()
+        http_client.stats.reset()
+        self.patcher = mock.patch.object(settings, 'ADDON_HTTP_CACHE_BACKEND', 'memory')
+        self.patcher.start()
+
+    def tearDown(self):
+        self.patcher.stop()
+        http_client._caches.clear()
+        http_client.stats.reset()
+
+    def test_adapters_share_pool(self):
+        first = http_client.get_adapter('example', namespace='token1')
+        second = http_client.get_adapter('example', namespace='token2', cache=False)
+        assert_is_instance(first, http_client.MeteredCacheAdapter)
+        assert_is_instance(second, http_client.MeteredAdapter)
+        assert_is(first.poolmanager, second.poolmanager)
+        assert_is_not(first.poolmanager, http_client.get_adapter('other').poolmanager)
+
+    def test_no_backend(self):
+        with mock.patch.object(settings, 'ADDON_HTTP_CACHE_BACKEND', None):
+            adapter = http_client.get_adapter('example')
+        assert_is_instance(adapter, http_client.MeteredAdapter)
+
+    def register_fresh(self):
+        calls = []
+
+        def respond(request, uri, headers):
+            calls.append(uri)
+            headers['Cache-Control'] = 'max-age=60'
+            return 200, headers, '[1]'
+
+        httpretty.register_uri(httpretty.GET, self.URL, body=respond)
+        return calls
+
+    @httpretty.activate
+    def test_fresh_response_served_from_cache(self):
+        calls = self.register_fresh()
+        session = http_client.get_session('example', namespace='token')
+        assert_equal(session.get(self.URL).json(), [1])
+        assert_equal(session.get(self.URL).json(), [1])
+        assert_equal(len(calls), 1)
+        counters = http_client.get_stats()['example']
+        assert_equal(counters['hits'], 1)
+        assert_equal(counters['misses'], 1)
+
+    @httpretty.activate
+    def test_cache_not_shared_across_namespaces(self):
+        calls = self.register_fresh()
+        http_client.get_session('example', namespace='token1').get(self.URL)
+        http_client.get_session('example', namespace='token2').get(self.URL)
+        assert_equal(len(calls), 2)
+
+    @httpretty.activate
+    def test_etag_revalidation(self):
+        httpretty.register_uri(
+            httpretty.GET, self.URL,
+            responses=[
+                httpretty.Response(body='[1]', etag='"abc"'),
+                httpretty.Response(body='', status=304, etag='"abc"'),
+            ],
+        )
+        session = http_client.get_session('example', namespace='token')
+        session.get(self.URL)
+        response = session.get(self.URL)
+        assert_equal(httpretty.last_request().headers.get('If-None-Match'), '"abc"')
+        assert_equal(response.status_code, 200)
+        assert_equal(response.json(), [1])
+        assert_equal(http_client.get_stats()['example']['hits'], 1)
@@ -2,6 +2,7 @@
 
 import time
 import mock
+import datetime
 import unittest
 from nose.tools import *  # noqa
 
@@ -17,14 +18,14 @@ from framework.sessions.model import Session
 from framework.mongo import set_up_storage
 
 from website import settings
-from website.util import api_url_for, rubeus
-from website.addons.base import exceptions, GuidFile
+from website.util import api_url_for, rubeus, waterbutler_auth_cache
+from website.addons.base import exceptions, GuidFile, metadata_cache
 from website.project import new_private_link
 from website.project.views.node import _view_project as serialize_node
 from website.addons.base import AddonConfig, AddonNodeSettingsBase, views
 from website.addons.github.model import AddonGitHubOauthSettings
 from tests.base import OsfTestCase
-from tests.factories import AuthUserFactory, ProjectFactory
+from tests.factories import AuthUserFactory, ProjectFactory, NodeFactory
 from website.addons.github.exceptions import ApiError
 
 
@@ -168,6 +169,117 @@ class TestAddonAuth(OsfTestCase):
         assert_equal(res.status_code, 403)
 
 
+class TestAddonAuthCache(TestAddonAuth):
+
+    def setUp(self):
+        super(TestAddonAuthCache, self).setUp()
+        self.cache_patch = mock.patch.object(settings, 'WATERBUTLER_AUTH_CACHE', True)
+        self.cache_patch.start()
+        waterbutler_auth_cache.stats.reset()
+
+    def tearDown(self):
+        self.cache_patch.stop()
+        super(TestAddonAuthCache, self).tearDown()
+
+    def test_grant_is_cached(self):
+        url = self.build_url()
+        first = self.test_app.get(url).json
+        with mock.patch('website.addons.base.views.check_access') as mock_check:
+            second = self.test_app.get(url).json
+        assert_false(mock_check.called)
+        assert_equal(first, second)
+        stats = waterbutler_auth_cache.get_stats()
+        assert_equal(stats['hits'], 1)
+        assert_equal(stats['misses'], 1)
+        assert_equal(stats['hit_rate'], 0.5)
+
+    def test_grants_are_keyed_by_action(self):
+        self.test_app.get(self.build_url(action='download'))
+        self.test_app.get(self.build_url(action='upload'))
+        assert_equal(waterbutler_auth_cache.get_stats()['hits'], 0)
+
+    def test_denied_requests_are_not_cached(self):
+        url = self.build_url(cookie=None)
+        self.test_app.get(url, expect_errors=True)
+        res = self.test_app.get(url, expect_errors=True)
+        assert_equal(res.status_code, 401)
+        assert_equal(waterbutler_auth_cache.get_collection().count(), 0)
+
+    def test_view_only_requests_are_not_cached(self):
+        link = new_private_link('link', self.user, [self.node], anonymous=False)
+        url = self.build_url(cookie=None, view_only=link.key)
+        self.test_app.get(url)
+        assert_equal(waterbutler_auth_cache.get_collection().count(), 0)
+
+    def test_removing_contributor_invalidates(self):
+        contributor = AuthUserFactory()
+        self.node.add_contributor(contributor, auth=self.auth_obj, save=True)
+        session = Session(data={'auth_user_id': contributor._id})
+        session.save()
+        url = self.build_url(cookie=itsdangerous.Signer(settings.SECRET_KEY).sign(session._id))
+        self.test_app.get(url)
+        self.node.remove_contributor(contributor, auth=self.auth_obj)
+        res = self.test_app.get(url, expect_errors=True)
+        assert_equal(res.status_code, 403)
+
+    def test_parent_permission_change_invalidates(self):
+        component = NodeFactory(creator=self.user, parent=self.node)
+        waterbutler_auth_cache.store(component, 'github', 'download', self.user._id, {})
+        self.node.set_privacy('public', auth=self.auth_obj)
+        assert_is_none(waterbutler_auth_cache.load(component._id, 'github', 'download', self.user._id))
+
+    def test_node_addon_change_invalidates(self):
+        url = self.build_url()
+        self.test_app.get(url)
+        self.node_addon.repo = 'bicycle-race'
+        self.node_addon.save()
+        res = self.test_app.get(url)
+        assert_equal(res.json['settings'], self.node_addon.serialize_waterbutler_settings())
+        assert_equal(waterbutler_auth_cache.get_stats()['hits'], 0)
+
+    def test_user_addon_change_invalidates(self):
+        url = self.build_url()
+        self.test_app.get(url)
+        self.user_addon.oauth_access_token = 'other-secret'
+        self.user_addon.save()
+        res = self.test_app.get(url)
+        assert_equal(res.json['credentials'], self.node_addon.serialize_waterbutler_credentials())
+        assert_equal(waterbutler_auth_cache.get_stats()['hits'], 0)
+
+    def test_credentials_are_not_cached(self):
+        self.test_app.get(self.build_url())
+        entry = waterbutler_auth_cache.get_collection().find_one()
+        grant = waterbutler_auth_cache.load(
+            self.node._id, 'github', 'download', self.user._id,
+        )
+        assert_not_in('credentials', grant)
+        assert_not_in(self.user_addon.oauth_access_token, entry['grant'])
+
+    def test_user_addon_change_keeps_other_nodes(self):
+        other = ProjectFactory(creator=self.user)
+        waterbutler_auth_cache.store(other, 'github', 'download', self.user._id, {})
+        self.user_addon.save()
+        assert_is_not_none(waterbutler_auth_cache.load(other._id, 'github', 'download', self.user._id))
+
+    def test_disabling_user_invalidates(self):
+        waterbutler_auth_cache.store(self.node, 'github', 'download', self.user._id, {})
+        self.user.is_disabled = True
+        self.user.save()
+        assert_is_none(waterbutler_auth_cache.load(self.node._id, 'github', 'download', self.user._id))
+
+    def test_tampered_grant_is_ignored(self):
+        url = self.build_url()
+        self.test_app.get(url)
+        collection = waterbutler_auth_cache.get_collection()
+        entry = collection.find_one()
+        collection.update({'_id': entry['_id']}, {'$set': {'grant': entry['grant'] + 'x'}})
+        res = self.test_app.get(url)
+        assert_equal(res.json['auth'], views.make_auth(self.user))
+        stats = waterbutler_auth_cache.get_stats()
+        assert_equal(stats['invalid'], 1)
+        assert_equal(stats['hits'], 0)
+
+
 class TestAddonLogs(OsfTestCase):
 
     def setUp(self):
@@ -226,6 +338,16 @@ class TestAddonLogs(OsfTestCase):
         self.node.reload()
         assert_equal(len(self.node.logs), nlogs + 1)
 
+    def test_add_osfstorage_log_updates_conference_submissions(self):
+        url = self.node.api_url_for('create_waterbutler_log')
+        payload = self.build_payload(
+            metadata={'path': 'pizza', 'materialized': 'pizza'},
+            provider='osfstorage',
+        )
+        with mock.patch('website.conferences.submissions.update_file') as update_file:
+            self.test_app.put_json(url, payload, headers={'Content-Type': 'application/json'})
+        assert_equal(update_file.call_args[0][0]._id, self.node._id)
+
     def test_add_log_missing_args(self):
         path = 'pizza'
         url = self.node.api_url_for('create_waterbutler_log')
@@ -287,6 +409,15 @@ class TestAddonLogs(OsfTestCase):
         self.node.reload()
         assert_equal(len(self.node.logs), nlogs)
 
+    def test_add_log_invalidates_metadata(self):
+        metadata_cache.store('github', self.node._id, '/pizza', None, {'name': 'pizza'})
+        metadata_cache.store('github', self.node._id, '/pasta', None, {'name': 'pasta'})
+        url = self.node.api_url_for('create_waterbutler_log')
+        payload = self.build_payload(metadata={'path': '/pizza'}, action='update')
+        self.test_app.put_json(url, payload, headers={'Content-Type': 'application/json'})
+        paths = [each['path'] for each in metadata_cache.get_collection().find()]
+        assert_equal(paths, ['/pasta'])
+
 
 class TestCheckAuth(OsfTestCase):
 
@@ -378,6 +509,104 @@ class TestAddonFileViewHelpers(OsfFileTestCase):
         assert_equals(getattr(guid, 'name', 'foo'), 'test')
 
 
+class TestGuidFileMetadataCache(OsfFileTestCase):
+
+    def setUp(self):
+        super(TestGuidFileMetadataCache, self).setUp()
+        self.node = ProjectFactory()
+        self.cache_patch = mock.patch.object(settings, 'WATERBUTLER_METADATA_CACHE', True)
+        self.cache_patch.start()
+        self.get_patch = mock.patch('website.addons.base.metadata_cache.get')
+        self.mock_get = self.get_patch.start()
+        self.mock_get.return_value = self.build_response({'name': 'bar.md'})
+        metadata_cache.stats.reset()
+
+    def tearDown(self):
+        self.get_patch.stop()
+        self.cache_patch.stop()
+        super(TestGuidFileMetadataCache, self).tearDown()
+
+    def build_response(self, data, status_code=200):
+        return mock.Mock(
+            ok=status_code < 400,
+            status_code=status_code,
+            json=mock.Mock(return_value={'data': data}),
+        )
+
+    def fetch(self, revision=None, should_raise=False):
+        guid = DummyGuidFile(node=self.node)
+        with self.app.app.test_request_context():
+            guid.maybe_set_version(versionidentifier=revision)
+            guid._fetch_metadata(should_raise=should_raise)
+        return guid._metadata_cache
+
+    def age_entries(self, seconds):
+        metadata_cache.get_collection().update(
+            {},
+            {'$set': {'fetched': datetime.datetime.utcnow() - datetime.timedelta(seconds=seconds)}},
+            multi=True,
+        )
+
+    def test_metadata_is_cached(self):
+        first = self.fetch()
+        second = self.fetch()
+        assert_equal(first, second)
+        assert_equal(self.mock_get.call_count, 1)
+        stats = metadata_cache.get_stats()
+        assert_equal(stats['hits'], 1)
+        assert_equal(stats['misses'], 1)
+
+    def test_metadata_is_keyed_by_revision(self):
+        self.fetch(revision='1')
+        self.fetch(revision='2')
+        assert_equal(self.mock_get.call_count, 2)
+
+    def test_errors_are_not_cached(self):
+        self.mock_get.return_value = self.build_response(None, status_code=404)
+        with assert_raises(exceptions.FileDoesntExistError):
+            self.fetch(should_raise=True)
+        assert_equal(metadata_cache.get_collection().count(), 0)
+
+    def test_ttl_is_per_provider(self):
+        with mock.patch.object(settings, 'WATERBUTLER_METADATA_CACHE_TTL', {'default': 60, 'dummy': 10}):
+            assert_equal(metadata_cache.get_ttl('dummy'), 10)
+            assert_equal(metadata_cache.get_ttl('github'), 60)
+
+    @mock.patch('website.addons.base.metadata_cache._start_revalidation')
+    def test_stale_metadata_is_served_and_revalidated(self, mock_revalidate):
+        self.fetch()
+        self.age_entries(metadata_cache.get_ttl('dummy') + 1)
+        self.fetch()
+        assert_equal(self.mock_get.call_count, 1)
+        assert_true(mock_revalidate.called)
+        assert_equal(metadata_cache.get_stats()['stale_hits'], 1)
+
+    def test_expired_metadata_is_fetched(self):
+        self.fetch()
+        self.age_entries(settings.WATERBUTLER_METADATA_CACHE_STALE_TTL + 1)
+        self.fetch()
+        assert_equal(self.mock_get.call_count, 2)
+
+    def test_revalidate_stores_metadata(self):
+        self.fetch()
+        self.mock_get.return_value = self.build_response({'name': 'baz.md'})
+        metadata_cache.revalidate('dummy', self.node._id, '/path/to/file/', None, 'http://localhost')
+        assert_equal(self.fetch(), {'name': 'baz.md'})
+
+    def test_revalidate_drops_missing_file(self):
+        self.fetch()
+        self.mock_get.return_value = self.build_response(None, status_code=404)
+        metadata_cache.revalidate('dummy', self.node._id, '/path/to/file/', None, 'http://localhost')
+        assert_equal(metadata_cache.get_collection().count(), 0)
+
+    def test_invalidate_folder(self):
+        metadata_cache.store('dummy', self.node._id, '/folder/file', None, {})
+        metadata_cache.store('dummy', self.node._id, '/other', None, {})
+        metadata_cache.invalidate(self.node._id, 'dummy', 'folder/')
+        paths = [each['path'] for each in metadata_cache.get_collection().find()]
+        assert_equal(paths, ['/other'])
+
+
 def assert_urls_equal(url1, url2):
     furl1 = furl.furl(url1)
     furl2 = furl.furl(url2)
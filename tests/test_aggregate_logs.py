@@ -0,0 +1,114 @@
+# -*- coding: utf-8 -*-
+"""Tests for the activity feed index in website/project/aggregate_logs.py"""
+
+import mock
+from nose.tools import *  # noqa (PEP8 asserts)
+
+from framework.auth import Auth
+
+from website.project import aggregate_logs
+
+from tests.base import OsfTestCase
+from tests.factories import (
+    AuthUserFactory, NodeFactory, NodeLogFactory, ProjectFactory,
+)
+
+
+class TestAggregateLogIndex(OsfTestCase):
+
+    def setUp(self):
+        super(TestAggregateLogIndex, self).setUp()
+        self.user = AuthUserFactory()
+        self.auth = Auth(user=self.user)
+        self.project = ProjectFactory(creator=self.user)
+        self.component = NodeFactory(creator=self.user, parent=self.project)
+
+    def assert_matches_queryset(self, node, auth):
+        expected = [log._id for log in node.get_aggregate_logs_queryset(auth)]
+        logs, total = node.get_aggregate_logs(auth, count=len(expected) + 1)
+        assert_equal([log._id for log in logs], expected)
+        assert_equal(total, len(expected))
+
+    def test_feed_includes_component_logs(self):
+        self.component.add_log('file_added', {'node': self.component._id}, auth=self.auth)
+        self.assert_matches_queryset(self.project, self.auth)
+        self.assert_matches_queryset(self.component, self.auth)
+
+    def test_feed_does_not_walk_tree(self):
+        with mock.patch('website.project.model.Node.get_aggregate_log_node_ids') as mock_walk:
+            self.project.get_aggregate_logs(self.auth, count=10)
+        assert_false(mock_walk.called)
+
+    def test_feed_includes_logs_of_components_shared_later(self):
+        self.project.set_privacy('public', auth=self.auth)
+        other = AuthUserFactory()
+        self.component.add_contributor(other, auth=self.auth, save=True)
+        self.assert_matches_queryset(self.project, Auth(user=other))
+
+    def test_feed_includes_component_logs_for_admin_parent(self):
+        admin = AuthUserFactory()
+        self.project.add_contributor(admin, permissions=['read', 'write', 'admin'], auth=self.auth, save=True)
+        self.assert_matches_queryset(self.project, Auth(user=admin))
+
+    def test_shared_logs_are_counted_once(self):
+        log = self.project.add_log('file_added', {'node': self.project._id}, auth=self.auth)
+        self.component.logs.append(log)
+        self.component.save()
+        self.assert_matches_queryset(self.project, self.auth)
+
+    def test_deleted_component_is_unindexed(self):
+        self.component.remove_node(self.auth)
+        assert_not_in(self.component._id, self.project.get_aggregate_log_node_ids(self.auth))
+        self.assert_matches_queryset(self.project, self.auth)
+        ids = [self.project._id, self.component._id]
+        for log_id in self.component.logs._to_primary_keys():
+            assert_not_in(log_id, aggregate_logs.find_log_ids(self.project._id, ids, 100))
+
+    def test_moved_component_is_unindexed(self):
+        other = ProjectFactory(creator=self.user)
+        self.project.nodes.remove(self.component)
+        self.project.save()
+        other.nodes.append(self.component)
+        other.save()
+        self.assert_matches_queryset(self.project, self.auth)
+        self.assert_matches_queryset(other, self.auth)
+
+    def test_feed_excludes_private_component_logs(self):
+        self.project.set_privacy('public', auth=self.auth)
+        self.component.add_log('file_added', {'node': self.component._id}, auth=self.auth)
+        other = AuthUserFactory()
+        logs, total = self.project.get_aggregate_logs(Auth(user=other), count=100)
+        assert_equal(total, len(self.project.logs))
+        assert_true(all(log._id in self.project.logs._to_primary_keys() for log in logs))
+
+    def test_logs_appended_directly_are_indexed(self):
+        log = NodeLogFactory(user=self.user, params={'node': self.project._id})
+        self.project.logs.append(log)
+        self.project.save()
+        self.assert_matches_queryset(self.project, self.auth)
+
+    def test_logs_removed_directly_are_unindexed(self):
+        log = self.component.add_log('file_added', {'node': self.component._id}, auth=self.auth)
+        self.component.logs.remove(log)
+        self.component.save()
+        ids = self.project.get_aggregate_log_node_ids(self.auth)
+        assert_not_in(log._id, aggregate_logs.find_log_ids(self.project._id, ids, 100))
+
+    def test_fork_is_indexed(self):
+        fork = self.project.fork_node(self.auth)
+        self.assert_matches_queryset(fork, self.auth)
+
+    def test_keyset_pagination(self):
+        for _ in range(3):
+            self.project.add_log('file_added', {'node': self.project._id}, auth=self.auth)
+        expected = [log._id for log in self.project.get_aggregate_logs_queryset(self.auth)]
+        first, _ = self.project.get_aggregate_logs(self.auth, count=2)
+        second, _ = self.project.get_aggregate_logs(self.auth, count=2, before=first[-1]._id)
+        assert_equal([log._id for log in first + second], expected[:4])
+
+    def test_offset_pagination(self):
+        for _ in range(3):
+            self.project.add_log('file_added', {'node': self.project._id}, auth=self.auth)
+        expected = [log._id for log in self.project.get_aggregate_logs_queryset(self.auth)]
+        logs, _ = self.project.get_aggregate_logs(self.auth, count=2, page=1)
+        assert_equal([log._id for log in logs], expected[2:4])
@@ -17,7 +17,7 @@ from website import settings
 from website.models import User, Node
 from website.conferences import views
 from website.conferences.model import Conference
-from website.conferences import utils, message
+from website.conferences import utils, message, submissions
 from website.util import api_url_for, web_url_for
 
 from tests.base import OsfTestCase, fake
@@ -463,6 +463,114 @@ class TestConferenceEmailViews(OsfTestCase):
         assert_equal(res.status_code, 200)
 
 
+    def test_conference_data_page(self):
+        conference = ConferenceFactory()
+        nodes = create_fake_conference_nodes(3, conference.endpoint)
+
+        url = api_url_for('conference_data', meeting=conference.endpoint)
+        res = self.app.get(url, {'page': 1, 'size': 2})
+        assert_equal(res.status_code, 200)
+        assert_equal(len(res.json), 1)
+        assert_equal(res.json[0]['id'], 2)
+        assert_equal(res.json[0]['title'], nodes[2].title)
+
+    def test_conference_data_bad_page(self):
+        conference = ConferenceFactory()
+        url = api_url_for('conference_data', meeting=conference.endpoint)
+        res = self.app.get(url, {'page': 'two'}, expect_errors=True)
+        assert_equal(res.status_code, 400)
+
+    def test_conference_view(self):
+        shown = ConferenceFactory()
+        hidden = ConferenceFactory()
+        create_fake_conference_nodes(settings.CONFERNCE_MIN_COUNT, shown.endpoint)
+        create_fake_conference_nodes(settings.CONFERNCE_MIN_COUNT - 1, hidden.endpoint)
+
+        meetings = views.conference_view()['meetings']
+        assert_equal(len(meetings), 1)
+        assert_equal(meetings[0]['name'], shown.name)
+        assert_equal(meetings[0]['submissions'], settings.CONFERNCE_MIN_COUNT)
+
+
+class TestConferenceSubmissions(OsfTestCase):
+
+    def setUp(self):
+        super(TestConferenceSubmissions, self).setUp()
+        self.conference = ConferenceFactory()
+        self.node = create_fake_conference_nodes(1, self.conference.endpoint)[0]
+        self.auth = Auth(self.node.creator)
+
+    def get_rows(self):
+        rows, total = submissions.get_rows(self.conference.endpoint)
+        assert_equal(len(rows), total)
+        return rows
+
+    def test_tagged_node_is_indexed(self):
+        rows = self.get_rows()
+        assert_equal(len(rows), 1)
+        assert_equal(rows[0]['title'], self.node.title)
+        assert_equal(rows[0]['nodeUrl'], self.node.url)
+        assert_equal(rows[0]['category'], 'poster')
+        assert_equal(rows[0]['download'], 0)
+        assert_equal(rows[0]['downloadUrl'], '')
+
+    def test_title_change_updates_row(self):
+        self.node.set_title('Poster', self.auth, save=True)
+        assert_equal(self.get_rows()[0]['title'], 'Poster')
+
+    def test_remove_tag(self):
+        self.node.remove_tag(self.conference.endpoint, self.auth)
+        assert_equal(self.get_rows(), [])
+
+    def test_make_private(self):
+        self.node.set_privacy('private', auth=self.auth)
+        assert_equal(self.get_rows(), [])
+        self.node.set_privacy('public', auth=self.auth)
+        assert_equal(len(self.get_rows()), 1)
+
+    def test_remove_node(self):
+        self.node.remove_node(self.auth)
+        assert_equal(self.get_rows(), [])
+
+    def test_conference_created_after_tagging(self):
+        node = ProjectFactory(is_public=True)
+        node.add_tag('Later2015', Auth(node.creator))
+        conference = ConferenceFactory(endpoint='later2015')
+        rows, total = submissions.get_rows(conference.endpoint)
+        assert_equal(total, 1)
+        assert_equal(rows[0]['title'], node.title)
+
+    def test_count_submissions(self):
+        other = ConferenceFactory()
+        create_fake_conference_nodes(2, other.endpoint)
+        counts = submissions.count_submissions()
+        assert_equal(counts[self.conference.endpoint], 1)
+        assert_equal(counts[other.endpoint], 2)
+
+    def test_index_conference(self):
+        submissions.get_collection().remove()
+        assert_equal(submissions.index_conference(self.conference.endpoint), 1)
+        assert_equal(len(self.get_rows()), 1)
+
+    def test_get_endpoints_ignores_case(self):
+        assert_equal(
+            submissions.get_endpoints([self.conference.endpoint.upper(), 'other']),
+            [self.conference.endpoint],
+        )
+
+    def test_update_file(self):
+        root = self.node.get_addon('osfstorage').root_node
+        record = root.append_file('poster.pdf')
+        submissions.update_file(self.node)
+        row = self.get_rows()[0]
+        assert_in(record.path, row['downloadUrl'])
+
+    def test_log_does_not_resync(self):
+        with mock.patch.object(submissions, 'sync_node') as sync_node:
+            self.node.add_log('osf_storage_file_added', {'node': self.node._id}, self.auth)
+        assert_false(sync_node.called)
+
+
 class TestConferenceModel(OsfTestCase):
 
     def test_endpoint_and_name_are_required(self):
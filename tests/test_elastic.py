@@ -1,15 +1,20 @@
 # -*- coding: utf-8 -*-
+import json
 import unittest
 import logging
 
 from nose.tools import *  # flake8: noqa (PEP8 asserts)
 import mock
+from elasticsearch import ConnectionError
+from elasticsearch.serializer import JSONSerializer
 
+from framework.auth import User
 from framework.auth.core import Auth
 from website import settings
 import website.search.search as search
 from website.search import elastic_search
 from website.search.util import build_query
+from website.search_migration import migrate as migrate_module
 from website.search_migration.migrate import migrate
 
 from tests.base import OsfTestCase
@@ -724,6 +729,17 @@ class TestSearchMigration(SearchTestCase):
         var = self.es.indices.get_aliases()
         assert_equal(var[settings.ELASTIC_INDEX + '_v1']['aliases'].keys()[0], settings.ELASTIC_INDEX)
 
+    def test_first_migration_keeps_index_until_verified(self):
+        with mock.patch.object(migrate_module, 'verify_counts',
+                               side_effect=migrate_module.CountMismatchError()):
+            with assert_raises(migrate_module.CountMismatchError):
+                migrate(delete=False, index=settings.ELASTIC_INDEX, app=self.app.app)
+        var = self.es.indices.get_aliases()
+        assert_equal(var[settings.ELASTIC_INDEX]['aliases'], {})
+        assert_equal(var[settings.ELASTIC_INDEX + '_v1']['aliases'], {})
+        migrate_module.clear_checkpoint(settings.ELASTIC_INDEX + '_v1')
+        search.delete_index(settings.ELASTIC_INDEX + '_v1')
+
     def test_multiple_migrations_no_delete(self):
         for n in xrange(1, 21):
             migrate(delete=False, index=settings.ELASTIC_INDEX, app=self.app.app)
@@ -745,3 +761,131 @@ class TestSearchMigration(SearchTestCase):
             var = self.es.indices.get_aliases()
             assert_equal(var[settings.ELASTIC_INDEX + '_v{}'.format(n + 1)]['aliases'].keys()[0], settings.ELASTIC_INDEX)
             assert not var.get(settings.ELASTIC_INDEX + '_v{}'.format(n))
+
+
+class FakeElasticsearch(object):
+    """Stand-in for the elasticsearch client, holding indexed documents in
+    memory. Bulk requests fail for documents in ``fail_ids``, and raise
+    after ``fail_after`` requests.
+    """
+
+    def __init__(self, fail_ids=(), fail_after=None):
+        self.docs = {}
+        self.requests = 0
+        self.fail_ids = set(fail_ids)
+        self.fail_after = fail_after
+        self.transport = mock.Mock(serializer=JSONSerializer())
+        self.indices = mock.Mock()
+
+    def bulk(self, body, **kwargs):
+        if self.fail_after is not None and self.requests >= self.fail_after:
+            raise ConnectionError('N/A', 'Interrupted', None)
+        self.requests += 1
+        if isinstance(body, basestring):
+            body = body.splitlines()
+        lines = iter(
+            json.loads(line) if isinstance(line, basestring) else line
+            for line in body if line
+        )
+        items = []
+        for action in lines:
+            op_type, meta = action.items()[0]
+            source = next(lines)
+            status = 500 if meta['_id'] in self.fail_ids else 201
+            if status < 300:
+                self.docs[(meta['_index'], meta['_id'])] = source
+            items.append({op_type: dict(meta, status=status)})
+        return {'items': items}
+
+    def count(self, index, **kwargs):
+        return {'count': len([key for key in self.docs if key[0] == index])}
+
+    def ids(self, index):
+        return set(key[1] for key in self.docs if key[0] == index)
+
+
+class TestSearchReindex(OsfTestCase):
+
+    INDEX = 'test_v2'
+
+    def setUp(self):
+        super(TestSearchReindex, self).setUp()
+        self.user = UserFactory()
+        self.public = [ProjectFactory(creator=self.user, is_public=True) for _ in range(3)]
+        self.private = ProjectFactory(creator=self.user)
+        self.deleted = ProjectFactory(creator=self.user, is_public=True, is_deleted=True)
+        self.unconfirmed = UnconfirmedUserFactory()
+        self.expected = set(
+            [node._id for node in self.public] +
+            [user._id for user in User.find() if user.is_active]
+        )
+
+    def tearDown(self):
+        migrate_module.get_checkpoints().remove()
+        super(TestSearchReindex, self).tearDown()
+
+    def test_reindex_public_nodes_and_active_users(self):
+        client = FakeElasticsearch()
+        migrate_module.reindex(self.INDEX, workers=1, client=client)
+        assert_equal(client.ids(self.INDEX), self.expected)
+        assert_not_in(self.private._id, client.ids(self.INDEX))
+        assert_not_in(self.unconfirmed._id, client.ids(self.INDEX))
+
+    def test_batches_streamed_in_key_order(self):
+        batches = list(migrate_module.iter_batches('node', batch_size=2))
+        keys = sorted(node._id for node in self.public)
+        assert_equal(batches, [keys[:2], keys[2:]])
+        assert_equal(
+            list(migrate_module.iter_batches('node', after=keys[0], batch_size=2)),
+            [keys[1:]],
+        )
+
+    @mock.patch('website.search_migration.migrate.settings.ELASTIC_BULK_SIZE', 1)
+    def test_interrupted_reindex_resumes(self):
+        client = FakeElasticsearch(fail_after=2)
+        with assert_raises(ConnectionError):
+            migrate_module.reindex(self.INDEX, workers=1, client=client)
+        checkpoint = migrate_module.load_checkpoint(self.INDEX)
+        assert_equal(checkpoint['expected'], {'node': 2})
+
+        client.fail_after = None
+        client.requests = 0
+        migrate_module.reindex(self.INDEX, workers=1, client=client)
+        assert_equal(client.ids(self.INDEX), self.expected)
+        # Batches sent before the interruption are not sent again
+        assert_equal(client.requests, len(self.expected) - 2)
+
+    def test_count_mismatch_raises(self):
+        client = FakeElasticsearch(fail_ids=[self.public[0]._id])
+        with assert_raises(migrate_module.CountMismatchError):
+            migrate_module.reindex(self.INDEX, workers=1, client=client)
+
+    def test_failed_documents_are_retried(self):
+        client = FakeElasticsearch(fail_ids=[self.public[0]._id])
+        bulk = client.bulk
+
+        def fail_once(body, **kwargs):
+            ret = bulk(body, **kwargs)
+            client.fail_ids.clear()
+            return ret
+
+        client.bulk = fail_once
+        migrate_module.reindex(self.INDEX, workers=1, client=client)
+        assert_equal(client.ids(self.INDEX), self.expected)
+
+    def test_failed_documents_are_resent_on_rerun(self):
+        failed_id = self.public[0]._id
+        client = FakeElasticsearch(fail_ids=[failed_id])
+        with assert_raises(migrate_module.CountMismatchError):
+            migrate_module.reindex(self.INDEX, workers=1, client=client)
+        checkpoint = migrate_module.load_checkpoint(self.INDEX)
+        assert_equal(checkpoint['failed'], {'node': [failed_id]})
+        assert_equal(checkpoint['expected']['node'], len(self.public) - 1)
+
+        client.fail_ids.clear()
+        client.requests = 0
+        migrate_module.reindex(self.INDEX, workers=1, client=client)
+        assert_equal(client.ids(self.INDEX), self.expected)
+        # Only the failed document is sent again
+        assert_equal(client.requests, 1)
+        assert_equal(migrate_module.load_checkpoint(self.INDEX)['failed'], {'node': []})
@@ -17,12 +17,13 @@ from scripts.send_digest import group_digest_notifications_by_user
 from scripts.send_digest import group_messages_by_node
 from scripts.send_digest import remove_sent_digest_notifications
 from scripts.send_digest import send_digest
+from scripts.send_digest import get_checkpoints, run
 from website.notifications import constants
 from website.notifications.model import NotificationDigest
 from website.notifications.model import NotificationSubscription
 from website.notifications import emails
 from website.notifications import utils
-from website import mails
+from website import mails, settings
 from website.util import api_url_for
 from website.util import web_url_for
 
@@ -1068,8 +1069,8 @@ class TestSendEmails(OsfTestCase):
     #     )
     #     assert_true(email_transactional.called)
 
-    @mock.patch('website.mails.send_mail')
-    def test_send_email_transactional(self, send_mail):
+    @mock.patch('website.mails.send_mails')
+    def test_send_email_transactional(self, send_mails):
         # assert that send_mail is called with the correct person & args
         subscribed_users = [self.user._id]
         timestamp = datetime.datetime.utcnow().replace(tzinfo=pytz.utc)
@@ -1106,8 +1107,8 @@ class TestSendEmails(OsfTestCase):
             localized_timestamp=emails.localize_timestamp(timestamp, self.user),
         )
 
-        assert_true(send_mail.called)
-        send_mail.assert_called_with(
+        assert_true(send_mails.called)
+        send_mails.assert_called_once_with([mails.build_mail(
             to_addr=self.user.username,
             mail=mails.TRANSACTIONAL,
             mimetype='html',
@@ -1117,7 +1118,60 @@ class TestSendEmails(OsfTestCase):
             subject=subject,
             message=message,
             url=self.project.absolute_url + 'settings/',
+        )])
+
+    @mock.patch('website.mails.send_mails')
+    @mock.patch('website.mails.render_message')
+    def test_email_transactional_renders_once_per_timezone_and_locale(self, render_message, send_mails):
+        render_message.side_effect = lambda template, **context: context['localized_timestamp']
+        users = [factories.UserFactory(timezone='Etc/UTC', locale='en_US') for _ in range(3)]
+        users.append(factories.UserFactory(timezone='Europe/Moscow', locale='ru_RU'))
+        timestamp = datetime.datetime.utcnow().replace(tzinfo=pytz.utc)
+
+        with mock.patch('website.mails.TRANSACTIONAL') as transactional:
+            transactional.subject.return_value = 'subject'
+            transactional.html.side_effect = lambda **context: context['message']
+            emails.email_transactional(
+                [u._id for u in users] + [self.project.creator._id],
+                self.project._id, 'comments',
+                user=self.project.creator,
+                node=self.project,
+                timestamp=timestamp,
+                gravatar_url=self.user.gravatar_url,
+                content='',
+                parent_comment='',
+                url=self.project.absolute_url,
+            )
+        assert_equal(render_message.call_count, 2)
+        messages = send_mails.call_args[0][0]
+        # The author of the event is not notified
+        assert_equal(
+            sorted(message['to_addr'] for message in messages),
+            sorted(u.username for u in users),
         )
+        for message in messages:
+            recipient = User.find_one(Q('username', 'eq', message['to_addr']))
+            assert_equal(message['message'], emails.localize_timestamp(timestamp, recipient))
+
+    def test_email_digest_inserts_digests_for_each_recipient(self):
+        users = [factories.UserFactory() for _ in range(3)]
+        timestamp = datetime.datetime.utcnow().replace(tzinfo=pytz.utc)
+        with mock.patch('website.mails.render_message', return_value='message') as render_message:
+            emails.email_digest(
+                [u._id for u in users] + [self.user._id],
+                self.project._id, 'comments',
+                user=self.user,
+                node=self.project,
+                timestamp=timestamp,
+            )
+        assert_equal(render_message.call_count, 1)
+        digests = NotificationDigest.find(Q('user_id', 'in', [u._id for u in users + [self.user]]))
+        assert_equal(sorted(d.user_id for d in digests), sorted(u._id for u in users))
+        assert_true(all(d.message == 'message' for d in digests))
+        assert_true(all(d.node_lineage == [self.project._id] for d in digests))
+        # Stored with every model field, as if saved through the ODM
+        raw = NotificationDigest._storage[0].store.find_one({'user_id': users[0]._id})
+        assert_equal(set(raw), set(NotificationDigest.load(raw['_id']).to_storage()))
 
     def test_send_email_digest_creates_digest_notification(self):
         subscribed_users = [factories.UserFactory()._id]
@@ -1232,7 +1286,7 @@ class TestSendDigest(OsfTestCase):
             node_lineage=[project._id]
         )
         d2.save()
-        user_groups = group_digest_notifications_by_user()
+        user_groups = list(group_digest_notifications_by_user())
         expected = [{
                     u'user_id': user._id,
                     u'info': [{
@@ -1251,11 +1305,12 @@ class TestSendDigest(OsfTestCase):
         }]
 
         assert_equal(len(user_groups), 2)
-        assert_equal(user_groups, expected)
+        # Streamed in order of user
+        assert_equal(user_groups, sorted(expected, key=lambda group: group['user_id']))
 
-    @mock.patch('scripts.send_digest.remove_sent_digest_notifications')
+    @mock.patch.object(settings, 'USE_CELERY', False)
     @mock.patch('website.mails.send_mail')
-    def test_send_digest_called_with_correct_args(self, mock_send_mail, mock_callback):
+    def test_send_digest_called_with_correct_args(self, mock_send_mail):
         d = factories.NotificationDigestFactory(
             user_id=factories.UserFactory()._id,
             timestamp=datetime.datetime.utcnow(),
@@ -1263,14 +1318,13 @@ class TestSendDigest(OsfTestCase):
             node_lineage=[factories.ProjectFactory()._id]
         )
         d.save()
-        user_groups = group_digest_notifications_by_user()
-        send_digest(user_groups)
+        user_groups = list(group_digest_notifications_by_user())
+        sent = send_digest(user_groups)
         assert_true(mock_send_mail.called)
         assert_equals(mock_send_mail.call_count, len(user_groups))
 
         last_user_index = len(user_groups) - 1
         user = User.load(user_groups[last_user_index]['user_id'])
-        digest_notification_ids = [message['_id'] for message in user_groups[last_user_index]['info']]
 
         args, kwargs = mock_send_mail.call_args
 
@@ -1280,8 +1334,94 @@ class TestSendDigest(OsfTestCase):
         assert_equal(kwargs['name'], user.fullname)
         message = group_messages_by_node(user_groups[last_user_index]['info'])
         assert_equal(kwargs['message'], message)
-        assert_equal(kwargs['callback'],
-                mock_callback.si(digest_notification_ids=digest_notification_ids))
+        assert_equal(sent, [user._id])
+        assert_equal(NotificationDigest.find().count(), 0)
+
+    @mock.patch.object(settings, 'USE_CELERY', True)
+    @mock.patch('website.mails.send_mail')
+    def test_send_digest_keeps_queued_digests(self, mock_send_mail):
+        # With Celery, send_mail only queues the email; its digests are
+        # removed by the callback once the email is delivered
+        d = factories.NotificationDigestFactory(
+            user_id=factories.UserFactory()._id,
+            timestamp=datetime.datetime.utcnow(),
+            message='Hello',
+            node_lineage=[factories.ProjectFactory()._id]
+        )
+        sent = send_digest(list(group_digest_notifications_by_user()))
+        assert_equal(sent, [d.user_id])
+        assert_equal(NotificationDigest.find(Q('_id', 'eq', d._id)).count(), 1)
+        args, kwargs = mock_send_mail.call_args
+        assert_equal(kwargs['callback'].kwargs, {'digest_notification_ids': [d._id]})
+
+    @mock.patch('website.mails.send_mail')
+    def test_send_digest_keeps_unsent_digests(self, mock_send_mail):
+        mock_send_mail.side_effect = Exception('SMTP unavailable')
+        d = factories.NotificationDigestFactory(
+            user_id=factories.UserFactory()._id,
+            timestamp=datetime.datetime.utcnow(),
+            message='Hello',
+            node_lineage=[factories.ProjectFactory()._id]
+        )
+        assert_equal(send_digest(list(group_digest_notifications_by_user())), [])
+        assert_equal(NotificationDigest.find(Q('_id', 'eq', d._id)).count(), 1)
+
+    def make_digests(self, count):
+        timestamp = datetime.datetime.utcnow() - datetime.timedelta(hours=1)
+        project = factories.ProjectFactory()
+        return [
+            factories.NotificationDigestFactory(
+                user_id=factories.UserFactory()._id,
+                timestamp=timestamp,
+                message='Hello',
+                node_lineage=[project._id]
+            )
+            for _ in range(count)
+        ]
+
+    @mock.patch.object(settings, 'USE_CELERY', False)
+    @mock.patch('website.mails.send_mail')
+    def test_run_sends_in_batches(self, mock_send_mail):
+        self.make_digests(5)
+        with mock.patch('scripts.send_digest.remove_sent_digest_notifications',
+                        wraps=remove_sent_digest_notifications) as mock_remove:
+            run(batch_size=2, workers=2)
+        assert_equal(mock_send_mail.call_count, 5)
+        # One removal per batch
+        assert_equal(mock_remove.call_count, 3)
+        assert_equal(NotificationDigest.find().count(), 0)
+        assert_is_none(get_checkpoints().find_one())
+
+    @mock.patch.object(settings, 'USE_CELERY', False)
+    @mock.patch('website.mails.send_mail')
+    def test_interrupted_run_resumes_without_resending(self, mock_send_mail):
+        self.make_digests(5)
+        recipients = []
+
+        class Interrupted(BaseException):
+            pass
+
+        # Stop in the middle of the second batch, after its first email is
+        # sent and before the second is
+        def send(**kwargs):
+            if len(recipients) == 3 and not resumed:
+                raise Interrupted()
+            recipients.append(kwargs['to_addr'])
+
+        mock_send_mail.side_effect = send
+        resumed = False
+        with assert_raises(Interrupted):
+            run(batch_size=2, workers=1)
+        assert_equal(len(recipients), 3)
+        # The digests of the interrupted batch are kept until it finishes
+        assert_equal(NotificationDigest.find().count(), 3)
+
+        resumed = True
+        run(batch_size=2, workers=1)
+        assert_equal(len(recipients), 5)
+        assert_equal(len(set(recipients)), 5)
+        assert_equal(NotificationDigest.find().count(), 0)
+        assert_is_none(get_checkpoints().find_one())
 
     def test_remove_sent_digest_notifications(self):
         d = factories.NotificationDigestFactory(
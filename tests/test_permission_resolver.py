@@ -0,0 +1,143 @@
+# -*- coding: utf-8 -*-
+"""Tests for the request-scoped permission resolver in
+website/project/permission_resolver.py
+"""
+
+import mock
+from flask import g
+from nose.tools import *  # noqa (PEP8 asserts)
+
+from framework.auth import Auth
+
+from website.project import permission_resolver
+from website.project.model import Node
+
+from tests.base import OsfTestCase
+from tests.factories import (
+    AuthUserFactory, NodeFactory, PrivateLinkFactory,
+    ProjectFactory, UserFactory,
+)
+
+
+class TestPermissionResolver(OsfTestCase):
+
+    def setUp(self):
+        super(TestPermissionResolver, self).setUp()
+        self.admin = AuthUserFactory()
+        self.writer = AuthUserFactory()
+        self.reader = AuthUserFactory()
+        self.component_admin = AuthUserFactory()
+        self.stranger = UserFactory()
+
+        self.project = ProjectFactory(creator=self.admin)
+        self.project.add_contributor(self.writer, permissions=['read', 'write'], auth=Auth(self.admin))
+        self.project.save()
+        self.component = NodeFactory(creator=self.component_admin, parent=self.project)
+        self.component.add_contributor(self.reader, permissions=['read'], auth=Auth(self.component_admin))
+        self.component.save()
+        self.subcomponent = NodeFactory(creator=self.component_admin, parent=self.component)
+        self.public = NodeFactory(creator=self.reader, parent=self.subcomponent, is_public=True)
+        self.deleted = NodeFactory(creator=self.reader, parent=self.component)
+        self.deleted.is_deleted = True
+        self.deleted.save()
+        self.pointer = self.project.add_pointer(
+            NodeFactory(creator=self.stranger),
+            auth=Auth(self.admin),
+        )
+        self.link = PrivateLinkFactory()
+        self.link.nodes.append(self.component)
+        self.link.save()
+
+        self.nodes = [
+            self.project, self.component, self.subcomponent, self.public,
+            self.deleted, self.pointer.node,
+        ]
+        self.users = [
+            self.admin, self.writer, self.reader, self.component_admin,
+            self.stranger,
+        ]
+
+    def tearDown(self):
+        permission_resolver.resolver_teardown_request()
+        super(TestPermissionResolver, self).tearDown()
+
+    def get_answers(self):
+        answers = {}
+        for node in self.nodes:
+            for user in self.users + [None]:
+                auths = [
+                    Auth(user=user),
+                    Auth(user=user, private_key=self.link.key),
+                ]
+                key = (node._id, user._id if user else None)
+                answers[key] = [
+                    [node.can_view(auth) for auth in auths],
+                    node.can_edit(auth=auths[0]),
+                ]
+                if user is None:
+                    continue
+                answers[key].extend([
+                    node.is_admin_parent(user),
+                    node.can_read_children(user),
+                    [
+                        node.has_permission(user, permission, check_parent=check_parent)
+                        for permission in ['read', 'write', 'admin']
+                        for check_parent in [True, False]
+                    ],
+                ])
+        return answers
+
+    def test_answers_match_unresolved(self):
+        expected = self.get_answers()
+        permission_resolver.resolver_before_request()
+        assert_equal(self.get_answers(), expected)
+        # Answered again from memoized results
+        assert_equal(self.get_answers(), expected)
+
+    def test_no_resolver_outside_request_handlers(self):
+        assert_is_none(permission_resolver.get_resolver())
+
+    def test_resolver_attached_per_request(self):
+        permission_resolver.resolver_before_request()
+        assert_is_instance(permission_resolver.get_resolver(), permission_resolver.PermissionResolver)
+        permission_resolver.resolver_teardown_request()
+        assert_false(hasattr(g, '_permission_resolver'))
+
+    def test_parents_walked_once(self):
+        permission_resolver.resolver_before_request()
+        with mock.patch.object(Node, 'parent_node', new_callable=mock.PropertyMock) as parent_node:
+            parent_node.side_effect = [self.subcomponent, self.component, self.project, None]
+            assert_false(self.public.is_admin_parent(self.stranger))
+            assert_false(self.component.is_admin_parent(self.stranger))
+            assert_false(self.public.is_admin_parent(self.stranger))
+            assert_equal(parent_node.call_count, 4)
+
+    def test_admin_inherited_through_memoized_parent(self):
+        permission_resolver.resolver_before_request()
+        assert_true(self.component.is_admin_parent(self.admin))
+        assert_true(self.public.is_admin_parent(self.admin))
+        assert_true(self.public.can_view(Auth(self.admin)))
+
+    def test_add_permission_clears_resolver(self):
+        permission_resolver.resolver_before_request()
+        assert_false(self.public.is_admin_parent(self.stranger))
+        self.component.add_permission(self.stranger, 'admin')
+        assert_true(self.public.is_admin_parent(self.stranger))
+        self.component.remove_permission(self.stranger, 'admin')
+        assert_false(self.public.is_admin_parent(self.stranger))
+
+    def test_saving_permissions_clears_resolver(self):
+        permission_resolver.resolver_before_request()
+        assert_false(self.subcomponent.can_read_children(self.stranger))
+        self.public.contributors.append(self.stranger)
+        self.public.permissions[self.stranger._id] = ['read']
+        self.public.save()
+        assert_true(self.subcomponent.can_read_children(self.stranger))
+
+    def test_deleting_component_clears_resolver(self):
+        permission_resolver.resolver_before_request()
+        assert_true(self.component.can_read_children(self.reader))
+        assert_true(self.project.can_read_children(self.reader))
+        self.component.is_deleted = True
+        self.component.save()
+        assert_false(self.project.can_read_children(self.reader))
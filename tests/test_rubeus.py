@@ -2,6 +2,7 @@
 # encoding: utf-8
 
 import os
+import datetime
 from types import NoneType
 from xmlrpclib import DateTime
 
@@ -13,7 +14,8 @@ from tests.base import OsfTestCase
 from tests.factories import (UserFactory, ProjectFactory, NodeFactory,
     AuthFactory, PointerFactory, DashboardFactory, FolderFactory, RegistrationFactory)
 from framework.auth import Auth
-from website.util import rubeus, api_url_for
+from website import settings
+from website.util import rubeus, api_url_for, hgrid_cache
 import website.app
 from website.util.rubeus import sort_by_name
 from website.settings import ALL_MY_REGISTRATIONS_ID, ALL_MY_PROJECTS_ID, \
@@ -342,6 +344,86 @@ class TestSerializingNodeWithAddon(OsfTestCase):
         assert_in('baz.js', result)
 
 
+class TestHgridCache(OsfTestCase):
+
+    def setUp(self):
+        super(TestHgridCache, self).setUp()
+        hgrid_cache.get_collection().remove()
+        self.auth = AuthFactory()
+        self.project = ProjectFactory(creator=self.auth.user)
+        self.addon = mock.Mock()
+        self.addon.config.get_hgrid_data.return_value = [serialized]
+        self.project.get_addons = mock.Mock(return_value=[self.addon])
+        self.patcher = mock.patch.object(settings, 'HGRID_CACHE', True)
+        self.patcher.start()
+
+    def tearDown(self):
+        self.patcher.stop()
+        super(TestHgridCache, self).tearDown()
+
+    def collect(self, auth=None, **extra):
+        collector = rubeus.NodeFileCollector(node=self.project, auth=auth or self.auth, **extra)
+        return collector._collect_addons(self.project)
+
+    def test_cache_hit_skips_addons(self):
+        assert_equal(self.collect(), [serialized])
+        assert_equal(self.collect(), [serialized])
+        assert_equal(self.addon.config.get_hgrid_data.call_count, 1)
+
+    def test_cache_ignores_cache_busting_args(self):
+        self.collect(_='1')
+        self.collect(_='2')
+        assert_equal(self.addon.config.get_hgrid_data.call_count, 1)
+
+    def test_cache_keyed_by_permission_level(self):
+        self.collect()
+        self.project.is_public = True
+        self.collect(auth=Auth(user=None))
+        assert_equal(self.addon.config.get_hgrid_data.call_count, 2)
+
+    def test_private_link_not_cached(self):
+        auth = Auth(user=None, private_key='abc')
+        self.collect(auth=auth)
+        self.collect(auth=auth)
+        assert_equal(self.addon.config.get_hgrid_data.call_count, 2)
+        assert_equal(hgrid_cache.get_collection().count(), 0)
+
+    def test_expired_entry_ignored(self):
+        self.collect()
+        hgrid_cache.get_collection().update(
+            {'node': self.project._id},
+            {'$set': {'created': datetime.datetime.utcnow() - datetime.timedelta(days=1)}},
+            multi=True,
+        )
+        self.collect()
+        assert_equal(self.addon.config.get_hgrid_data.call_count, 2)
+
+    def test_node_change_invalidates(self):
+        self.collect()
+        self.project.set_privacy('public', auth=Auth(self.auth.user))
+        assert_equal(hgrid_cache.get_collection().find({'node': self.project._id}).count(), 0)
+        self.collect()
+        assert_equal(self.addon.config.get_hgrid_data.call_count, 2)
+
+    def test_addon_settings_change_invalidates(self):
+        self.collect()
+        self.project.get_addon('osfstorage').save()
+        assert_equal(hgrid_cache.get_collection().find({'node': self.project._id}).count(), 0)
+
+    def test_components_expanded_lazily(self):
+        component = NodeFactory(parent=self.project, creator=self.auth.user)
+        collector = rubeus.NodeFileCollector(node=self.project, auth=self.auth)
+        ret = collector._serialize_node(self.project)
+        stub = ret['children'][-1]
+        assert_equal(stub['nodeID'], component._id)
+        assert_equal(stub['children'], [])
+        assert_equal(stub['urls']['fetch'], component.api_url_for('grid_data', children=1))
+
+    def test_to_hgrid_children_only(self):
+        ret = rubeus.to_hgrid(self.project, self.auth, children_only=True)
+        assert_equal(ret, [serialized])
+
+
 class TestSerializingEmptyDashboard(OsfTestCase):
 
 
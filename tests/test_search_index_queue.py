@@ -0,0 +1,172 @@
+# -*- coding: utf-8 -*-
+"""Tests for the coalescing search update queue in website/search/index_queue.py,
+run against an in-memory stand-in for the elasticsearch client.
+"""
+
+import json
+
+import mock
+from nose.tools import *  # noqa (PEP8 asserts)
+
+from framework.auth import Auth
+
+from website import settings
+from website.search import elastic_search, index_queue, search
+
+from tests.base import OsfTestCase
+from tests.factories import AuthUserFactory, ProjectFactory
+
+
+class FakeSerializer(object):
+
+    def dumps(self, data):
+        if isinstance(data, basestring):
+            return data
+        return json.dumps(data, default=str)
+
+
+class FakeTransport(object):
+
+    serializer = FakeSerializer()
+
+
+class FakeElasticsearch(object):
+    """Minimal in-memory elasticsearch client supporting the bulk API, as
+    used by `elasticsearch.helpers.bulk`.
+    """
+
+    def __init__(self):
+        self.transport = FakeTransport()
+        self.documents = {}
+        self.bulk_calls = []
+        self.refreshes = 0
+
+    def _handle(self, op_type, meta, source):
+        key = (meta['_index'], meta['_type'], meta['_id'])
+        if op_type == 'delete':
+            if key not in self.documents:
+                return {'status': 404, 'found': False}
+            del self.documents[key]
+            return {'status': 200, 'found': True}
+        self.documents[key] = source
+        return {'status': 201}
+
+    def bulk(self, body, **kwargs):
+        if isinstance(body, basestring):
+            body = body.splitlines()
+        lines = [json.loads(line) for line in body if line]
+        self.bulk_calls.append(lines)
+        if kwargs.get('refresh'):
+            self.refreshes += 1
+        items = []
+        while lines:
+            action = lines.pop(0)
+            op_type, meta = action.items()[0]
+            source = lines.pop(0) if op_type != 'delete' else None
+            result = self._handle(op_type, meta, source)
+            result.update(meta)
+            items.append({op_type: result})
+        return {
+            'items': items,
+            'errors': any(
+                item.values()[0]['status'] >= 300 for item in items
+            ),
+        }
+
+    def get_document(self, node_id):
+        for (_, _, doc_id), source in self.documents.items():
+            if doc_id == node_id:
+                return source
+        return None
+
+
+class TestSearchIndexQueue(OsfTestCase):
+
+    def setUp(self):
+        super(TestSearchIndexQueue, self).setUp()
+        self.es = FakeElasticsearch()
+        self.patches = [
+            mock.patch.object(elastic_search, 'es', self.es),
+            mock.patch.object(search, 'search_engine', elastic_search),
+            mock.patch.object(index_queue, 'schedule_flush'),
+            mock.patch.object(settings, 'ELASTIC_QUEUE_UPDATES', True),
+            mock.patch.object(settings, 'ELASTIC_REFRESH_ON_WRITE', False),
+        ]
+        for patch in self.patches:
+            patch.start()
+        self.mock_schedule_flush = index_queue.schedule_flush
+        self.user = AuthUserFactory()
+        self.project = ProjectFactory(creator=self.user, is_public=True)
+        index_queue.flush()
+        self.mock_schedule_flush.reset_mock()
+
+    def tearDown(self):
+        for patch in reversed(self.patches):
+            patch.stop()
+        index_queue.get_collection().remove()
+        index_queue.get_stats_collection().remove()
+        super(TestSearchIndexQueue, self).tearDown()
+
+    def test_save_enqueues_instead_of_indexing(self):
+        self.es.bulk_calls = []
+        self.project.set_title('Queued', auth=Auth(self.user))
+        assert_equal(self.es.bulk_calls, [])
+        assert_equal(index_queue.get_stats()['pending'], 1)
+        assert_equal(self.mock_schedule_flush.call_count, 1)
+
+    def test_repeated_saves_are_coalesced(self):
+        for title in ['One', 'Two', 'Three']:
+            self.project.set_title(title, auth=Auth(self.user))
+        assert_equal(index_queue.get_stats()['pending'], 1)
+        assert_equal(self.mock_schedule_flush.call_count, 1)
+
+        self.es.bulk_calls = []
+        index_queue.flush()
+        assert_equal(len(self.es.bulk_calls), 1)
+        assert_equal(self.es.get_document(self.project._id)['title'], 'Three')
+
+        stats = index_queue.get_stats()
+        assert_equal(stats['pending'], 0)
+        assert_equal(stats['lag'], 0)
+        assert_greater_equal(stats['coalesced'], 2)
+
+    def test_flush_does_not_force_refresh(self):
+        self.project.set_title('Fresh', auth=Auth(self.user))
+        index_queue.flush()
+        assert_equal(self.es.refreshes, 0)
+
+    def test_private_node_is_deleted(self):
+        self.project.set_privacy('private', auth=Auth(self.user))
+        index_queue.flush()
+        assert_is_none(self.es.get_document(self.project._id))
+
+    def test_deleting_unindexed_node_is_not_an_error(self):
+        project = ProjectFactory(creator=self.user, is_public=False)
+        index_queue.enqueue_node(project._id)
+        index_queue.flush()
+        assert_equal(index_queue.get_stats()['failed'], 0)
+
+    def test_entries_requeued_when_indexing_fails(self):
+        self.project.set_title('Retry', auth=Auth(self.user))
+        with mock.patch.object(search, 'bulk_update_nodes', side_effect=ValueError):
+            with assert_raises(ValueError):
+                index_queue.flush()
+        assert_equal(index_queue.get_stats()['pending'], 1)
+        index_queue.flush()
+        assert_equal(self.es.get_document(self.project._id)['title'], 'Retry')
+
+    def test_flush_batches_by_bulk_size(self):
+        other = ProjectFactory(creator=self.user, is_public=True)
+        index_queue.enqueue_node(self.project._id)
+        index_queue.enqueue_node(other._id)
+        self.es.bulk_calls = []
+        with mock.patch.object(settings, 'ELASTIC_BULK_SIZE', 1):
+            assert_equal(index_queue.flush(), 2)
+        assert_equal(len(self.es.bulk_calls), 2)
+
+    def test_explicit_index_bypasses_queue(self):
+        self.es.bulk_calls = []
+        with mock.patch.object(self.es, 'index', create=True) as mock_index:
+            search.update_node(self.project, index='other')
+        assert_equal(mock_index.call_count, 1)
+        assert_equal(index_queue.get_stats()['pending'], 0)
@@ -17,7 +17,7 @@ from framework import utils as framework_utils
 from website.project.views.node import _get_summary, _view_project, _serialize_node_search
 from website.views import _render_node
 from website.profile import utils
-from website.views import serialize_log
+from website.views import serialize_log, serialize_logs
 from website.util import permissions
 
 
@@ -173,6 +173,36 @@ class TestNodeLogSerializers(OsfTestCase):
         assert_equal(d['params'], log.params)
         assert_equal(d['node']['title'], log.node.title)
 
+    def test_serialize_logs(self):
+        node = NodeFactory()
+        contributor = UserFactory()
+        logs = [
+            NodeLogFactory(params={'node': node._id, 'contributors': [contributor._id]}),
+            NodeLogFactory(params={'project': node._id}),
+            NodeLogFactory(params={'node': 'notanode'}, user=None, foreign_user='Someone'),
+        ]
+        serialized = serialize_logs(logs)
+        assert_equal(len(serialized), 3)
+        for log, d in zip(logs[:2], serialized):
+            assert_equal(d, serialize_log(log))
+            assert_equal(d['node']['id'], node._id)
+            assert_equal(d['user']['fullname'], log.user.fullname)
+        assert_equal(serialized[0]['contributors'][0]['id'], contributor._id)
+        assert_equal(serialized[0]['contributors'][0]['fullname'], contributor.fullname)
+        assert_equal(serialized[2]['node'], None)
+        assert_equal(serialized[2]['user'], {'fullname': 'Someone'})
+
+    def test_render_contributor_unclaimed(self):
+        node = NodeFactory()
+        log = NodeLogFactory(params={'node': node._id})
+        user = UserFactory()
+        user.unclaimed_records[node._id] = {'name': 'Unclaimed Name'}
+        assert_equal(
+            log.render_contributor(user, node)['fullname'],
+            'Unclaimed Name',
+        )
+        assert_equal(log.render_contributor(None, node), None)
+
     def test_serialize_node_for_logs(self):
         node = NodeFactory()
         d = node.serialize()
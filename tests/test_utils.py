@@ -10,7 +10,7 @@ from tests.base import OsfTestCase
 from tests.factories import RegistrationFactory
 
 from framework.routing import Rule, json_renderer
-from framework.utils import secure_filename
+from framework.utils import secure_filename, Counters, ratio
 from website.routes import process_rules, OsfWebRenderer
 from website import settings
 from website.util import paths
@@ -277,6 +277,25 @@ class TestFrameworkUtils(unittest.TestCase):
             secure_filename(u'i contain cool \xfcml\xe4uts.txt')
         )
 
+    def test_ratio(self):
+        assert_equal(ratio(1, 4), 0.25)
+        assert_equal(ratio(1, 0), 0)
+
+    def test_counters(self):
+
+        class HitCounters(Counters):
+            FIELDS = ('hits', 'misses')
+
+            def add_rates(self, counts):
+                counts['hit_rate'] = ratio(counts['hits'], counts['hits'] + counts['misses'])
+
+        counters = HitCounters()
+        counters.increment('hits', 3)
+        counters.increment('misses')
+        assert_equal(counters.to_dict(), {'hits': 3, 'misses': 1, 'hit_rate': 0.75})
+        counters.reset()
+        assert_equal(counters.to_dict(), {'hits': 0, 'misses': 0, 'hit_rate': 0})
+
 
 class TestWebpackFilter(unittest.TestCase):
 
@@ -27,7 +27,7 @@ from website import mailchimp_utils
 from website.views import _rescale_ratio
 from website.util import permissions, sanitize
 from website.models import Node, Pointer, NodeLog
-from website.project.model import ensure_schemas, has_anonymous_link
+from website.project.model import ensure_schemas, has_anonymous_link, Embargo
 from website.project.views.contributor import (
     send_claim_email,
     deserialize_contributors,
@@ -3964,6 +3964,62 @@ class TestDashboardViews(OsfTestCase):
 
         assert_equal(res.json['data'][0]['node_id'], reg._id)
 
+    def test_all_my_projects_paginated(self):
+        for title in ['Apple', 'Banana', 'Cherry']:
+            ProjectFactory(creator=self.creator, title=title)
+        url = api_url_for('get_dashboard', nid=ALL_MY_PROJECTS_ID, page=0, size=2)
+        res = self.app.get(url, auth=self.creator.auth)
+        assert_equal([each['name'] for each in res.json['data']], ['Cherry', 'Banana'])
+        url = api_url_for('get_dashboard', nid=ALL_MY_PROJECTS_ID, page=1, size=2)
+        res = self.app.get(url, auth=self.creator.auth)
+        assert_equal([each['name'] for each in res.json['data']], ['Apple'])
+
+    def test_all_my_projects_invalid_page(self):
+        url = api_url_for('get_dashboard', nid=ALL_MY_PROJECTS_ID, page=-1, size=2)
+        res = self.app.get(url, auth=self.creator.auth, expect_errors=True)
+        assert_equal(res.status_code, 400)
+
+    def test_pending_embargo_hidden_from_all_my_registrations(self):
+        reg = RegistrationFactory(project=ProjectFactory(creator=self.creator), user=self.creator)
+        embargo = Embargo(
+            initiated_by=self.creator,
+            end_date=dt.datetime.utcnow() + dt.timedelta(days=10),
+        )
+        embargo.save()
+        reg.embargo = embargo
+        reg.save()
+        url = api_url_for('get_dashboard', nid=ALL_MY_REGISTRATIONS_ID)
+        res = self.app.get(url, auth=self.creator.auth)
+        assert_equal(res.json['data'], [])
+
+        embargo.state = Embargo.ACTIVE
+        embargo.save()
+        res = self.app.get(url, auth=self.creator.auth)
+        assert_equal(res.json['data'][0]['node_id'], reg._id)
+
+    def test_get_dashboard_nodes_paginated(self):
+        project = ProjectFactory(creator=self.creator)
+        NodeFactory(creator=self.creator, parent=project)
+        url = api_url_for('get_dashboard_nodes', page=1, size=1)
+        res = self.app.get(url, auth=self.creator.auth)
+        assert_equal(len(res.json['nodes']), 1)
+        assert_not_equal(res.json['nodes'][0]['id'], project._id)
+
+    def test_get_dashboard_nodes_excludes_removed_contributor(self):
+        project = ProjectFactory(creator=self.creator)
+        project.add_contributor(self.contrib, auth=Auth(self.creator), save=True)
+        project.remove_contributor(self.contrib, auth=Auth(self.creator))
+        url = api_url_for('get_dashboard_nodes')
+        res = self.app.get(url, auth=self.contrib.auth)
+        assert_equal(res.json['nodes'], [])
+
+    def test_get_dashboard_nodes_excludes_deleted_nodes(self):
+        project = ProjectFactory(creator=self.creator)
+        project.remove_node(Auth(self.creator))
+        url = api_url_for('get_dashboard_nodes')
+        res = self.app.get(url, auth=self.creator.auth)
+        assert_equal(res.json['nodes'], [])
+
     def test_untouched_node_is_collapsed(self):
         found_item = False
         folder = FolderFactory(creator=self.creator, public=True)
@@ -9,6 +9,7 @@ from pytz import utc
 from nose.tools import *  # flake8: noqa (PEP8 asserts)
 from framework.auth import Auth
 from framework.exceptions import HTTPError
+from framework.auth import watched_logs
 from tests.base import OsfTestCase
 from tests.factories import (UserFactory, ProjectFactory,
                              WatchConfigFactory)
@@ -86,6 +87,44 @@ class TestWatching(OsfTestCase):
         day_log_ids = list(self.user.get_daily_digest_log_ids())
         assert_in(self.last_log._id, day_log_ids)
 
+    def test_new_logs_fan_out_to_watchers(self):
+        self._watch_project(self.project)
+        log = self.project.add_log(
+            'tag_added',
+            params={'project': self.project._primary_key},
+            auth=self.consolidate_auth,
+            save=True,
+        )
+        assert_equal(next(self.user.get_recent_log_ids()), log._id)
+        assert_equal(self.user.count_recent_logs(), 3)
+
+    def test_unwatch_removes_logs_from_timeline(self):
+        self._watch_project(self.project)
+        self.user.unwatch(WatchConfigFactory(node=self.project))
+        assert_equal(list(self.user.get_recent_log_ids()), [])
+        assert_equal(self.user.count_recent_logs(), 0)
+
+    def test_removed_logs_are_retracted(self):
+        self._watch_project(self.project)
+        self.project.logs.remove(self.last_log)
+        self.project.save()
+        assert_not_in(self.last_log._id, list(self.user.get_recent_log_ids()))
+
+    def test_timeline_entries_are_dated_for_expiry(self):
+        self._watch_project(self.project)
+        entry = watched_logs.get_collection().find_one({'log': self.last_log._id})
+        assert_is_not_none(entry['date'])
+
+    def test_prune_removes_undated_expired_entries(self):
+        old_id = watched_logs.log_id_since(utc.localize(dt.datetime.utcnow() - dt.timedelta(days=100)))
+        collection = watched_logs.get_collection()
+        collection.insert({'_id': 'old', 'user': self.user._id, 'log': old_id, 'nodes': [self.project._id]})
+        self._watch_project(self.project)
+        collection.update({'log': self.last_log._id}, {'$unset': {'date': True}})
+        watched_logs.prune()
+        assert_is_none(collection.find_one({'_id': 'old'}))
+        assert_is_not_none(collection.find_one({'log': self.last_log._id}))
+
     def _watch_project(self, project):
         watch_config = WatchConfigFactory(node=project)
         self.user.watch(watch_config)
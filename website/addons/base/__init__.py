@@ -26,7 +26,10 @@ from framework.exceptions import (
 from website import settings
 from website.addons.base import exceptions
 from website.addons.base import serializer
+from website.addons.base import metadata_cache
 from website.project.model import Node
+from website.util import hgrid_cache
+from website.util import waterbutler_auth_cache
 from website.util import waterbutler_url_for
 
 from website.oauth.signals import oauth_complete
@@ -366,15 +369,31 @@ class GuidFile(GuidStoredObject):
 
         raise exceptions.AddonEnrichmentError(response.status_code)
 
+    def _exception_from_metadata(self, metadata):
+        """Raise for cached metadata as `_exception_from_response` would for
+        the successful response it was read from.
+        """
+        pass
+
     def _fetch_metadata(self, should_raise=False):
-        # Note: We should look into caching this at some point
-        # Some attributes may change however.
-        resp = requests.get(self.metadata_url)
+        cache_args = (self.provider, self.node._id, self.waterbutler_path, self.revision)
+        if settings.WATERBUTLER_METADATA_CACHE:
+            metadata = metadata_cache.load(*cache_args, url=self.metadata_url)
+            if metadata is not None:
+                if should_raise:
+                    self._exception_from_metadata(metadata)
+                self._metadata_cache = metadata
+                return
+
+        resp = metadata_cache.get(self.metadata_url)
 
         if should_raise:
             self._exception_from_response(resp)
         self._metadata_cache = resp.json()['data']
 
+        if resp.ok and settings.WATERBUTLER_METADATA_CACHE:
+            metadata_cache.store(*cache_args, data=self._metadata_cache)
+
 
 class AddonSettingsBase(StoredObject):
 
@@ -434,6 +453,13 @@ class AddonUserSettingsBase(AddonSettingsBase):
     def public_id(self):
         return None
 
+    def save(self, *args, **kwargs):
+        rv = super(AddonUserSettingsBase, self).save(*args, **kwargs)
+        # Settings granted to the nodes this user authorized may have changed
+        for node in self.nodes_authorized:
+            waterbutler_auth_cache.invalidate(node_id=node._id, provider=self.config.short_name)
+        return rv
+
     @property
     def has_auth(self):
         """Whether the user has added credentials for this addon."""
@@ -688,6 +714,14 @@ class AddonNodeSettingsBase(AddonSettingsBase):
         """Whether the node has added credentials for this addon."""
         return False
 
+    def save(self, *args, **kwargs):
+        rv = super(AddonNodeSettingsBase, self).save(*args, **kwargs)
+        # Configuration changes may change the node's file tree
+        if self.owner:
+            hgrid_cache.invalidate(self.owner._id)
+            waterbutler_auth_cache.invalidate(node_id=self.owner._id, provider=self.config.short_name)
+        return rv
+
     def to_json(self, user):
         ret = super(AddonNodeSettingsBase, self).to_json(user)
         ret.update({
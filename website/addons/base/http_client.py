@@ -0,0 +1,277 @@
+# -*- coding: utf-8 -*-
+"""Shared HTTP layer for third-party add-on API clients.
+
+`mount` attaches an adapter to a `requests` session that
+
+- draws connections from a pool shared by all sessions of the provider,
+- caches responses in the backend selected by ``ADDON_HTTP_CACHE_BACKEND``,
+  revalidating stale entries with their ETags, and
+- records per-provider hit, miss and latency counters, see `get_stats`.
+
+Responses are cached under a namespace, so that responses fetched with one
+user's credentials are never served to another; authenticated clients must
+pass their access token or account id as ``namespace``.
+
+Cache backends:
+
+- ``'memory'``: an in-process LRU cache of at most
+  ``ADDON_HTTP_CACHE_MAX_BYTES`` of responses
+- ``'file'``: files in ``ADDON_HTTP_CACHE_DIR``, shared by the workers of a
+  host; requires the `lockfile` package
+- ``'redis'``: a Redis-compatible server at ``ADDON_HTTP_CACHE_REDIS_URL``,
+  shared by all workers; requires the `redis` package
+- `None`: no caching
+"""
+
+import time
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+
+import requests
+from requests.adapters import HTTPAdapter
+from cachecontrol import CacheControlAdapter
+from cachecontrol.cache import BaseCache
+
+from framework.utils import Counters, ratio
+from website import settings
+
+
+logger = logging.getLogger(__name__)
+
+
+class LRUCache(BaseCache):
+    """In-process response cache bounded by the total size of the stored
+    responses. Entries older than ``ttl`` seconds are dropped even if their
+    responses are still fresh.
+    """
+
+    def __init__(self, max_bytes, ttl):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.size = 0
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()
+
+    def get(self, key):
+        with self.lock:
+            try:
+                stored, value = self.entries.pop(key)
+            except KeyError:
+                return None
+            if time.time() - stored > self.ttl:
+                self.size -= len(value)
+                return None
+            self.entries[key] = (stored, value)
+            return value
+
+    def set(self, key, value):
+        if len(value) > self.max_bytes:
+            return
+        with self.lock:
+            self._pop(key)
+            self.entries[key] = (time.time(), value)
+            self.size += len(value)
+            while self.size > self.max_bytes:
+                _, (_, evicted) = self.entries.popitem(last=False)
+                self.size -= len(evicted)
+
+    def delete(self, key):
+        with self.lock:
+            self._pop(key)
+
+    def _pop(self, key):
+        entry = self.entries.pop(key, None)
+        if entry is not None:
+            self.size -= len(entry[1])
+
+
+class RedisCache(BaseCache):
+    """Response cache in a Redis-compatible server."""
+
+    PREFIX = 'addonhttp:'
+
+    def __init__(self, url, ttl):
+        import redis
+        self.client = redis.StrictRedis.from_url(url)
+        self.ttl = ttl
+
+    def get(self, key):
+        return self.client.get(self.PREFIX + key)
+
+    def set(self, key, value):
+        self.client.setex(self.PREFIX + key, self.ttl, value)
+
+    def delete(self, key):
+        self.client.delete(self.PREFIX + key)
+
+
+class NamespacedCache(BaseCache):
+    """View of a shared cache with keys prefixed by a namespace."""
+
+    def __init__(self, cache, namespace):
+        self.cache = cache
+        self.namespace = namespace
+
+    def get(self, key):
+        return self.cache.get(self.namespace + key)
+
+    def set(self, key, value):
+        self.cache.set(self.namespace + key, value)
+
+    def delete(self, key):
+        self.cache.delete(self.namespace + key)
+
+
+class RequestStats(Counters):
+    """Thread-safe request counters of a single provider. A hit is a response
+    served from the cache, including one revalidated by a 304.
+    """
+    FIELDS = ('requests', 'hits', 'misses', 'seconds')
+
+    def add_rates(self, counts):
+        counts['mean_seconds'] = ratio(counts['seconds'], counts['requests'])
+
+
+class ProviderStats(object):
+    """`RequestStats`, keyed by provider."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.providers = {}
+
+    def record(self, provider, hit, seconds):
+        # Hold the lock so that `to_dict` sees each request whole
+        with self._lock:
+            counters = self.providers.setdefault(provider, RequestStats())
+            counters.increment('requests')
+            counters.increment('hits' if hit else 'misses')
+            counters.increment('seconds', seconds)
+
+    def to_dict(self):
+        with self._lock:
+            return dict(
+                (provider, counters.to_dict())
+                for provider, counters in self.providers.iteritems()
+            )
+
+
+stats = ProviderStats()
+
+
+def get_stats():
+    """Return request counters and mean latency for each provider."""
+    return stats.to_dict()
+
+
+class MetricsMixin(object):
+
+    def send(self, request, **kwargs):
+        start = time.time()
+        response = super(MetricsMixin, self).send(request, **kwargs)
+        stats.record(
+            self.provider,
+            getattr(response, 'from_cache', False),
+            time.time() - start,
+        )
+        return response
+
+
+class MeteredAdapter(MetricsMixin, HTTPAdapter):
+
+    def __init__(self, provider, **kwargs):
+        self.provider = provider
+        super(MeteredAdapter, self).__init__(**kwargs)
+
+
+class MeteredCacheAdapter(MetricsMixin, CacheControlAdapter):
+
+    def __init__(self, provider, cache, **kwargs):
+        self.provider = provider
+        super(MeteredCacheAdapter, self).__init__(cache=cache, cache_etags=True, **kwargs)
+
+
+_caches = {}
+_pools = {}
+_lock = threading.Lock()
+
+
+def get_cache():
+    """Return the configured response cache, or `None`."""
+    backend = settings.ADDON_HTTP_CACHE_BACKEND
+    if backend is None:
+        return None
+    with _lock:
+        if backend not in _caches:
+            if backend == 'memory':
+                _caches[backend] = LRUCache(
+                    settings.ADDON_HTTP_CACHE_MAX_BYTES,
+                    settings.ADDON_HTTP_CACHE_TTL,
+                )
+            elif backend == 'file':
+                from cachecontrol.caches import FileCache
+                _caches[backend] = FileCache(settings.ADDON_HTTP_CACHE_DIR)
+            elif backend == 'redis':
+                _caches[backend] = RedisCache(
+                    settings.ADDON_HTTP_CACHE_REDIS_URL,
+                    settings.ADDON_HTTP_CACHE_TTL,
+                )
+            else:
+                raise ValueError('Unknown add-on HTTP cache backend {0!r}'.format(backend))
+        return _caches[backend]
+
+
+def _get_pool_manager(provider):
+    with _lock:
+        if provider not in _pools:
+            _pools[provider] = HTTPAdapter(
+                pool_connections=settings.ADDON_HTTP_POOL_CONNECTIONS,
+                pool_maxsize=settings.ADDON_HTTP_POOL_MAXSIZE,
+            ).poolmanager
+        return _pools[provider]
+
+
+def get_adapter(provider, namespace=None, cache=True):
+    """Return an adapter for requests to ``provider``.
+
+    :param str provider: Short name of the provider, e.g. ``'github'``
+    :param str namespace: Credentials or account id the requests are made
+        with; responses are only shared between adapters with the same
+        provider and namespace
+    :param bool cache: Cache responses, if a cache backend is configured
+    """
+    backend = get_cache() if cache else None
+    if backend is None:
+        adapter = MeteredAdapter(provider)
+    else:
+        digest = hashlib.sha1(namespace or '').hexdigest()
+        adapter = MeteredCacheAdapter(
+            provider,
+            NamespacedCache(backend, '{0}:{1}:'.format(provider, digest)),
+        )
+    # Share connections with every other adapter of the provider
+    adapter.poolmanager = _get_pool_manager(provider)
+    return adapter
+
+
+def mount(session, provider, namespace=None, prefixes=('https://', 'http://'), cache=True):
+    """Route requests of ``session`` through the shared adapter layer.
+
+    :param requests.Session session: Session to mount on, e.g. an
+        `OAuth1Session`
+    :return: ``session``
+    """
+    adapter = get_adapter(provider, namespace=namespace, cache=cache)
+    for prefix in prefixes:
+        session.mount(prefix, adapter)
+    return session
+
+
+def get_session(provider, namespace=None, cache=True):
+    """Return a new `requests.Session` using the shared adapter layer."""
+    return mount(requests.Session(), provider, namespace=namespace, cache=cache)
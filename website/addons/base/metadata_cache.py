@@ -0,0 +1,200 @@
+# -*- coding: utf-8 -*-
+"""Cache of the file metadata that `GuidFile` fetches from WaterButler.
+
+Every view of a file asks WaterButler, and through it the storage provider,
+for the file's metadata. Successful responses are cached per (provider, node,
+path, revision):
+
+    {
+        '_id': '<provider>:<node_id>:<revision>:<path>',
+        'provider': '<provider>',
+        'node': '<node_id>',
+        'path': '<WaterButler path>',
+        'revision': '<revision>',  # Or None
+        'data': '<JSON-encoded metadata>',
+        'fetched': <datetime>,
+    }
+
+Entries are fresh for ``WATERBUTLER_METADATA_CACHE_TTL`` seconds, looked up
+by provider with a fallback to ``'default'``. Stale entries younger than
+``WATERBUTLER_METADATA_CACHE_STALE_TTL`` seconds are still served while a
+background thread fetches the metadata again. Entries are dropped when
+WaterButler reports a change to the file through `create_waterbutler_log`.
+
+Entries are shared between users: callers must check that the user may read
+the node before looking up its files. Hit and miss counters of the current
+process are available from `get_stats`.
+"""
+
+import re
+import json
+import logging
+import datetime
+import threading
+
+from framework.mongo import database
+from framework.mongo.utils import save_cache_entry
+from framework.utils import Counters, ratio
+
+from website import settings
+from website.addons.base import http_client
+
+
+logger = logging.getLogger(__name__)
+
+COLLECTION_NAME = 'waterbutlermetadata'
+
+
+class MetadataStats(Counters):
+    """Thread-safe cache counters of this process."""
+    FIELDS = ('hits', 'stale_hits', 'misses', 'revalidations', 'invalidations')
+
+    def add_rates(self, counts):
+        hits = counts['hits'] + counts['stale_hits']
+        counts['hit_rate'] = ratio(hits, hits + counts['misses'])
+
+
+stats = MetadataStats()
+
+
+def get_stats():
+    """Return hit, miss, revalidation and invalidation counts and the hit rate
+    of the current process.
+    """
+    return stats.to_dict()
+
+
+def get_collection(db=None):
+    return (db or database)[COLLECTION_NAME]
+
+
+def ensure_indices(db=None):
+    collection = get_collection(db)
+    collection.ensure_index([('node', 1), ('provider', 1), ('path', 1)])
+    collection.ensure_index('fetched', expireAfterSeconds=settings.WATERBUTLER_METADATA_CACHE_STALE_TTL)
+
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_session():
+    """Return the process-wide session used to talk to WaterButler."""
+    global _session
+    with _session_lock:
+        if _session is None:
+            _session = http_client.get_session('waterbutler', cache=False)
+        return _session
+
+
+def get(url):
+    """Fetch ``url`` from WaterButler over a pooled connection."""
+    return get_session().get(url)
+
+
+def get_ttl(provider):
+    """Return the number of seconds the metadata of ``provider`` stays fresh."""
+    ttls = settings.WATERBUTLER_METADATA_CACHE_TTL
+    return ttls.get(provider, ttls['default'])
+
+
+def _entry_id(provider, node_id, path, revision):
+    return '{0}:{1}:{2}:{3}'.format(provider, node_id, revision or '', path)
+
+
+# Ids of the entries being revalidated by this process
+_revalidating = set()
+_revalidating_lock = threading.Lock()
+
+
+def load(provider, node_id, path, revision, url, db=None):
+    """Return the cached metadata of a file, or `None`. If the metadata is
+    stale, fetch it again from ``url`` in the background.
+    """
+    entry_id = _entry_id(provider, node_id, path, revision)
+    entry = get_collection(db).find_one({'_id': entry_id})
+    if entry is None:
+        stats.increment('misses')
+        return None
+    age = datetime.datetime.utcnow() - entry['fetched']
+    if age <= datetime.timedelta(seconds=get_ttl(provider)):
+        stats.increment('hits')
+        return json.loads(entry['data'])
+    if age > datetime.timedelta(seconds=settings.WATERBUTLER_METADATA_CACHE_STALE_TTL):
+        stats.increment('misses')
+        return None
+    stats.increment('stale_hits')
+    _start_revalidation(provider, node_id, path, revision, url, db=db)
+    return json.loads(entry['data'])
+
+
+def store(provider, node_id, path, revision, data, db=None):
+    """Cache the metadata of a file."""
+    save_cache_entry(get_collection(db), {
+        '_id': _entry_id(provider, node_id, path, revision),
+        'provider': provider,
+        'node': node_id,
+        'path': path,
+        'revision': revision,
+        'data': json.dumps(data),
+        'fetched': datetime.datetime.utcnow(),
+    }, 'metadata of {0}'.format(path))
+
+
+def revalidate(provider, node_id, path, revision, url, db=None):
+    """Fetch the metadata of a file from ``url`` and cache it. The cached
+    entry is dropped if WaterButler no longer returns the file.
+    """
+    stats.increment('revalidations')
+    try:
+        resp = get(url)
+    except Exception as error:
+        logger.warning('Could not revalidate metadata of {0}: {1}'.format(path, error))
+        return
+    if resp.ok:
+        store(provider, node_id, path, revision, resp.json()['data'], db=db)
+    elif 400 <= resp.status_code < 500:
+        get_collection(db).remove({'_id': _entry_id(provider, node_id, path, revision)})
+
+
+def _revalidate_once(entry_id, *args, **kwargs):
+    try:
+        revalidate(*args, **kwargs)
+    finally:
+        with _revalidating_lock:
+            _revalidating.discard(entry_id)
+
+
+def _start_revalidation(provider, node_id, path, revision, url, db=None):
+    entry_id = _entry_id(provider, node_id, path, revision)
+    with _revalidating_lock:
+        if entry_id in _revalidating:
+            return
+        _revalidating.add(entry_id)
+    thread = threading.Thread(
+        target=_revalidate_once,
+        args=(entry_id, provider, node_id, path, revision, url),
+        kwargs={'db': db},
+    )
+    thread.daemon = True
+    thread.start()
+
+
+def invalidate(node_id, provider=None, path=None, db=None):
+    """Drop the cached metadata of a node's files, optionally only those of a
+    provider or of a path. A path ending in a slash is a folder and drops the
+    metadata of everything in it.
+
+    :param str path: WaterButler path, with or without a leading slash
+    """
+    query = {'node': node_id}
+    if provider is not None:
+        query['provider'] = provider
+    if path is not None:
+        path = '/' + path.lstrip('/')
+        if path.endswith('/'):
+            query['path'] = {'$regex': '^' + re.escape(path)}
+        else:
+            query['path'] = path
+    get_collection(db).remove(query)
+    stats.increment('invalidations')
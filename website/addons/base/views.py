@@ -22,8 +22,11 @@ from website import mails
 from website import settings
 from website.project import decorators
 from website.addons.base import exceptions
+from website.addons.base import metadata_cache
+from website.conferences import submissions as conference_submissions
 from website.models import User, Node, NodeLog
 from website.util import rubeus
+from website.util import waterbutler_auth_cache
 from website.profile.utils import get_gravatar
 from website.project.decorators import must_be_valid_project, must_be_contributor_or_public
 from website.project.utils import serialize_node
@@ -158,38 +161,52 @@ def get_auth(**kwargs):
     view_only = request.args.get('view_only')
 
     if 'auth_user_id' in session.data:
-        user = User.load(session.data['auth_user_id'])
+        user_id = session.data['auth_user_id']
     elif cookie:
-        user = User.from_cookie(cookie)
+        user_id = User.user_id_from_cookie(cookie)
     else:
-        user = None
+        user_id = None
+
+    # Grants through view-only links depend on the link staying active
+    use_cache = settings.WATERBUTLER_AUTH_CACHE and not view_only
+    grant = None
+    if use_cache:
+        grant = waterbutler_auth_cache.load(node_id, provider_name, action, user_id)
 
     node = Node.load(node_id)
     if not node:
         raise HTTPError(httplib.NOT_FOUND)
 
-    check_access(node, user, action, key=view_only)
+    if grant is None:
+        user = User.load(user_id) if user_id else None
+        check_access(node, user, action, key=view_only)
 
     provider_settings = node.get_addon(provider_name)
     if not provider_settings:
         raise HTTPError(httplib.BAD_REQUEST)
 
+    # Credentials are not cached, so revoked or refreshed credentials take
+    # effect immediately
     try:
         credentials = provider_settings.serialize_waterbutler_credentials()
-        settings = provider_settings.serialize_waterbutler_settings()
+        if grant is None:
+            waterbutler_settings = provider_settings.serialize_waterbutler_settings()
     except exceptions.AddonError:
         log_exception()
         raise HTTPError(httplib.BAD_REQUEST)
 
-    return {
-        'auth': make_auth(user),
-        'credentials': credentials,
-        'settings': settings,
-        'callback_url': node.api_url_for(
-            ('create_waterbutler_log' if not node.is_registration else 'registration_callbacks'),
-            _absolute=True,
-        ),
-    }
+    if grant is None:
+        grant = {
+            'auth': make_auth(user),
+            'settings': waterbutler_settings,
+            'callback_url': node.api_url_for(
+                ('create_waterbutler_log' if not node.is_registration else 'registration_callbacks'),
+                _absolute=True,
+            ),
+        }
+        if use_cache:
+            waterbutler_auth_cache.store(node, provider_name, action, user_id, grant)
+    return dict(grant, credentials=credentials)
 
 
 LOG_ACTION_MAP = {
@@ -266,6 +283,12 @@ def create_waterbutler_log(payload, **kwargs):
             'project': destination_node.parent_id,
         })
 
+        metadata_cache.invalidate(source_node._id, payload['source']['provider'], payload['source']['path'])
+        metadata_cache.invalidate(destination_node._id, payload['destination']['provider'], payload['destination']['path'])
+        for bundle, each_node in (('source', source_node), ('destination', destination_node)):
+            if payload[bundle]['provider'] == 'osfstorage':
+                conference_submissions.update_file(each_node)
+
         if not payload.get('errors'):
             destination_node.add_log(
                 action=action,
@@ -296,6 +319,9 @@ def create_waterbutler_log(payload, **kwargs):
         if node_addon is None:
             raise HTTPError(httplib.BAD_REQUEST)
 
+        metadata_cache.invalidate(node._id, payload['provider'], metadata['path'])
+        if payload['provider'] == 'osfstorage':
+            conference_submissions.update_file(node)
         metadata['path'] = metadata['path'].lstrip('/')
 
         node_addon.create_waterbutler_log(auth, action, metadata)
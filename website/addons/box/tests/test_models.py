@@ -35,7 +35,7 @@ class TestFileGuid(OsfTestCase):
         assert_equals(guid.path, '1234567890/foo/bar')
         assert_equals(guid.waterbutler_path, '/1234567890/foo/bar')
 
-    @mock.patch('website.addons.base.requests.get')
+    @mock.patch('website.addons.base.metadata_cache.get')
     def test_unique_identifier(self, mock_get):
         uid = '#!'
         mock_response = mock.Mock(ok=True, status_code=200)
@@ -52,7 +52,7 @@ class TestFileGuid(OsfTestCase):
         guid.enrich()
         assert_equals(uid, guid.unique_identifier)
 
-    @mock.patch('website.addons.base.requests.get')
+    @mock.patch('website.addons.base.metadata_cache.get')
     def test_unique_identifier_version(self, mock_get):
         uid = '#!'
         mock_response = mock.Mock(ok=True, status_code=200)
@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+"""Cache of the citations in the folders of citation manager accounts.
+
+Loading a folder in the citations widget otherwise downloads every document
+in it from the provider on each view. The converted citations of each folder
+are cached per external account:
+
+    {
+        '_id': '<provider>:<account_id>:<list_id>',
+        'account': '<account_id>',
+        'citations': '<JSON-encoded list of CSL citations>',
+        'state': <provider-specific sync state>,
+        'checked': <datetime>,
+    }
+
+Entries younger than ``CITATION_CACHE_FRESH`` seconds are served as they are.
+Older entries are brought up to date by the provider's `refresh_list`, which
+only downloads what changed since the sync state was recorded. Entries that
+are not loaded for ``CITATION_CACHE_TTL`` seconds expire.
+
+Providers implement
+
+- ``fetch_list(list_id)``, returning ``(citations, state)``
+- ``refresh_list(list_id, citations, state)``, returning the same
+"""
+
+import json
+import datetime
+
+from framework.mongo import database
+from framework.mongo.utils import save_cache_entry
+
+from website import settings
+
+
+COLLECTION_NAME = 'citationcache'
+
+
+def get_collection(db=None):
+    return (db or database)[COLLECTION_NAME]
+
+
+def ensure_indices(db=None):
+    get_collection(db).ensure_index('checked', expireAfterSeconds=settings.CITATION_CACHE_TTL)
+
+
+def _entry_id(api, list_id):
+    return '{0}:{1}:{2}'.format(api.short_name, api.account._id, list_id)
+
+
+def get_list(api, list_id, db=None):
+    """Return the citations in a folder of the account of ``api``.
+
+    :param ExternalProvider api: Citation provider with an account
+    :param str list_id: Provider id of the folder, or ``'ROOT'``
+    :return list: CSL citations
+    """
+    if not settings.CITATION_CACHE:
+        return api.get_list(list_id)
+
+    entry_id = _entry_id(api, list_id)
+    entry = get_collection(db).find_one({'_id': entry_id})
+    now = datetime.datetime.utcnow()
+    if entry is None:
+        citations, state = api.fetch_list(list_id)
+    else:
+        citations = json.loads(entry['citations'])
+        age = now - entry['checked']
+        if age < datetime.timedelta(seconds=settings.CITATION_CACHE_FRESH):
+            return citations
+        citations, state = api.refresh_list(list_id, citations, entry['state'])
+
+    save_cache_entry(get_collection(db), {
+        '_id': entry_id,
+        'account': api.account._id,
+        'citations': json.dumps(citations),
+        'state': state,
+        'checked': now,
+    }, 'citations of {0}'.format(entry_id))
+    return citations
@@ -5,6 +5,7 @@ from framework.exceptions import HTTPError
 from framework.exceptions import PermissionsError
 
 from website.oauth.models import ExternalAccount
+from website.addons.citations import cache
 
 class CitationsProvider(object):
 
@@ -143,7 +144,7 @@ class CitationsProvider(object):
                         node_settings=node_addon,
                         user_settings=user_settings,
                     ).serialize_citation(each)
-                    for each in node_addon.api.get_list(list_id)
+                    for each in cache.get_list(node_addon.api, list_id)
                 ]
 
         return {
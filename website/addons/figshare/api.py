@@ -1,10 +1,10 @@
 import os
 import json
 
-import requests
 from requests_oauthlib import OAuth1Session
 
 from website.util.sanitize import escape_html
+from website.addons.base import http_client
 
 from . import settings as figshare_settings
 
@@ -17,7 +17,7 @@ class Figshare(object):
     def __init__(self, client_token=None, client_secret=None, owner_token=None, owner_secret=None):
         # if no OAuth
         if owner_token is None:
-            self.session = requests
+            self.session = http_client.get_session('figshare')
         else:
             self.client_token = client_token
             self.client_secret = client_secret
@@ -31,6 +31,7 @@ class Figshare(object):
                 resource_owner_secret=owner_secret,
                 signature_type='auth_header'
             )
+            http_client.mount(self.session, 'figshare', namespace=owner_token)
         self.last_error = None
 
     @classmethod
@@ -53,6 +54,10 @@ class Figshare(object):
     def _send(self, url, method='get', output='json', cache=True, **kwargs):
         func = getattr(self.session, method.lower())
 
+        if not cache:
+            # Revalidate rather than use a cached response
+            kwargs['headers'] = dict(kwargs.get('headers') or {}, **{'Cache-Control': 'no-cache'})
+
         # Send request
         req = func(url, **kwargs)
 
@@ -131,7 +136,9 @@ class Figshare(object):
         return articles, 200
 
     def article_is_public(self, article):
-        res = requests.get(os.path.join(figshare_settings.API_URL, 'articles', str(article)))
+        res = http_client.get_session('figshare').get(
+            os.path.join(figshare_settings.API_URL, 'articles', str(article))
+        )
         if res.status_code == 200:
             data = json.loads(res.content)
             if data['count'] == 0:
@@ -53,14 +53,20 @@ class FigShareGuidFile(GuidFile):
 
     def _exception_from_response(self, response):
         try:
-            if response.json()['data']['extra']['status'] == 'drafts':
-                self._metadata_cache = response.json()['data']
-                raise fig_exceptions.FigshareIsDraftError(self)
+            self._exception_from_metadata(response.json()['data'])
         except KeyError:
             pass
 
         super(FigShareGuidFile, self)._exception_from_response(response)
 
+    def _exception_from_metadata(self, metadata):
+        try:
+            if metadata['extra']['status'] == 'drafts':
+                self._metadata_cache = metadata
+                raise fig_exceptions.FigshareIsDraftError(self)
+        except KeyError:
+            pass
+
     @property
     def version_identifier(self):
         return ''
@@ -2,18 +2,12 @@ import urllib
 import itertools
 
 import github3
-import cachecontrol
-from requests.adapters import HTTPAdapter
 
+from website.addons.base import http_client
 from website.addons.github import settings as github_settings
 from website.addons.github.exceptions import NotFoundError
 
 
-# Initialize caches
-https_cache = cachecontrol.CacheControlAdapter()
-default_adapter = HTTPAdapter()
-
-
 class GitHub(object):
 
     def __init__(self, access_token=None, token_type=None):
@@ -27,10 +21,15 @@ class GitHub(object):
         else:
             self.gh3 = github3.GitHub()
 
-        # Caching libary
-        if github_settings.CACHE:
-            self.gh3._session.mount('https://api.github.com/user', default_adapter)
-            self.gh3._session.mount('https://', https_cache)
+        http_client.mount(
+            self.gh3._session, 'github',
+            namespace=access_token, cache=github_settings.CACHE,
+        )
+        # Never cache the authenticated user
+        http_client.mount(
+            self.gh3._session, 'github',
+            prefixes=['https://api.github.com/user'], cache=False,
+        )
 
     @classmethod
     def from_settings(cls, settings):
@@ -65,7 +65,7 @@ class TestFileGuid(OsfTestCase):
         assert_equals(guid.path, '/baz/foo/bar')
         assert_equals(guid.waterbutler_path, '/foo/bar')
 
-    @mock.patch('website.addons.base.requests.get')
+    @mock.patch('website.addons.base.metadata_cache.get')
     def test_unique_identifier(self, mock_get):
         mock_response = mock.Mock(ok=True, status_code=200)
         mock_get.return_value = mock_response
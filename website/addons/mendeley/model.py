@@ -1,12 +1,15 @@
 # -*- coding: utf-8 -*-
 
 import time
+import datetime
+import collections
 
 import mendeley
 from modularodm import fields
 
 from website.addons.base import AddonOAuthNodeSettingsBase
 from website.addons.base import AddonOAuthUserSettingsBase
+from website.addons.base import http_client
 from website.addons.citations.utils import serialize_folder
 from website.addons.mendeley import serializer
 from website.addons.mendeley import settings
@@ -15,6 +18,12 @@ from website.oauth.models import ExternalProvider
 from website.util import web_url_for
 
 
+API_URL = 'https://api.mendeley.com'
+DOCUMENT_TYPE = 'application/vnd.mendeley-document.1+json'
+# Largest page size allowed by the API
+PAGE_SIZE = 500
+SYNC_MARGIN = datetime.timedelta(minutes=5)
+
 class Mendeley(ExternalProvider):
     name = 'Mendeley'
     short_name = 'mendeley'
@@ -50,6 +59,10 @@ class Mendeley(ExternalProvider):
                                          _absolute=True),
             )
             self._client = APISession(partial, credentials)
+            http_client.mount(
+                self._client, 'mendeley',
+                namespace=credentials.get('access_token'),
+            )
 
         return self._client
 
@@ -60,6 +73,10 @@ class Mendeley(ExternalProvider):
 
         return client.folders.list().items
 
+    def _folder_metadata(self, folder_id):
+        folder = self.client.folders.get(folder_id)
+        return folder
+
     @property
     def client(self):
         """An API session with Mendeley"""
@@ -93,47 +110,95 @@ class Mendeley(ExternalProvider):
         :param str list_id: ID for a Mendeley folder. Optional.
         :return CitationList: CitationList for the folder, or for all documents
         """
+        return self.fetch_list(list_id)[0]
+
+    def fetch_list(self, list_id='ROOT'):
+        """Get the citations in a folder, and the state to refresh them from
+        with `refresh_list`.
+        """
+        since = self._sync_time()
         if list_id == 'ROOT':
-            folder = None
+            documents = self._iter_documents()
         else:
-            folder = self.client.folders.get(list_id)
-
-        if folder:
-            return self._citations_for_mendeley_folder(folder)
-        return self._citations_for_mendeley_user()
+            documents = self._iter_documents(folder_id=list_id)
+        citations = [
+            self._citation_for_mendeley_document(document)
+            for document in documents
+        ]
+        return citations, {'since': since}
 
-    def _folder_metadata(self, folder_id):
-        folder = self.client.folders.get(folder_id)
-        return folder
+    def refresh_list(self, list_id, citations, state):
+        """Update citations returned by `fetch_list`, downloading only the
+        documents modified since.
+        """
+        since = self._sync_time()
+        if list_id == 'ROOT':
+            changed = self._iter_documents(modified_since=state['since'])
+            deleted = set(
+                document['id']
+                for document in self._iter_documents(deleted_since=state['since'])
+            )
+            document_ids = None
+        else:
+            changed = self._iter_documents(folder_id=list_id, modified_since=state['since'])
+            deleted = set()
+            # Documents added to or removed from a folder are not modified,
+            # so membership is listed separately
+            document_ids = [
+                document['id']
+                for document in self._iter_pages('folders/{0}/documents'.format(list_id))
+            ]
 
-    def _citations_for_mendeley_folder(self, folder):
+        citations_by_id = collections.OrderedDict(
+            (citation['id'], citation)
+            for citation in citations
+            if citation['id'] not in deleted
+        )
+        for document in changed:
+            citations_by_id[document['id']] = self._citation_for_mendeley_document(document)
+
+        if document_ids is None:
+            return citations_by_id.values(), {'since': since}
+        if any(each not in citations_by_id for each in document_ids):
+            # Documents added to the folder without being modified
+            return self.fetch_list(list_id)
+        return [citations_by_id[each] for each in document_ids], {'since': since}
+
+    def _sync_time(self):
+        """Timestamp to request changes since on the next refresh. Changes
+        are requested with some overlap to allow for clock skew.
+        """
+        since = datetime.datetime.utcnow() - SYNC_MARGIN
+        return since.strftime('%Y-%m-%dT%H:%M:%S.000Z')
 
-        document_ids = [
-            document.id
-            for document in folder.documents.iter(page_size=500)
-        ]
-        citations = {
-            citation['id']: citation
-            for citation in self._citations_for_mendeley_user()
-        }
-        return map(lambda id: citations[id], document_ids)
+    def _iter_documents(self, **params):
+        return self._iter_pages('documents', **params)
 
-    def _citations_for_mendeley_user(self):
+    def _iter_pages(self, path, **params):
+        """Iterate over the items of a paginated API listing.
 
-        documents = self.client.documents.iter(page_size=500)
-        return [
-            self._citation_for_mendeley_document(document)
-            for document in documents
-        ]
+        :raises: `requests.HTTPError` if the API responds with an error
+        """
+        url = '{0}/{1}'.format(API_URL, path)
+        params['limit'] = PAGE_SIZE
+        while url:
+            response = self.client.get(url, params=params, headers={'Accept': DOCUMENT_TYPE})
+            # Error responses are JSON objects, which would iterate as keys
+            response.raise_for_status()
+            for each in response.json():
+                yield each
+            url = response.links.get('next', {}).get('url')
+            # The next page's URL includes the query
+            params = {}
 
     def _citation_for_mendeley_document(self, document):
         """Mendeley document to ``website.citations.models.Citation``
-        :param BaseDocument document:
-            An instance of ``mendeley.models.base_document.BaseDocument``
+        :param dict document: Document as returned by the Mendeley API, with
+            ``view=all``
         :return Citation:
         """
         csl = {
-            'id': document.json.get('id')
+            'id': document.get('id')
         }
 
         CSL_TYPE_MAP = {
@@ -154,7 +219,7 @@ class Mendeley(ExternalProvider):
             'working_paper': 'report'
         }
 
-        csl_type = document.json.get('type')
+        csl_type = document.get('type')
 
         if csl_type in CSL_TYPE_MAP:
             csl['type'] = CSL_TYPE_MAP[csl_type]
@@ -162,48 +227,48 @@ class Mendeley(ExternalProvider):
         else:
             csl['type'] = 'article'
 
-        if document.json.get('abstract'):
-            csl['abstract'] = document.json.get('abstract')
+        if document.get('abstract'):
+            csl['abstract'] = document.get('abstract')
 
-        if document.json.get('accessed'):
-            csl['accessed'] = document.json.get('accessed')
+        if document.get('accessed'):
+            csl['accessed'] = document.get('accessed')
 
-        if document.json.get('authors'):
+        if document.get('authors'):
             csl['author'] = [
                 {
                     'given': person.get('first_name'),
                     'family': person.get('last_name'),
-                } for person in document.json.get('authors')
+                } for person in document.get('authors')
             ]
 
-        if document.json.get('chapter'):
-            csl['chapter-number'] = document.json.get('chapter')
+        if document.get('chapter'):
+            csl['chapter-number'] = document.get('chapter')
 
-        if document.json.get('city') and document.json.get('country'):
-            csl['publisher-place'] = document.json.get('city') + ", " + document.json.get('country')
+        if document.get('city') and document.get('country'):
+            csl['publisher-place'] = document.get('city') + ", " + document.get('country')
 
-        elif document.json.get('city'):
-            csl['publisher-place'] = document.json.get('city')
+        elif document.get('city'):
+            csl['publisher-place'] = document.get('city')
 
-        elif document.json.get('country'):
-            csl['publisher-place'] = document.json.get('country')
+        elif document.get('country'):
+            csl['publisher-place'] = document.get('country')
 
-        if document.json.get('edition'):
-            csl['edition'] = document.json.get('edition')
+        if document.get('edition'):
+            csl['edition'] = document.get('edition')
 
-        if document.json.get('editors'):
+        if document.get('editors'):
             csl['editor'] = [
                 {
                     'given': person.get('first_name'),
                     'family': person.get('last_name'),
-                } for person in document.json.get('editors')
+                } for person in document.get('editors')
             ]
 
-        if document.json.get('genre'):
-            csl['genre'] = document.json.get('genre')
+        if document.get('genre'):
+            csl['genre'] = document.get('genre')
 
         # gather identifiers
-        idents = document.json.get('identifiers')
+        idents = document.get('identifiers')
         if idents is not None:
             if idents.get('doi'):
                 csl['DOI'] = idents.get('doi')
@@ -214,51 +279,51 @@ class Mendeley(ExternalProvider):
             if idents.get('pmid'):
                 csl['PMID'] = idents.get('pmid')
 
-        if document.json.get('issue'):
-            csl['issue'] = document.json.get('issue')
+        if document.get('issue'):
+            csl['issue'] = document.get('issue')
 
-        if document.json.get('language'):
-            csl['language'] = document.json.get('language')
+        if document.get('language'):
+            csl['language'] = document.get('language')
 
-        if document.json.get('medium'):
-            csl['medium'] = document.json.get('medium')
+        if document.get('medium'):
+            csl['medium'] = document.get('medium')
 
-        if document.json.get('pages'):
-            csl['page'] = document.json.get('pages')
+        if document.get('pages'):
+            csl['page'] = document.get('pages')
 
-        if document.json.get('publisher'):
-            csl['publisher'] = document.json.get('publisher')
+        if document.get('publisher'):
+            csl['publisher'] = document.get('publisher')
 
         if csl_type == 'thesis':
-            csl['publisher'] = document.json.get('institution')
+            csl['publisher'] = document.get('institution')
 
-        if document.json.get('revision'):
-            csl['number'] = document.json.get('revision')
+        if document.get('revision'):
+            csl['number'] = document.get('revision')
 
-        if document.json.get('series'):
-            csl['collection-title'] = document.json.get('series')
+        if document.get('series'):
+            csl['collection-title'] = document.get('series')
 
-        if document.json.get('series_editor'):
-            csl['collection-editor'] = document.json.get('series_editor')
+        if document.get('series_editor'):
+            csl['collection-editor'] = document.get('series_editor')
 
-        if document.json.get('short_title'):
-            csl['shortTitle'] = document.json.get('short_title')
+        if document.get('short_title'):
+            csl['shortTitle'] = document.get('short_title')
 
-        if document.json.get('source'):
-            csl['container-title'] = document.json.get('source')
+        if document.get('source'):
+            csl['container-title'] = document.get('source')
 
-        if document.json.get('title'):
-            csl['title'] = document.json.get('title')
+        if document.get('title'):
+            csl['title'] = document.get('title')
 
-        if document.json.get('volume'):
-            csl['volume'] = document.json.get('volume')
+        if document.get('volume'):
+            csl['volume'] = document.get('volume')
 
-        urls = document.json.get('websites', [])
+        urls = document.get('websites', [])
         if urls:
             csl['URL'] = urls[0]
 
-        if document.json.get('year'):
-            csl['issued'] = {'date-parts': [[document.json.get('year')]]}
+        if document.get('year'):
+            csl['issued'] = {'date-parts': [[document.get('year')]]}
 
         return csl
 
@@ -1,6 +1,7 @@
 # -*- coding: utf-8 -*-
 
 import mock
+import requests
 from nose.tools import *  # noqa
 
 from framework.auth.core import Auth
@@ -18,6 +19,7 @@ from website.addons.mendeley.provider import MendeleyCitationsProvider
 import datetime
 
 from website.addons.mendeley import model
+from website.addons.citations import cache
 
 
 class MockFolder(object):
@@ -79,6 +81,123 @@ class MendeleyProviderTestCase(OsfTestCase):
         assert_equal(res[1]['name'], mock_folders[0].name)
         assert_equal(res[1]['id'], mock_folders[0].json['id'])
 
+
+def mock_pages(pages):
+    """Replacement for `Mendeley._iter_pages` serving ``pages``, keyed by
+    path and sorted query parameters.
+    """
+    def iter_pages(path, **params):
+        return iter(pages[(path, ) + tuple(sorted(params.items()))])
+    return iter_pages
+
+
+class MendeleyCitationsTestCase(OsfTestCase):
+
+    def setUp(self):
+        super(MendeleyCitationsTestCase, self).setUp()
+        self.provider = model.Mendeley()
+        self.provider.account = MendeleyAccountFactory()
+        self.provider._client = mock.Mock()
+        self.state = {'since': '2015-01-01T00:00:00.000Z'}
+
+    def document(self, id, title='A title'):
+        return {'id': id, 'title': title, 'type': 'journal'}
+
+    def test_fetch_list_only_fetches_folder(self):
+        pages = {
+            ('documents', ('folder_id', 'folder')): [self.document('a'), self.document('b')],
+        }
+        with mock.patch.object(model.Mendeley, '_iter_pages', side_effect=mock_pages(pages)) as iter_pages:
+            citations, state = self.provider.fetch_list('folder')
+        iter_pages.assert_called_once_with('documents', folder_id='folder')
+        assert_equal([each['id'] for each in citations], ['a', 'b'])
+        assert_equal(citations[0]['type'], 'article-journal')
+        assert_in('since', state)
+
+    def test_iter_pages_raises_on_error(self):
+        response = mock.Mock()
+        response.raise_for_status.side_effect = requests.HTTPError('401 Client Error')
+        response.json.return_value = {'message': 'Unauthorized'}
+        self.provider._client.get.return_value = response
+        with assert_raises(requests.HTTPError):
+            list(self.provider._iter_pages('documents'))
+
+    @mock.patch('website.addons.citations.cache.settings.CITATION_CACHE', True)
+    def test_error_is_not_cached(self):
+        response = mock.Mock()
+        response.raise_for_status.side_effect = requests.HTTPError('503 Server Error')
+        self.provider._client.get.return_value = response
+        with assert_raises(requests.HTTPError):
+            cache.get_list(self.provider, 'folder')
+        assert_equal(cache.get_collection().count(), 0)
+
+    def test_refresh_list_folder_applies_changes(self):
+        cached = [
+            self.provider._citation_for_mendeley_document(self.document('a')),
+            self.provider._citation_for_mendeley_document(self.document('b')),
+        ]
+        pages = {
+            ('documents', ('folder_id', 'folder'), ('modified_since', self.state['since'])): [
+                self.document('b', title='New title'),
+            ],
+            ('folders/folder/documents', ): [{'id': 'b'}],
+        }
+        with mock.patch.object(model.Mendeley, '_iter_pages', side_effect=mock_pages(pages)):
+            citations, state = self.provider.refresh_list('folder', cached, self.state)
+        assert_equal([each['id'] for each in citations], ['b'])
+        assert_equal(citations[0]['title'], 'New title')
+        assert_not_equal(state, self.state)
+
+    def test_refresh_list_folder_fetches_added_documents(self):
+        cached = [self.provider._citation_for_mendeley_document(self.document('a'))]
+        pages = {
+            ('documents', ('folder_id', 'folder'), ('modified_since', self.state['since'])): [],
+            ('folders/folder/documents', ): [{'id': 'a'}, {'id': 'c'}],
+            ('documents', ('folder_id', 'folder')): [self.document('a'), self.document('c')],
+        }
+        with mock.patch.object(model.Mendeley, '_iter_pages', side_effect=mock_pages(pages)):
+            citations, _ = self.provider.refresh_list('folder', cached, self.state)
+        assert_equal([each['id'] for each in citations], ['a', 'c'])
+
+    def test_refresh_list_root_drops_deleted(self):
+        cached = [
+            self.provider._citation_for_mendeley_document(self.document('a')),
+            self.provider._citation_for_mendeley_document(self.document('b')),
+        ]
+        pages = {
+            ('documents', ('modified_since', self.state['since'])): [self.document('c')],
+            ('documents', ('deleted_since', self.state['since'])): [{'id': 'a'}],
+        }
+        with mock.patch.object(model.Mendeley, '_iter_pages', side_effect=mock_pages(pages)):
+            citations, _ = self.provider.refresh_list('ROOT', cached, self.state)
+        assert_equal([each['id'] for each in citations], ['b', 'c'])
+
+    @mock.patch('website.addons.citations.cache.settings.CITATION_CACHE', True)
+    def test_cached_list_refreshed_when_stale(self):
+        citations = [self.provider._citation_for_mendeley_document(self.document('a'))]
+        with mock.patch.object(model.Mendeley, 'fetch_list', return_value=(citations, self.state)) as fetch_list:
+            with mock.patch.object(model.Mendeley, 'refresh_list', return_value=([], self.state)) as refresh_list:
+                assert_equal(cache.get_list(self.provider, 'folder'), citations)
+                assert_equal(cache.get_list(self.provider, 'folder'), citations)
+                assert_equal(fetch_list.call_count, 1)
+                assert_false(refresh_list.called)
+
+                cache.get_collection().update({}, {'$set': {
+                    'checked': datetime.datetime.utcnow() - datetime.timedelta(days=1),
+                }}, multi=True)
+                assert_equal(cache.get_list(self.provider, 'folder'), [])
+                refresh_list.assert_called_once_with('folder', citations, self.state)
+                assert_equal(fetch_list.call_count, 1)
+
+    @mock.patch('website.addons.citations.cache.settings.CITATION_CACHE', True)
+    def test_cache_scoped_to_account_and_folder(self):
+        with mock.patch.object(model.Mendeley, 'fetch_list', return_value=([], self.state)) as fetch_list:
+            cache.get_list(self.provider, 'folder')
+            cache.get_list(self.provider, 'other')
+            self.provider.account = MendeleyAccountFactory()
+            cache.get_list(self.provider, 'folder')
+            assert_equal(fetch_list.call_count, 3)
+
 class MendeleyNodeSettingsTestCase(OsfTestCase):
 
     def setUp(self):
@@ -259,6 +378,12 @@ class MendeleyNodeSettingsTestCase(OsfTestCase):
             ''
         )
 
+    def test_folder_metadata(self):
+        self.node_settings.api._client = mock.Mock()
+        folder = self.node_settings.api._folder_metadata('fake-list-id')
+        self.node_settings.api._client.folders.get.assert_called_once_with('fake-list-id')
+        assert_equal(folder, self.node_settings.api._client.folders.get.return_value)
+
     @mock.patch('website.addons.mendeley.model.Mendeley._folder_metadata')
     def test_selected_folder_name(self, mock_folder_metadata):
         # Mock the return from api call to get the folder's name
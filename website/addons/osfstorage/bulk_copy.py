@@ -0,0 +1,257 @@
+# -*- coding: utf-8 -*-
+"""Bulk copying of osfstorage file trees, e.g. when forking a project.
+
+`utils.copy_files` clones one file node at a time through the ODM, which
+costs several round trips per node. Here the source subtree is read one level
+at a time, new ids are allocated up front and the copied records are written
+with bulk inserts. `OsfStorageFileVersion` records are immutable and shared
+between the source and the copy, as `copy_files` already does.
+
+Because the records bypass the ODM, the backrefs it keeps on referenced
+documents (parents, versions and node settings) are updated with raw
+``$addToSet`` writes. Backref keys are read from the source documents rather
+than assumed, so relations the ODM does not track are left alone.
+"""
+
+import logging
+
+import bson
+
+from framework.tasks import app
+from framework.tasks.handlers import enqueue_task
+
+from website.addons.osfstorage import settings
+from website.addons.osfstorage.model import (
+    OsfStorageFileNode,
+    OsfStorageFileVersion,
+    OsfStorageNodeSettings,
+)
+
+
+logger = logging.getLogger(__name__)
+
+# Class name the ODM records in backrefs
+FILE_NODE_NAME = OsfStorageFileNode.__name__.lower()
+
+
+def _file_nodes():
+    return OsfStorageFileNode._storage[0].store
+
+
+def _versions():
+    return OsfStorageFileVersion._storage[0].store
+
+
+def _node_settings():
+    return OsfStorageNodeSettings._storage[0].store
+
+
+def _new_id():
+    return str(bson.ObjectId())
+
+
+def _chunks(items, size):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def get_descendant_parents(src_id):
+    """Return (id, parent id) pairs for every node below ``src_id``,
+    shallowest first, using one query per level of the tree.
+    """
+    pairs = []
+    level = [src_id]
+    while level:
+        children = []
+        for chunk in _chunks(level, settings.COPY_BATCH_SIZE):
+            cursor = _file_nodes().find({'parent': {'$in': chunk}}, {'parent': 1})
+            children.extend((each['_id'], each['parent']) for each in cursor)
+        pairs.extend(children)
+        level = [child_id for child_id, _ in children]
+    return pairs
+
+
+def _find_backref_key(docs, field_name):
+    """Return the key under which the ODM stores backrefs from
+    ``OsfStorageFileNode.<field_name>`` in any of ``docs``, if any.
+    """
+    for doc in docs:
+        for key, by_class in (doc or {}).get('__backrefs', {}).items():
+            if field_name in by_class.get(FILE_NODE_NAME, {}):
+                return key
+    return None
+
+
+def _add_backrefs(collection, doc_id, key, field_name, ids):
+    if key is None or not ids:
+        return
+    path = '.'.join(['__backrefs', key, FILE_NODE_NAME, field_name])
+    collection.update({'_id': doc_id}, {'$addToSet': {path: {'$each': ids}}})
+
+
+def _translate_backrefs(backrefs, id_map):
+    """Map backrefs between nodes of the copied subtree onto the copies.
+
+    Backrefs from children to their parent are dropped here and rebuilt by
+    `_copy_records`, since the children may be copied separately.
+    """
+    translated = {}
+    for key, by_class in (backrefs or {}).items():
+        for class_name, by_field in by_class.items():
+            for field_name, ids in by_field.items():
+                if class_name == FILE_NODE_NAME and field_name == 'parent':
+                    continue
+                ids = [id_map[each] for each in ids if each in id_map]
+                if ids:
+                    translated.setdefault(key, {}).setdefault(class_name, {})[field_name] = ids
+    return translated
+
+
+def _build_record(doc, id_map, parent_id, ancestors, target_settings_id, name=None):
+    record = dict(doc)
+    record.update({
+        '_id': id_map[doc['_id']],
+        'parent': parent_id,
+        'ancestors': ancestors,
+        'node_settings': target_settings_id,
+        '__backrefs': _translate_backrefs(doc.get('__backrefs'), id_map),
+    })
+    if name:
+        record['name'] = name
+    return record
+
+
+def _copy_records(src_ids, id_map, parents, ancestors, target_settings_id, names=None, progress=None):
+    """Insert copies of the nodes ``src_ids`` and update backrefs pointing to
+    them.
+
+    :param dict id_map: New ids keyed by source id
+    :param dict parents: New parent ids keyed by source id
+    :param dict ancestors: New ancestor id lists keyed by source id
+    :param dict names: Optional new names keyed by source id
+    """
+    names = names or {}
+    first = None
+    parent_key = None
+    children_by_parent = {}
+    files_by_version = {}
+    copied = 0
+
+    for chunk in _chunks(src_ids, settings.COPY_BATCH_SIZE):
+        docs = list(_file_nodes().find({'_id': {'$in': chunk}}))
+        first = first or (docs[0] if docs else None)
+        parent_key = parent_key or _find_backref_key(docs, 'parent')
+        records = [
+            _build_record(
+                doc, id_map, parents[doc['_id']], ancestors[doc['_id']],
+                target_settings_id, name=names.get(doc['_id']),
+            )
+            for doc in docs
+        ]
+        if records:
+            _file_nodes().insert(records)
+        for record in records:
+            if record['parent'] is not None:
+                children_by_parent.setdefault(record['parent'], []).append(record['_id'])
+            for version_id in record.get('versions') or []:
+                files_by_version.setdefault(version_id, []).append(record['_id'])
+        copied += len(records)
+        if progress:
+            progress(copied, len(src_ids))
+
+    if first is None:
+        return copied
+
+    settings_key = _find_backref_key(
+        [_node_settings().find_one({'_id': first['node_settings']}, {'__backrefs': 1})],
+        'node_settings',
+    )
+    _add_backrefs(
+        _node_settings(), target_settings_id, settings_key, 'node_settings',
+        [id_map[each] for each in src_ids],
+    )
+
+    if parent_key is None and first.get('parent'):
+        parent_key = _find_backref_key(
+            [_file_nodes().find_one({'_id': first['parent']}, {'__backrefs': 1})],
+            'parent',
+        )
+    for parent_id, child_ids in children_by_parent.items():
+        _add_backrefs(_file_nodes(), parent_id, parent_key, 'parent', child_ids)
+
+    if files_by_version:
+        version_key = _find_backref_key(
+            [_versions().find_one({'_id': next(iter(files_by_version))}, {'__backrefs': 1})],
+            'versions',
+        )
+        for version_id, file_ids in files_by_version.items():
+            _add_backrefs(_versions(), version_id, version_key, 'versions', file_ids)
+
+    # Cached objects hold stale backrefs
+    OsfStorageFileNode._clear_caches()
+    OsfStorageFileVersion._clear_caches()
+    return copied
+
+
+def copy_descendants(src_id, top_id, target_settings_id, progress=None):
+    """Copy every node below ``src_id`` under the existing copy ``top_id``.
+
+    :return: Number of nodes copied
+    """
+    pairs = get_descendant_parents(src_id)
+    top = _file_nodes().find_one({'_id': top_id}, {'ancestors': 1})
+    id_map = {src_id: top_id}
+    ancestors = {src_id: top.get('ancestors') or []}
+    parents = {}
+    for child_id, parent_id in pairs:
+        id_map[child_id] = _new_id()
+        parents[child_id] = id_map[parent_id]
+        ancestors[child_id] = ancestors[parent_id] + [id_map[parent_id]]
+    return _copy_records(
+        [child_id for child_id, _ in pairs],
+        id_map, parents, ancestors, target_settings_id,
+        progress=progress,
+    )
+
+
+@app.task(bind=True)
+def copy_descendants_task(self, src_id, top_id, target_settings_id):
+    def progress(copied, total):
+        self.update_state(state='PROGRESS', meta={'copied': copied, 'total': total})
+    copied = copy_descendants(src_id, top_id, target_settings_id, progress=progress)
+    logger.info('Copied {0} file nodes from {1} to {2}'.format(copied, src_id, top_id))
+    return copied
+
+
+def copy_tree(src, target_settings, parent=None, name=None, asynchronous=False):
+    """Copy the file node ``src`` and everything below it to
+    ``target_settings``.
+
+    :param OsfStorageFileNode src: Root of the subtree to copy
+    :param OsfStorageNodeSettings target_settings: Settings to copy to; must
+        be saved, and is reloaded after the copy
+    :param OsfStorageFileNode parent: Parent of the copy of ``src``, if any
+    :param str name: New name for the copy of ``src``
+    :param bool asynchronous: Copy the descendants of ``src`` in a task;
+        only the copy of ``src`` itself exists when this returns
+    :return: The copy of ``src``
+    """
+    top_id = _new_id()
+    parent_id = parent._id if parent else None
+    prefix = parent.get_ancestor_ids() + [parent._id] if parent else []
+    _copy_records(
+        [src._id], {src._id: top_id},
+        {src._id: parent_id}, {src._id: prefix},
+        target_settings._id, names={src._id: name},
+    )
+
+    if src.is_folder:
+        if asynchronous:
+            enqueue_task(copy_descendants_task.si(src._id, top_id, target_settings._id))
+        else:
+            copy_descendants(src._id, top_id, target_settings._id)
+
+    target_settings.reload()
+    if parent:
+        parent.reload()
+    return OsfStorageFileNode.load(top_id)
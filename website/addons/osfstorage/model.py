@@ -13,7 +13,7 @@ from modularodm.storage.base import KeyExistsException
 
 from framework.mongo import StoredObject
 from framework.mongo.utils import unique_on
-from framework.analytics import get_basic_counters
+from framework.analytics import get_basic_counters, get_basic_counters_many
 
 from website.addons.base import AddonNodeSettingsBase, GuidFile, StorageAddonBase
 from website.addons.osfstorage import utils
@@ -63,7 +63,13 @@ class OsfStorageNodeSettings(StorageAddonBase, AddonNodeSettingsBase):
         if not self.root_node:
             self.on_add()
 
-        clone.root_node = utils.copy_files(self.root_node, clone)
+        # Avoid circular imports
+        from website.addons.osfstorage import bulk_copy
+        file_count = OsfStorageFileNode.find(Q('node_settings', 'eq', self)).count()
+        clone.root_node = bulk_copy.copy_tree(
+            self.root_node, clone,
+            asynchronous=file_count > settings.ASYNC_COPY_THRESHOLD,
+        )
         clone.save()
 
         return clone, None
@@ -135,6 +141,9 @@ class OsfStorageFileNode(StoredObject):
     parent = fields.ForeignField('OsfStorageFileNode', index=True)
     versions = fields.ForeignField('OsfStorageFileVersion', list=True)
     node_settings = fields.ForeignField('OsfStorageNodeSettings', required=True, index=True)
+    # Ids of all ancestors, root first; maintained by `save` so that paths and
+    # subtrees can be looked up with a single query
+    ancestors = fields.StringField(list=True, index=True)
 
     @classmethod
     def create_child_by_path(cls, path, node_settings):
@@ -202,6 +211,44 @@ class OsfStorageFileNode(StoredObject):
     def children(self):
         return self.__class__.find(Q('parent', 'eq', self._id))
 
+    @property
+    @utils.must_be('folder')
+    def descendants(self):
+        """All nodes below this folder, shallowest first."""
+        if not self._tree_is_indexed():
+            return self._walk_descendants()
+        return sorted(
+            self.__class__.find(Q('ancestors', 'eq', self._id)),
+            key=lambda each: len(each.ancestors),
+        )
+
+    def _tree_is_indexed(self):
+        """Whether every node below a root of this node's add-on has its
+        ancestors stored; false until `scripts/osfstorage/migrate_ancestors.py`
+        has backfilled the trees of the add-on.
+        """
+        unindexed = self.__class__._storage[0].store.find_one(
+            {
+                'node_settings': self.to_storage()['node_settings'],
+                'parent': {'$ne': None},
+                'ancestors': {'$in': [None, []]},
+            },
+            {'_id': 1},
+        )
+        return unindexed is None
+
+    def _walk_descendants(self):
+        """All nodes below this folder, shallowest first, found by querying
+        each level by parent.
+        """
+        ret = []
+        parent_ids = [self._id]
+        while parent_ids:
+            level = list(self.__class__.find(Q('parent', 'in', parent_ids)))
+            ret.extend(level)
+            parent_ids = [each._id for each in level if each.is_folder]
+        return ret
+
     @property
     def is_folder(self):
         return self.kind == 'folder'
@@ -218,24 +265,49 @@ class OsfStorageFileNode(StoredObject):
     def node(self):
         return self.node_settings.owner
 
-    def materialized_path(self):
-        """creates the full path to a the given filenode
-        Note: Possibly high complexity/ many database calls
-        USE SPARINGLY
+    def _lineage(self):
+        current = self
+        while current:
+            yield current
+            current = current.parent
+
+    def _get_parent_id(self):
+        return self.to_storage()['parent']
+
+    def _compute_ancestors(self):
+        parent = self.parent
+        if parent is None:
+            return []
+        return parent.get_ancestor_ids() + [parent._id]
+
+    def get_ancestor_ids(self):
+        if self._get_parent_id() is not None and not self.ancestors:
+            # Node predates the ancestors index
+            return [each._id for each in reversed(list(self._lineage()))][:-1]
+        return list(self.ancestors)
+
+    def get_ancestors(self):
+        """Return the ancestors of this node, root first, in one query."""
+        if self._get_parent_id() is not None and not self.ancestors:
+            return list(reversed(list(self._lineage())))[:-1]
+        by_id = dict(
+            (each._id, each)
+            for each in self.__class__.find(Q('_id', 'in', list(self.ancestors)))
+        )
+        return [by_id[each] for each in self.ancestors]
+
+    def get_lineage(self):
+        """Return this node followed by its ancestors, nearest first, in one
+        query.
         """
+        return [self] + list(reversed(self.get_ancestors()))
+
+    def materialized_path(self):
+        """creates the full path to a the given filenode"""
         if not self.parent:
             return '/'
-        # Note: ODM cache can be abused here
-        # for highly nested folders calling
-        # list(self.__class__.find(Q(nodesetting),Q(folder))
-        # may result in a massive increase in performance
-        def lineage():
-            current = self
-            while current:
-                yield current
-                current = current.parent
-
-        path = os.path.join(*reversed([x.name for x in lineage()]))
+        names = [each.name for each in self.get_ancestors()] + [self.name]
+        path = os.path.join(*names)
         if self.is_folder:
             return '/{}/'.format(path)
         return '/{}'.format(path)
@@ -266,18 +338,51 @@ class OsfStorageFileNode(StoredObject):
             child.save()
         return child
 
+    def get_download_page(self, version=None):
+        """Return the analytics page key counting downloads of this file or
+        one of its versions.
+        """
+        parts = ['download', self.node._id, self._id]
+        if version is not None:
+            parts.append(version)
+        return ':'.join([format(part) for part in parts])
+
     def get_download_count(self, version=None):
         if self.is_folder:
             return None
 
-        parts = ['download', self.node._id, self._id]
-        if version is not None:
-            parts.append(version)
-        page = ':'.join([format(part) for part in parts])
-        _, count = get_basic_counters(page)
+        _, count = get_basic_counters(self.get_download_page(version))
 
         return count or 0
 
+    @classmethod
+    def get_download_counts(cls, file_nodes):
+        """Get the download counts of many files with a single query.
+
+        :param list file_nodes: Files and folders
+        :return dict: Counts keyed by id; `None` for folders
+        """
+        pages = dict(
+            (each._id, each.get_download_page())
+            for each in file_nodes
+            if not each.is_folder
+        )
+        counters = get_basic_counters_many(pages.values())
+        ret = dict((each._id, None) for each in file_nodes)
+        for file_id, page in pages.iteritems():
+            ret[file_id] = counters[page][1] or 0
+        return ret
+
+    @utils.must_be('file')
+    def get_version_download_counts(self):
+        """Get the download counts of every version with a single query.
+
+        :return list: Counts in version order
+        """
+        pages = [self.get_download_page(index) for index in range(len(self.versions))]
+        counters = get_basic_counters_many(pages)
+        return [counters[page][1] or 0 for page in pages]
+
     @utils.must_be('file')
     def get_version(self, index=-1, required=False):
         try:
@@ -314,7 +419,7 @@ class OsfStorageFileNode(StoredObject):
                 return
         raise errors.VersionNotFoundError
 
-    def delete(self, recurse=True):
+    def _trash(self):
         trashed = OsfStorageTrashedFileNode()
         trashed._id = self._id
         trashed.name = self.name
@@ -322,18 +427,29 @@ class OsfStorageFileNode(StoredObject):
         trashed.parent = self.parent
         trashed.versions = self.versions
         trashed.node_settings = self.node_settings
+        trashed.ancestors = self.ancestors
 
         trashed.save()
 
+    def delete(self, recurse=True):
+        self._trash()
+
         if self.is_folder and recurse:
-            for child in self.children:
-                child.delete()
+            # Remove the deepest nodes first so parents are never removed
+            # before their children
+            for descendant in reversed(self.descendants):
+                descendant._trash()
+                self.__class__.remove_one(descendant)
 
         self.__class__.remove_one(self)
 
-    def serialized(self, include_full=False):
+    def serialized(self, include_full=False, downloads=None):
         """Build Treebeard JSON for folder or file.
+
+        :param int downloads: Download count, if already known
         """
+        if downloads is None:
+            downloads = self.get_download_count()
         data = {
             'id': self._id,
             'path': self.path,
@@ -341,7 +457,7 @@ class OsfStorageFileNode(StoredObject):
             'kind': self.kind,
             'size': self.versions[-1].size if self.versions else None,
             'version': len(self.versions),
-            'downloads': self.get_download_count(),
+            'downloads': downloads,
         }
         if include_full:
             data['fullPath'] = self.materialized_path()
@@ -359,13 +475,33 @@ class OsfStorageFileNode(StoredObject):
         return self
 
     def _update_node_settings(self, recursive=True, save=True):
+        # Fetch the subtree while this node still belongs to the source tree,
+        # and before saving changes its ancestors
+        descendants = self.descendants if recursive and self.is_folder else []
         if self.parent is not None:
             self.node_settings = self.parent.node_settings
         if save:
             self.save()
-        if recursive and self.is_folder:
-            for child in self.children:
-                child._update_node_settings(save=save)
+        # Rebuild ancestors from parents, shallowest first, which also indexes
+        # subtrees that were never backfilled
+        ancestors = {self._id: list(self.ancestors)}
+        for descendant in descendants:
+            parent_id = descendant._get_parent_id()
+            descendant.ancestors = ancestors[parent_id] + [parent_id]
+            ancestors[descendant._id] = descendant.ancestors
+            descendant.node_settings = self.node_settings
+            if save:
+                descendant.save()
+
+    def save(self, *args, **kwargs):
+        # Only recompute ancestors when the parent has changed; moves update
+        # the ancestors of the moved subtree themselves
+        parent_id = self._get_parent_id()
+        if parent_id is None:
+            self.ancestors = []
+        elif not self.ancestors or self.ancestors[-1] != parent_id:
+            self.ancestors = self._compute_ancestors()
+        return super(OsfStorageFileNode, self).save(*args, **kwargs)
 
     def __repr__(self):
         return '<{}(name={!r}, node_settings={!r})>'.format(
@@ -531,3 +667,4 @@ class OsfStorageTrashedFileNode(StoredObject):
     parent = fields.ForeignField('OsfStorageFileNode', index=True)
     versions = fields.ForeignField('OsfStorageFileVersion', list=True)
     node_settings = fields.ForeignField('OsfStorageNodeSettings', required=True, index=True)
+    ancestors = fields.StringField(list=True)
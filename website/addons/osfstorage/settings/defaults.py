@@ -19,3 +19,8 @@ WATERBUTLER_SETTINGS = {
 WATERBUTLER_RESOURCE = 'folder'
 
 DISK_SAVING_MODE = settings.DISK_SAVING_MODE
+
+# Number of file nodes read and inserted per batch when copying file trees
+COPY_BATCH_SIZE = 1000
+# Forks of projects with more file nodes than this copy files in a task
+ASYNC_COPY_THRESHOLD = 5000
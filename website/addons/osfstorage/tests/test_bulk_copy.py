@@ -0,0 +1,99 @@
+# encoding: utf-8
+
+import mock
+from modularodm import Q
+from nose.tools import *  # noqa
+
+from tests.factories import ProjectFactory
+
+from website.addons.osfstorage.tests import factories
+from website.addons.osfstorage.tests.utils import StorageTestCase
+
+from website.addons.osfstorage import bulk_copy
+from website.addons.osfstorage import model
+
+
+class TestBulkCopy(StorageTestCase):
+
+    def setUp(self):
+        super(TestBulkCopy, self).setUp()
+        self.root = self.node_settings.root_node
+        self.folder = self.root.append_folder('Cloud')
+        self.sub = self.folder.append_folder('Sub')
+        self.file = self.sub.append_file('Carp')
+        self.version = factories.FileVersionFactory()
+        self.file.versions.append(self.version)
+        self.file.save()
+
+        self.target = ProjectFactory().get_addon('osfstorage')
+
+    def test_get_descendant_parents(self):
+        assert_equal(
+            bulk_copy.get_descendant_parents(self.folder._id),
+            [(self.sub._id, self.folder._id), (self.file._id, self.sub._id)],
+        )
+
+    def test_copy_tree(self):
+        copied = bulk_copy.copy_tree(self.folder, self.target, parent=self.target.root_node)
+
+        assert_not_equal(copied._id, self.folder._id)
+        assert_equal(copied.parent, self.target.root_node)
+        assert_equal(copied.node_settings, self.target)
+        copied_sub = copied.find_child_by_name('Sub', kind='folder')
+        copied_file = copied_sub.find_child_by_name('Carp')
+        assert_equal(copied_file.node_settings, self.target)
+        assert_equal(
+            copied_file.ancestors,
+            [self.target.root_node._id, copied._id, copied_sub._id],
+        )
+        assert_equal(copied_file.materialized_path(), '/Cloud/Sub/Carp')
+        # Versions are shared, not copied
+        assert_equal(copied_file.versions, [self.version])
+
+    def test_copy_tree_leaves_source_untouched(self):
+        bulk_copy.copy_tree(self.folder, self.target, parent=self.target.root_node)
+        self.sub.reload()
+        assert_equal(list(self.sub.children), [self.file])
+        assert_equal(self.file.node_settings, self.node_settings)
+
+    def test_copy_tree_rename(self):
+        copied = bulk_copy.copy_tree(self.folder, self.target, parent=self.target.root_node, name='Rain')
+        assert_equal(copied.name, 'Rain')
+        assert_equal(self.folder.name, 'Cloud')
+
+    def test_copy_tree_root(self):
+        copied = bulk_copy.copy_tree(self.root, self.target)
+        assert_is_none(copied.parent)
+        assert_equal(copied.ancestors, [])
+        assert_equal(len(list(copied.descendants)), 3)
+
+    def test_copied_tree_can_be_deleted(self):
+        copied = bulk_copy.copy_tree(self.folder, self.target, parent=self.target.root_node)
+        copied.delete()
+        assert_equal(model.OsfStorageFileNode.find(
+            Q('node_settings', 'eq', self.target) &
+            Q('parent', 'ne', None)
+        ).count(), 0)
+        self.sub.reload()
+        assert_equal(list(self.sub.children), [self.file])
+
+    @mock.patch('website.addons.osfstorage.bulk_copy.enqueue_task')
+    def test_copy_tree_async_copies_top_only(self, mock_enqueue):
+        copied = bulk_copy.copy_tree(self.folder, self.target, parent=self.target.root_node, asynchronous=True)
+        assert_equal(list(copied.children), [])
+        assert_equal(mock_enqueue.call_count, 1)
+
+        bulk_copy.copy_descendants(self.folder._id, copied._id, self.target._id)
+        copied.reload()
+        assert_equal(len(list(copied.descendants)), 2)
+
+    @mock.patch('website.addons.osfstorage.bulk_copy.enqueue_task')
+    def test_copy_descendants_reports_progress(self, mock_enqueue):
+        copied = bulk_copy.copy_tree(self.folder, self.target, parent=self.target.root_node, asynchronous=True)
+        progress = mock.Mock()
+        with mock.patch.object(bulk_copy.settings, 'COPY_BATCH_SIZE', 1):
+            assert_equal(
+                bulk_copy.copy_descendants(self.folder._id, copied._id, self.target._id, progress=progress),
+                2,
+            )
+        progress.assert_has_calls([mock.call(1, 2), mock.call(2, 2)])
@@ -37,7 +37,7 @@ class TestFileGuid(OsfTestCase):
         assert_equal(guid.path, guid.waterbutler_path)
         assert_equals(guid.waterbutler_path, '/baz/foo/bar')
 
-    @mock.patch('website.addons.base.requests.get')
+    @mock.patch('website.addons.base.metadata_cache.get')
     def test_unique_identifier(self, mock_get):
         mock_response = mock.Mock(ok=True, status_code=200)
         mock_get.return_value = mock_response
@@ -166,6 +166,35 @@ class TestOsfstorageFileNode(StorageTestCase):
         assert_equals(child.get_download_count(1), 1)
         assert_equals(child.get_download_count(2), 1)
 
+    @mock.patch('framework.analytics.session')
+    def test_download_counts(self, mock_session):
+        mock_session.data = {}
+        root = self.node_settings.root_node
+        first = root.append_file('First')
+        second = root.append_file('Second')
+        folder = root.append_folder('Folder')
+
+        utils.update_analytics(self.project, first._id, 0)
+        utils.update_analytics(self.project, first._id, 1)
+
+        assert_equals(
+            model.OsfStorageFileNode.get_download_counts([first, second, folder]),
+            {first._id: 2, second._id: 0, folder._id: None},
+        )
+
+    @mock.patch('framework.analytics.session')
+    def test_version_download_counts(self, mock_session):
+        mock_session.data = {}
+        child = self.node_settings.root_node.append_file('Test')
+        child.versions = [factories.FileVersionFactory() for _ in range(3)]
+        child.save()
+
+        utils.update_analytics(self.project, child._id, 0)
+        utils.update_analytics(self.project, child._id, 2)
+        utils.update_analytics(self.project, child._id, 2)
+
+        assert_equals(child.get_version_download_counts(), [1, 0, 2])
+
     def test_download_count_folder(self):
         assert_is(
             None,
@@ -225,6 +254,143 @@ class TestOsfstorageFileNode(StorageTestCase):
         child = self.node_settings.root_node.append_folder('Cloud').append_file('Carp')
         assert_equals('/Cloud/Carp', child.materialized_path())
 
+    def test_ancestors(self):
+        root = self.node_settings.root_node
+        folder = root.append_folder('Cloud')
+        child = folder.append_file('Carp')
+        assert_equal(root.ancestors, [])
+        assert_equal(folder.ancestors, [root._id])
+        assert_equal(child.ancestors, [root._id, folder._id])
+        assert_equal(child.get_ancestors(), [root, folder])
+        assert_equal(child.get_lineage(), [child, folder, root])
+
+    def test_ancestors_computed_for_unindexed_parent(self):
+        folder = self.node_settings.root_node.append_folder('Cloud')
+        model.OsfStorageFileNode._storage[0].store.update(
+            {'_id': folder._id},
+            {'$set': {'ancestors': []}},
+        )
+        folder.reload()
+        child = folder.append_file('Carp')
+        assert_equal(child.ancestors, [self.node_settings.root_node._id, folder._id])
+
+    def test_materialized_path_unindexed(self):
+        child = self.node_settings.root_node.append_folder('Cloud').append_file('Carp')
+        child.ancestors = []
+        assert_equals('/Cloud/Carp', child.materialized_path())
+
+    def test_descendants(self):
+        folder = self.node_settings.root_node.append_folder('Cloud')
+        sub = folder.append_folder('Sub')
+        child = sub.append_file('Carp')
+        assert_equal(set(folder.descendants), {sub, child})
+
+    def unindex(self, *nodes):
+        for each in nodes:
+            model.OsfStorageFileNode._storage[0].store.update(
+                {'_id': each._id},
+                {'$unset': {'ancestors': True}},
+            )
+            each.reload()
+
+    def test_descendants_unindexed(self):
+        folder = self.node_settings.root_node.append_folder('Cloud')
+        sub = folder.append_folder('Sub')
+        child = sub.append_file('Carp')
+        self.unindex(folder, sub, child)
+        assert_equal(folder.descendants, [sub, child])
+
+    def test_delete_nested_folder_unindexed(self):
+        folder = self.node_settings.root_node.append_folder('Cloud')
+        sub = folder.append_folder('Sub')
+        child = sub.append_file('Carp')
+        self.unindex(folder, sub, child)
+        folder.delete()
+        for each in [folder, sub, child]:
+            assert_is(model.OsfStorageFileNode.load(each._id), None)
+
+    def test_copy_nested_folder_unindexed(self):
+        root = self.node_settings.root_node
+        to_copy = root.append_folder('Carp')
+        sub = to_copy.append_folder('Sub')
+        child = sub.append_file('A dee um')
+        self.unindex(to_copy, sub, child)
+        copied = to_copy.copy_under(root.append_folder('Cloud'))
+        copied_sub = copied.find_child_by_name('Sub', kind='folder')
+        assert_equal(copied_sub.find_child_by_name('A dee um').name, 'A dee um')
+
+    def test_move_folder_unindexed_indexes_subtree(self):
+        root = self.node_settings.root_node
+        to_move = root.append_folder('Carp')
+        sub = to_move.append_folder('Sub')
+        child = sub.append_file('A dee um')
+        self.unindex(to_move, sub, child)
+        move_to = root.append_folder('Cloud')
+
+        to_move.move_under(move_to)
+        child.reload()
+
+        assert_equal(child.ancestors, [root._id, move_to._id, to_move._id, sub._id])
+
+    def test_move_unindexed_folder_to_indexed_node(self):
+        root = self.node_settings.root_node
+        to_move = root.append_folder('Carp')
+        sub = to_move.append_folder('Sub')
+        child = sub.append_file('A dee um')
+        self.unindex(to_move, sub, child)
+        other_node_settings = ProjectFactory().get_addon('osfstorage')
+        move_to = other_node_settings.root_node.append_folder('Cloud')
+
+        to_move.move_under(move_to)
+        sub.reload()
+        child.reload()
+
+        assert_equal(other_node_settings, sub.node_settings)
+        assert_equal(other_node_settings, child.node_settings)
+        assert_equal(
+            child.ancestors,
+            [other_node_settings.root_node._id, move_to._id, to_move._id, sub._id],
+        )
+
+    def test_delete_nested_folder(self):
+        folder = self.node_settings.root_node.append_folder('Cloud')
+        sub = folder.append_folder('Sub')
+        child = sub.append_file('Carp')
+        folder.delete()
+        for each in [folder, sub, child]:
+            assert_is(model.OsfStorageFileNode.load(each._id), None)
+            assert_is_not_none(model.OsfStorageTrashedFileNode.load(each._id))
+
+    def test_move_folder_updates_ancestors(self):
+        root = self.node_settings.root_node
+        to_move = root.append_folder('Carp')
+        sub = to_move.append_folder('Sub')
+        child = sub.append_file('A dee um')
+        move_to = root.append_folder('Cloud')
+
+        to_move.move_under(move_to)
+        sub.reload()
+        child.reload()
+
+        assert_equal(to_move.ancestors, [root._id, move_to._id])
+        assert_equal(sub.ancestors, [root._id, move_to._id, to_move._id])
+        assert_equal(child.ancestors, [root._id, move_to._id, to_move._id, sub._id])
+        assert_equal(child.materialized_path(), '/Cloud/Carp/Sub/A dee um')
+
+    def test_copy_nested_folder(self):
+        root = self.node_settings.root_node
+        to_copy = root.append_folder('Carp')
+        to_copy.append_folder('Sub').append_file('A dee um')
+        copy_to = root.append_folder('Cloud')
+
+        copied = to_copy.copy_under(copy_to)
+
+        copied_sub = copied.find_child_by_name('Sub', kind='folder')
+        copied_child = copied_sub.find_child_by_name('A dee um')
+        assert_equal(copied_child.ancestors, [root._id, copy_to._id, copied._id, copied_sub._id])
+        assert_equal(copied_child.materialized_path(), '/Cloud/Carp/Sub/A dee um')
+        assert_equal(len(list(to_copy.descendants)), 2)
+
     def test_copy(self):
         to_copy = self.node_settings.root_node.append_file('Carp')
         copy_to = self.node_settings.root_node.append_folder('Cloud')
@@ -74,6 +74,19 @@ class TestGetMetadataHook(HookTestCase):
             record.serialized()
         )
 
+    def test_lineage(self):
+        record = recursively_create_file(self.node_settings, 'kind/of/magic.mp3')
+        res = self.send_hook(
+            'osfstorage_get_lineage',
+            {'fid': record._id},
+            {},
+        )
+        folder = record.parent
+        assert_equal(
+            res.json['data'],
+            [record.serialized(), folder.serialized(), folder.parent.serialized(), self.node_settings.root_node.serialized()],
+        )
+
     def test_osf_storage_root(self):
         auth = Auth(self.project.creator)
         result = views.osf_storage_root(self.node_settings, auth=auth)
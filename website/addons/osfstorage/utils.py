@@ -27,14 +27,17 @@ def update_analytics(node, file_id, version_idx):
     update_counter(u'download:{0}:{1}:{2}'.format(node._id, file_id, version_idx))
 
 
-def serialize_revision(node, record, version, index, anon=False):
+def serialize_revision(node, record, version, index, anon=False, downloads=None):
     """Serialize revision for use in revisions table.
 
     :param Node node: Root node
     :param FileRecord record: Root file record
     :param FileVersion version: The version to serialize
     :param int index: One-based index of version
+    :param int downloads: Download count of the version, if already known
     """
+    if downloads is None:
+        downloads = record.get_download_count(version=index)
 
     if anon:
         user = None
@@ -48,7 +51,7 @@ def serialize_revision(node, record, version, index, anon=False):
         'user': user,
         'index': index + 1,
         'date': version.date_created.isoformat(),
-        'downloads': record.get_download_count(version=index),
+        'downloads': downloads,
     }
 
 
@@ -107,6 +110,21 @@ def copy_files(src, target_settings, parent=None, name=None):
     :param OsfStorageNodeSettings target_settings: The node settings of the project to copy files to
     :param OsfStorageFileNode parent: The parent of to attach the clone of src to, if applicable
     """
+    cloned = _clone_file_node(src, target_settings, parent, name=name)
+
+    if src.is_folder:
+        # Clone the whole subtree, shallowest first so that every parent has
+        # been cloned before its children
+        clones = {src._id: cloned}
+        for descendant in src.descendants:
+            clones[descendant._id] = _clone_file_node(
+                descendant, target_settings, clones[descendant._get_parent_id()],
+            )
+
+    return cloned
+
+
+def _clone_file_node(src, target_settings, parent, name=None):
     cloned = src.clone()
     cloned.parent = parent
     cloned.name = name or cloned.name
@@ -116,9 +134,4 @@ def copy_files(src, target_settings, parent=None, name=None):
         cloned.versions = src.versions
 
     cloned.save()
-
-    if src.is_folder:
-        for child in src.children:
-            copy_files(child, target_settings, parent=cloned)
-
     return cloned
@@ -3,7 +3,6 @@ from __future__ import unicode_literals
 import httplib
 import logging
 
-from modularodm import Q
 from modularodm.storage.base import KeyExistsException
 
 from flask import request
@@ -76,11 +75,13 @@ def osfstorage_update_metadata(node_addon, payload, **kwargs):
 def osfstorage_get_revisions(file_node, node_addon, payload, **kwargs):
     is_anon = has_anonymous_link(node_addon.owner, Auth(private_key=request.args.get('view_only')))
 
+    counts = file_node.get_version_download_counts()
+
     # Return revisions in descending order
     return {
         'revisions': [
-            utils.serialize_revision(node_addon.owner, file_node, version, index=len(file_node.versions) - idx - 1, anon=is_anon)
-            for idx, version in enumerate(reversed(file_node.versions))
+            utils.serialize_revision(node_addon.owner, file_node, version, index=index, anon=is_anon, downloads=counts[index])
+            for index, version in reversed(list(enumerate(file_node.versions)))
         ]
     }
 
@@ -98,16 +99,14 @@ def osfstorage_move_hook(source, destination, name=None, **kwargs):
 @must_be_signed
 @decorators.autoload_filenode(default_root=True)
 def osfstorage_get_lineage(file_node, node_addon, **kwargs):
-    #TODO Profile
-    list(model.OsfStorageFileNode.find(Q('kind', 'eq', 'folder') & Q('node_settings', 'eq', node_addon)))
-
-    lineage = []
-
-    while file_node:
-        lineage.append(file_node.serialized())
-        file_node = file_node.parent
-
-    return {'data': lineage}
+    lineage = file_node.get_lineage()
+    counts = model.OsfStorageFileNode.get_download_counts(lineage)
+    return {
+        'data': [
+            each.serialized(downloads=counts[each._id])
+            for each in lineage
+        ]
+    }
 
 
 @must_be_signed
@@ -119,9 +118,11 @@ def osfstorage_get_metadata(file_node, **kwargs):
 @must_be_signed
 @decorators.autoload_filenode(must_be='folder')
 def osfstorage_get_children(file_node, **kwargs):
+    children = list(file_node.children)
+    counts = model.OsfStorageFileNode.get_download_counts(children)
     return [
-        child.serialized()
-        for child in file_node.children
+        child.serialized(downloads=counts[child._id])
+        for child in children
     ]
 
 
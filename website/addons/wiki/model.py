@@ -16,6 +16,7 @@ from framework.guid.model import GuidStoredObject
 
 from website import settings
 from website.addons.base import AddonNodeSettingsBase
+from website.addons.wiki import render_cache
 from website.addons.wiki import utils as wiki_utils
 from website.addons.wiki.settings import WIKI_CHANGE_DATE
 from website.project.signals import write_permissions_revoked
@@ -119,22 +120,32 @@ class NodeWikiPage(GuidStoredObject):
     def rendered_before_update(self):
         return self.date < WIKI_CHANGE_DATE
 
-    def html(self, node):
-        """The cleaned HTML of the page"""
+    def _render(self, node):
         sanitized_content = render_content(self.content, node=node)
         try:
-            return linkify(
+            html = linkify(
                 sanitized_content,
                 [nofollow, ],
             )
         except TypeError:
             logger.warning('Returning unlinkified content.')
-            return sanitized_content
+            html = sanitized_content
+        return html, sanitize(html, tags=[], strip=True)
+
+    def _get_rendered(self, node):
+        return render_cache.get_rendered(
+            self._id, node._id, self.content,
+            functools.partial(self._render, node),
+        )
+
+    def html(self, node):
+        """The cleaned HTML of the page"""
+        return self._get_rendered(node)['html']
 
     def raw_text(self, node):
         """ The raw text of the page, suitable for using in a test search"""
 
-        return sanitize(self.html(node), tags=[], strip=True)
+        return self._get_rendered(node)['text']
 
     def get_draft(self, node):
         """
@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+"""Cache of rendered wiki page versions.
+
+Rendering a page runs markdown, sanitization and linkification, and search
+reindexing does it for every current page of a node even when no wiki has
+changed. Rendered HTML and its stripped text are stored per (page, node):
+
+    {
+        '_id': '<page_id>:<node_id>',
+        'page': '<page_id>',
+        'node': '<node_id>',
+        'content_hash': '<sha1 of the page content>',
+        'renderer_version': RENDERER_VERSION,
+        'html': '...',
+        'text': '...',
+    }
+
+An entry is only used if both the content hash and the renderer version
+match. Bump `RENDERER_VERSION` whenever `render_content` or the wiki
+whitelist changes the output.
+"""
+
+import hashlib
+
+from framework.mongo import database
+
+
+COLLECTION_NAME = 'wikirendercache'
+
+RENDERER_VERSION = 1
+
+
+def get_collection(db=None):
+    return (db or database)[COLLECTION_NAME]
+
+
+def ensure_indices(db=None):
+    get_collection(db).ensure_index('page')
+
+
+def hash_content(content):
+    if isinstance(content, unicode):
+        content = content.encode('utf-8')
+    return hashlib.sha1(content or '').hexdigest()
+
+
+def get_rendered(page_id, node_id, content, render, db=None):
+    """Return the cached rendering of a page version, rendering and storing it
+    if missing or stale.
+
+    :param str page_id: Primary key of the `NodeWikiPage`
+    :param str node_id: Primary key of the node the page is rendered for;
+        wiki links are built relative to it
+    :param str content: Page content
+    :param render: Callable returning a tuple of (html, text)
+    :return: Dict with ``html`` and ``text`` keys
+    """
+    collection = get_collection(db)
+    entry_id = '{0}:{1}'.format(page_id, node_id)
+    content_hash = hash_content(content)
+    entry = collection.find_one({
+        '_id': entry_id,
+        'content_hash': content_hash,
+        'renderer_version': RENDERER_VERSION,
+    })
+    if entry is not None:
+        return entry
+
+    html, text = render()
+    entry = {
+        '_id': entry_id,
+        'page': page_id,
+        'node': node_id,
+        'content_hash': content_hash,
+        'renderer_version': RENDERER_VERSION,
+        'html': html,
+        'text': text,
+    }
+    collection.save(entry)
+    return entry
+
+
+def invalidate(page_ids, db=None):
+    """Drop cached renderings of the given page versions."""
+    page_ids = [page_id for page_id in page_ids if page_id]
+    if page_ids:
+        get_collection(db).remove({'page': {'$in': page_ids}})
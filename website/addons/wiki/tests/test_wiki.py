@@ -16,6 +16,7 @@ from tests.factories import (
     AuthUserFactory, NodeWikiFactory,
 )
 
+from website.addons.wiki import render_cache
 from website.addons.wiki import settings
 from website.addons.wiki import views
 from website.addons.wiki.exceptions import InvalidVersionError
@@ -686,6 +687,59 @@ class TestWikiLinks(OsfTestCase):
         assert_equal(expected, wiki.html(node))
 
 
+class TestWikiRenderCache(OsfTestCase):
+
+    def setUp(self):
+        super(TestWikiRenderCache, self).setUp()
+        self.user = AuthUserFactory()
+        self.auth = Auth(user=self.user)
+        self.project = ProjectFactory(creator=self.user)
+        self.project.update_node_wiki('home', 'Hello *world*', self.auth)
+        self.page = self.project.get_wiki_page('home')
+
+    def test_render_is_cached(self):
+        html = self.page.html(self.project)
+        with mock.patch('website.addons.wiki.model.render_content') as mock_render:
+            assert_equal(self.page.html(self.project), html)
+            assert_equal(self.page.raw_text(self.project), 'Hello world')
+        assert_false(mock_render.called)
+
+    def test_changed_content_is_rerendered(self):
+        self.page.html(self.project)
+        self.page.content = 'Goodbye'
+        assert_in('Goodbye', self.page.html(self.project))
+
+    def test_renderer_version_change_is_rerendered(self):
+        self.page.html(self.project)
+        with mock.patch.object(render_cache, 'RENDERER_VERSION', render_cache.RENDERER_VERSION + 1):
+            with mock.patch('website.addons.wiki.model.render_content', return_value='new') as mock_render:
+                assert_equal(self.page.html(self.project), 'new')
+        assert_true(mock_render.called)
+
+    def test_update_invalidates_previous_version(self):
+        self.page.html(self.project)
+        self.project.update_node_wiki('home', 'Second', self.auth)
+        assert_is_none(render_cache.get_collection().find_one({'page': self.page._id}))
+        assert_in('Second', self.project.get_wiki_page('home').html(self.project))
+
+    def test_rename_invalidates_page(self):
+        self.project.update_node_wiki('other', 'Content', self.auth)
+        page = self.project.get_wiki_page('other')
+        page.html(self.project)
+        self.project.rename_node_wiki('other', 'renamed', self.auth)
+        assert_is_none(render_cache.get_collection().find_one({'page': page._id}))
+
+    def test_fork_renders_links_for_fork(self):
+        self.project.update_node_wiki('home', '[[wiki2]]', self.auth)
+        page = self.project.get_wiki_page('home')
+        page.html(self.project)
+        fork = self.project.fork_node(self.auth)
+        assert_in(
+            fork.web_url_for('project_wiki_view', wname='wiki2'),
+            page.html(fork),
+        )
+
+
 class TestWikiUuid(OsfTestCase):
 
     def setUp(self):
@@ -14,6 +14,8 @@ from website.oauth.models import ExternalProvider
 # of citations, requesting the citations may take longer than the UWSGI harakiri time.
 # For now, we load 200 citations max and show a message to the user.
 MAX_CITATION_LOAD = 200
+# Largest page size allowed by the API
+PAGE_SIZE = 100
 
 class Zotero(ExternalProvider):
     name = "Zotero"
@@ -80,37 +82,51 @@ class Zotero(ExternalProvider):
             list_id = None
 
         if list_id:
-            citations = []
-            more = True
-            offset = 0
-            while more and len(citations) <= MAX_CITATION_LOAD:
-                page = self.client.collection_items(list_id, content='csljson', size=100, start=offset)
-                citations = citations + page
-                if len(page) == 0 or len(page) < 100:
-                    more = False
-                else:
-                    offset = offset + len(page)
-            return self._citations_for_zotero_collection(citations)
+            return self._citations_for_zotero_collection(list_id)
         else:
             return self._citations_for_zotero_user()
 
-    def _citations_for_zotero_collection(self, collection):
+    def fetch_list(self, list_id=None):
+        """Get the citations in a collection, and the state to refresh them
+        from with `refresh_list`.
+        """
+        # Read the version first, so that changes made while the items are
+        # fetched are picked up by the next refresh
+        version = self.client.last_modified_version()
+        return self.get_list(list_id), {'version': version}
+
+    def refresh_list(self, list_id, citations, state):
+        """Update citations returned by `fetch_list` if the library changed
+        since.
+
+        Items removed from a collection or deleted are not listed as
+        changes, so the collection is fetched again when anything changed.
+        """
+        if self.client.last_modified_version() == state['version']:
+            return citations, state
+        return self.fetch_list(list_id)
+
+    def _citations_for_zotero_collection(self, collection_id):
         """Get all the citations in a specified collection
 
-        :param  csljson collection: list of csljson documents
+        :param str collection_id: Key of the collection
         :return list of citation objects representing said dicts of said documents.
         """
-        return collection
+        return self._fetch_citations(self.client.collection_items, collection_id)
 
     def _citations_for_zotero_user(self):
         """Get all the citations from the user """
+        return self._fetch_citations(self.client.items)
+
+    def _fetch_citations(self, method, *args):
+        """Fetch up to ``MAX_CITATION_LOAD`` citations, a page at a time."""
         citations = []
         more = True
         offset = 0
         while more and len(citations) <= MAX_CITATION_LOAD:
-            page = self.client.items(content='csljson', limit=100, start=offset)
+            page = method(*args, content='csljson', limit=PAGE_SIZE, start=offset)
             citations = citations + page
-            if len(page) == 0 or len(page) < 100:
+            if len(page) == 0 or len(page) < PAGE_SIZE:
                 more = False
             else:
                 offset = offset + len(page)
@@ -61,6 +61,37 @@ class ZoteroProviderTestCase(OsfTestCase):
             'Fake Key'
         )
 
+    def test_get_list_pages_through_collection(self):
+        mock_client = mock.Mock()
+        mock_client.collection_items.side_effect = [
+            [{'id': each} for each in range(model.PAGE_SIZE)],
+            [{'id': 'last'}],
+        ]
+        self.provider._client = mock_client
+        citations = self.provider.get_list('collection')
+        assert_equal(len(citations), model.PAGE_SIZE + 1)
+        mock_client.collection_items.assert_called_with(
+            'collection', content='csljson', limit=model.PAGE_SIZE, start=model.PAGE_SIZE,
+        )
+        assert_false(mock_client.items.called)
+
+    def test_refresh_list_unchanged_library(self):
+        mock_client = mock.Mock()
+        mock_client.last_modified_version.return_value = 5
+        self.provider._client = mock_client
+        citations = [{'id': 'cached'}]
+        res = self.provider.refresh_list('collection', citations, {'version': 5})
+        assert_equal(res, (citations, {'version': 5}))
+        assert_false(mock_client.collection_items.called)
+
+    def test_refresh_list_changed_library(self):
+        mock_client = mock.Mock()
+        mock_client.last_modified_version.return_value = 6
+        mock_client.collection_items.return_value = [{'id': 'new'}]
+        self.provider._client = mock_client
+        res = self.provider.refresh_list('collection', [{'id': 'cached'}], {'version': 5})
+        assert_equal(res, ([{'id': 'new'}], {'version': 6}))
+
 class ZoteroNodeSettingsTestCase(OsfTestCase):
 
     def setUp(self):
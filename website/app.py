@@ -11,8 +11,10 @@ import framework
 from framework.flask import app, add_handlers
 from framework.logging import logger
 from framework.mongo import set_up_storage
+from framework.auth import watched_logs
 from framework.addons.utils import render_addon_capabilities
 from framework.sentry import sentry
+from framework.sessions import store as session_store
 from framework.mongo import handlers as mongo_handlers
 from framework.tasks import handlers as task_handlers
 from framework.transactions import handlers as transaction_handlers
@@ -20,7 +22,16 @@ from framework.transactions import handlers as transaction_handlers
 import website.models
 from website.routes import make_url_map
 from website.addons.base import init_addon
+from website.addons.wiki import render_cache
+from website.addons.citations import cache as citation_cache
+from website.addons.base import metadata_cache as waterbutler_metadata_cache
+from website.conferences import submissions as conference_submissions
+from website.project import aggregate_logs
+from website.project import dashboard_rows
 from website.project.model import ensure_schemas, Node
+from website.util import hgrid_cache
+from website.util import waterbutler_auth_cache
+from website.project import permission_resolver
 
 def build_js_config_files(settings):
     with open(os.path.join(settings.STATIC_FOLDER, 'built', 'nodeCategories.json'), 'wb') as fp:
@@ -49,6 +60,7 @@ def attach_handlers(app, settings):
     add_handlers(app, mongo_handlers.handlers)
     add_handlers(app, task_handlers.handlers)
     add_handlers(app, transaction_handlers.handlers)
+    add_handlers(app, permission_resolver.handlers)
 
     # Attach handler for checking view-only link keys.
     # NOTE: This must be attached AFTER the TokuMX to avoid calling
@@ -92,6 +104,16 @@ def do_set_backends(settings):
         storage.MongoStorage,
         addons=settings.ADDONS_AVAILABLE,
     )
+    aggregate_logs.ensure_indices()
+    watched_logs.ensure_indices()
+    render_cache.ensure_indices()
+    hgrid_cache.ensure_indices()
+    waterbutler_auth_cache.ensure_indices()
+    waterbutler_metadata_cache.ensure_indices()
+    citation_cache.ensure_indices()
+    conference_submissions.ensure_indices()
+    dashboard_rows.ensure_indices()
+    session_store.ensure_indices()
 
 def init_app(settings_module='website.settings', set_backends=True, routes=True,
         attach_request_handlers=True):
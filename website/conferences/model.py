@@ -6,6 +6,7 @@ from modularodm.exceptions import ModularOdmException
 
 from framework.mongo import StoredObject
 
+from website.conferences import submissions
 from website.conferences.exceptions import ConferenceError
 
 
@@ -15,6 +16,8 @@ class Conference(StoredObject):
     # spsp2014-talk@osf.io or spsp2014-poster@osf.io and the OSF url will
     # be osf.io/view/spsp2014
     endpoint = fields.StringField(primary=True, required=True, unique=True)
+    #: Lowercased endpoint, to match node tags without a regex
+    endpoint_lower = fields.StringField(index=True)
     #: Full name, e.g. "SPSP 2014"
     name = fields.StringField(required=True)
     info_url = fields.StringField(required=False, default=None)
@@ -24,6 +27,15 @@ class Conference(StoredObject):
     #: Whether to make submitted projects public
     public_projects = fields.BooleanField(required=False, default=True)
 
+    def save(self, *args, **kwargs):
+        first_save = not self._is_loaded
+        self.endpoint_lower = self.endpoint.lower() if self.endpoint else None
+        saved_fields = super(Conference, self).save(*args, **kwargs)
+        if first_save:
+            # Index nodes tagged before the conference was created
+            submissions.index_conference(self.endpoint)
+        return saved_fields
+
     @classmethod
     def get_by_endpoint(cls, endpoint, active=True):
         query = Q('endpoint', 'iexact', endpoint)
@@ -0,0 +1,222 @@
+# -*- coding: utf-8 -*-
+"""Index of the submissions to each conference.
+
+A node is a submission to a conference when it is public, not deleted and
+tagged with the conference's endpoint, ignoring case. Rather than querying
+nodes by tag and rendering every submission on each view of the meetings
+pages, one document is kept per (conference, node) pair:
+
+    {
+        '_id': '<endpoint>:<node_id>',
+        'conference': '<endpoint>',
+        'node': '<node_id>',
+        'created': <datetime>,
+        'row': {<grid row, without download counts and URLs>},
+        'file': {'id': '<file id>', 'path': '<path>'},  # Or None
+    }
+
+The index is kept in sync by `Node.save` when a tagged node's tags, privacy,
+title or contributors change, and by `update_file` when WaterButler reports
+a change to a node's OSF Storage files. A conference's submissions are
+indexed when the conference is created. Run
+`scripts/migrate_conference_submissions.py` to rebuild it.
+"""
+
+import logging
+
+from modularodm import Q
+
+from framework.mongo import database
+from framework.analytics import get_basic_counters_many
+
+from website.util import web_url_for
+
+
+logger = logging.getLogger(__name__)
+
+COLLECTION_NAME = 'conferencesubmissions'
+
+# Changes to these node fields may change the node's submissions or rows
+NODE_FIELDS = frozenset([
+    'tags', 'system_tags', 'is_public', 'is_deleted', 'title', 'creator',
+    'contributors', 'visible_contributor_ids',
+])
+
+
+def get_collection(db=None):
+    return (db or database)[COLLECTION_NAME]
+
+
+def ensure_indices(db=None):
+    collection = get_collection(db)
+    collection.ensure_index([('conference', 1), ('created', 1)])
+    collection.ensure_index('node')
+
+
+def _entry_id(endpoint, node_id):
+    return '{0}:{1}'.format(endpoint, node_id)
+
+
+def get_endpoints(tags):
+    """Return the endpoints of the conferences matching any of ``tags``,
+    ignoring case.
+    """
+    from website.conferences.model import Conference
+    if not tags:
+        return []
+    cursor = Conference._storage[0].store.find(
+        {'endpoint_lower': {'$in': [tag.lower() for tag in tags]}},
+        {'_id': 1},
+    )
+    return [each['_id'] for each in cursor]
+
+
+def _get_file(node):
+    storage_settings = node.get_addon('osfstorage')
+    if storage_settings is None:
+        return None
+    record = next(
+        (each for each in storage_settings.root_node.children if not each.is_deleted),
+        None,
+    )
+    if record is None:
+        return None
+    return {'id': record._id, 'path': record.path}
+
+
+def render_row(node):
+    """Render the parts of a node's row in the conference grid that do not
+    change between requests.
+    """
+    author = next(iter(node.visible_contributors), node.creator)
+    return {
+        'title': node.title,
+        'nodeUrl': node.url,
+        'author': author.family_name,
+        'authorUrl': node.creator.url,
+        'category': 'talk' if 'talk' in node.system_tags else 'poster',
+        'tags': ' '.join(tag._id for tag in node.tags),
+    }
+
+
+def _build_entry(endpoint, node):
+    return {
+        '_id': _entry_id(endpoint, node._id),
+        'conference': endpoint,
+        'node': node._id,
+        'created': node.date_created,
+        'row': render_row(node),
+        'file': _get_file(node),
+    }
+
+
+def _is_submission(node):
+    return node.is_public and not node.is_deleted
+
+
+def sync_node(node, db=None):
+    """Bring the index in line with the tags, privacy and contents of
+    ``node``.
+
+    :return list: Endpoints of the conferences the node is submitted to
+    """
+    collection = get_collection(db)
+    if _is_submission(node):
+        endpoints = get_endpoints(node.tags._to_primary_keys())
+    else:
+        endpoints = []
+    collection.remove({'node': node._id, 'conference': {'$nin': endpoints}})
+    for endpoint in endpoints:
+        collection.save(_build_entry(endpoint, node))
+    return endpoints
+
+
+def update_file(node, db=None):
+    """Update the file of each of ``node``'s submissions, after files were
+    added to or removed from its OSF Storage.
+    """
+    collection = get_collection(db)
+    if collection.find_one({'node': node._id}, {'_id': 1}) is None:
+        return
+    collection.update(
+        {'node': node._id},
+        {'$set': {'file': _get_file(node)}},
+        multi=True,
+    )
+
+
+def index_conference(endpoint, db=None):
+    """Index every submission to the conference with ``endpoint``, replacing
+    its current entries.
+    """
+    from website.models import Node
+    collection = get_collection(db)
+    collection.remove({'conference': endpoint})
+    nodes = Node.find(
+        Q('tags', 'iexact', endpoint) &
+        Q('is_public', 'eq', True) &
+        Q('is_deleted', 'eq', False)
+    )
+    entries = [_build_entry(endpoint, node) for node in nodes]
+    if entries:
+        collection.insert(entries)
+    return len(entries)
+
+
+def count_submissions(db=None):
+    """Return the number of submissions to each conference with any.
+
+    :return dict: Counts keyed by endpoint
+    """
+    result = get_collection(db).aggregate([
+        {'$group': {'_id': '$conference', 'count': {'$sum': 1}}},
+    ])
+    return dict((each['_id'], each['count']) for each in result['result'])
+
+
+def _download_page(entry):
+    return 'download:{0}:{1}'.format(entry['node'], entry['file']['id'])
+
+
+def _serialize_entry(entry, idx, counters):
+    ret = dict(entry['row'], id=idx, download=0, downloadUrl='')
+    record = entry.get('file')
+    if record:
+        _, count = counters[_download_page(entry)]
+        ret['download'] = count or 0
+        ret['downloadUrl'] = web_url_for(
+            'addon_view_or_download_file',
+            pid=entry['node'],
+            path=record['path'],
+            provider='osfstorage',
+            action='download',
+            _absolute=True,
+        )
+    return ret
+
+
+def get_rows(endpoint, page=0, size=None, db=None):
+    """Return rows of the conference grid for the submissions to the
+    conference with ``endpoint``, oldest first.
+
+    :param int page: Page number
+    :param int size: Page size; all rows are returned if `None`
+    :return: Tuple of (list of rows, total number of submissions)
+    """
+    query = {'conference': endpoint}
+    collection = get_collection(db)
+    cursor = collection.find(query).sort('created', 1)
+    start = 0
+    if size is not None:
+        start = page * size
+        cursor = cursor.skip(start).limit(size)
+    entries = list(cursor)
+    counters = get_basic_counters_many(
+        [_download_page(entry) for entry in entries if entry.get('file')]
+    )
+    rows = [
+        _serialize_entry(entry, idx, counters)
+        for idx, entry in enumerate(entries, start)
+    ]
+    total = len(rows) if size is None else collection.find(query).count()
+    return rows, total
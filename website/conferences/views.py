@@ -8,17 +8,16 @@ from modularodm import Q
 from modularodm.exceptions import ModularOdmException
 
 from framework.exceptions import HTTPError
-from framework.flask import redirect
+from framework.flask import redirect, request
 from framework.transactions.context import TokuTransaction
 from framework.transactions.handlers import no_auto_transaction
 
 from website import settings
-from website.models import Node
 from website.util import web_url_for
 from website.mails import send_mail
 from website.mails import CONFERENCE_SUBMITTED, CONFERENCE_INACTIVE, CONFERENCE_FAILED
 
-from website.conferences import utils
+from website.conferences import utils, submissions
 from website.conferences.message import ConferenceMessage, ConferenceError
 from website.conferences.model import Conference
 
@@ -125,60 +124,28 @@ def add_poster_by_email(conference, message):
     )
 
 
-def _render_conference_node(node, idx):
-    storage_settings = node.get_addon('osfstorage')
-    records = storage_settings.root_node.children
-    try:
-        record = next(
-            each for each in records
-            if not each.is_deleted,
-        )
-        download_count = record.get_download_count()
-
-        download_url = node.web_url_for(
-            'addon_view_or_download_file',
-            path=record.path,
-            provider='osfstorage',
-            action='download',
-            _absolute=True,
-        )
-    except StopIteration:
-        download_url = ''
-        download_count = 0
-
-    author = node.visible_contributors[0]
-    tags = [tag._id for tag in node.tags]
-
-    return {
-        'id': idx,
-        'title': node.title,
-        'nodeUrl': node.url,
-        'author': author.family_name,
-        'authorUrl': node.creator.url,
-        'category': 'talk' if 'talk' in node.system_tags else 'poster',
-        'download': download_count,
-        'downloadUrl': download_url,
-        'tags': ' '.join(tags)
-    }
-
-
 def conference_data(meeting):
+    """Return rows of the grid view for a conference. Pass ``page`` and
+    ``size`` query parameters to fetch one page of rows.
+
+    :param str meeting: Endpoint name for a conference.
+    """
     try:
-        Conference.find_one(Q('endpoint', 'iexact', meeting))
+        conf = Conference.find_one(Q('endpoint', 'iexact', meeting))
     except ModularOdmException:
         raise HTTPError(httplib.NOT_FOUND)
 
-    nodes = Node.find(
-        Q('tags', 'iexact', meeting) &
-        Q('is_public', 'eq', True) &
-        Q('is_deleted', 'eq', False)
-    )
+    size = request.args.get('size')
+    try:
+        page = int(request.args.get('page', 0))
+        size = int(size) if size is not None else None
+    except ValueError:
+        raise HTTPError(httplib.BAD_REQUEST)
+    if page < 0 or (size is not None and size < 1):
+        raise HTTPError(httplib.BAD_REQUEST)
 
-    ret = [
-        _render_conference_node(each, idx)
-        for idx, each in enumerate(nodes)
-    ]
-    return ret
+    rows, _ = submissions.get_rows(conf.endpoint, page=page, size=size)
+    return rows
 
 
 def redirect_to_meetings(**kwargs):
@@ -195,7 +162,7 @@ def conference_results(meeting):
     except ModularOdmException:
         raise HTTPError(httplib.NOT_FOUND)
 
-    data = conference_data(meeting)
+    data, _ = submissions.get_rows(conf.endpoint)
 
     return {
         'data': json.dumps(data),
@@ -208,22 +175,17 @@ def conference_results(meeting):
 
 def conference_view(**kwargs):
 
+    counts = submissions.count_submissions()
     meetings = []
     for conf in Conference.find():
-        query = (
-            Q('tags', 'iexact', conf.endpoint)
-            & Q('is_public', 'eq', True)
-            & Q('is_deleted', 'eq', False)
-        )
-        projects = Node.find(query)
-        submissions = projects.count()
-        if submissions < settings.CONFERNCE_MIN_COUNT:
+        count = counts.get(conf.endpoint, 0)
+        if count < settings.CONFERNCE_MIN_COUNT:
             continue
         meetings.append({
             'name': conf.name,
             'active': conf.active,
             'url': web_url_for('conference_results', meeting=conf.endpoint),
-            'submissions': submissions,
+            'submissions': count,
         })
     meetings.sort(key=lambda meeting: meeting['submissions'], reverse=True)
 
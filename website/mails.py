@@ -68,26 +68,12 @@ def render_message(tpl_name, **context):
     return tpl.render(**context)
 
 
-def send_mail(to_addr, mail, mimetype='plain', from_addr=None, mailer=None,
-            username=None, password=None, mail_server=None, callback=None, **context):
-    """Send an email from the OSF.
-    Example: ::
-
-        from website import mails
-
-        mails.send_email('foo@bar.com', mails.TEST, name="Foo")
-
-    :param str to_addr: The recipient's email address
-    :param Mail mail: The mail object
-    :param str mimetype: Either 'plain' or 'html'
-    :param function callback: celery task to execute after send_mail completes
-    :param **context: Context vars for the message template
-
-    .. note:
-         Uses celery if available
+def build_mail(to_addr, mail, mimetype='plain', from_addr=None,
+               username=None, password=None, mail_server=None, **context):
+    """Render an email into the keyword arguments of
+    `framework.email.tasks.send_email`.
     """
     from_addr = from_addr or settings.FROM_EMAIL
-    mailer = mailer or tasks.send_email
     subject = mail.subject(**context)
     message = mail.text(**context) if mimetype in ('plain', 'txt') else mail.html(**context)
     # Don't use ttls and login in DEBUG_MODE
@@ -95,7 +81,7 @@ def send_mail(to_addr, mail, mimetype='plain', from_addr=None, mailer=None,
     logger.debug('Sending email...')
     logger.debug(u'To: {to_addr}\nFrom: {from_addr}\nSubject: {subject}\nMessage: {message}'.format(**locals()))
 
-    kwargs = dict(
+    return dict(
         from_addr=from_addr,
         to_addr=to_addr,
         subject=subject,
@@ -107,6 +93,32 @@ def send_mail(to_addr, mail, mimetype='plain', from_addr=None, mailer=None,
         password=password,
         mail_server=mail_server)
 
+
+def send_mail(to_addr, mail, mimetype='plain', from_addr=None, mailer=None,
+            username=None, password=None, mail_server=None, callback=None, **context):
+    """Send an email from the OSF.
+    Example: ::
+
+        from website import mails
+
+        mails.send_email('foo@bar.com', mails.TEST, name="Foo")
+
+    :param str to_addr: The recipient's email address
+    :param Mail mail: The mail object
+    :param str mimetype: Either 'plain' or 'html'
+    :param function callback: celery task to execute after send_mail completes
+    :param **context: Context vars for the message template
+
+    .. note:
+         Uses celery if available
+    """
+    mailer = mailer or tasks.send_email
+    kwargs = build_mail(
+        to_addr, mail, mimetype=mimetype, from_addr=from_addr,
+        username=username, password=password, mail_server=mail_server,
+        **context
+    )
+
     if settings.USE_CELERY:
         return mailer.apply_async(kwargs=kwargs, link=callback)
     else:
@@ -116,6 +128,22 @@ def send_mail(to_addr, mail, mimetype='plain', from_addr=None, mailer=None,
 
         return ret
 
+
+def send_mails(messages, mailer=None):
+    """Send several emails as a single task.
+
+    :param list messages: Emails built by `build_mail`
+
+    .. note:
+         Uses celery if available
+    """
+    if not messages:
+        return None
+    mailer = mailer or tasks.send_emails
+    if settings.USE_CELERY:
+        return mailer.apply_async(kwargs={'messages': messages})
+    return mailer(messages=messages)
+
 # Predefined Emails
 
 TEST = Mail('test', subject='A test email to ${name}')
@@ -1,5 +1,8 @@
+import collections
+
 from babel import dates, core, Locale
 from mako.lookup import Template
+from modularodm import Q
 
 from website import mails
 from website import models as website_models
@@ -29,16 +32,17 @@ def email_transactional(recipient_ids, uid, event, user, node, timestamp, **cont
     context['title'] = node.title
     context['user'] = user
     subject = Template(EMAIL_SUBJECT_MAP[event]).render(**context)
-
-    for user_id in recipient_ids:
-        recipient = website_models.User.load(user_id)
-        email = recipient.username
-        context['localized_timestamp'] = localize_timestamp(timestamp, recipient)
-        message = mails.render_message(template, **context)
-
-        if user._id != recipient._id:
-            mails.send_mail(
-                to_addr=email,
+    settings_urls = {}
+
+    messages = []
+    for message, recipients in render_for_recipients(recipient_ids, user, template, timestamp, context):
+        for recipient in recipients:
+            # Only differs for subscriptions owned by the recipient
+            url_key = uid == recipient._id
+            if url_key not in settings_urls:
+                settings_urls[url_key] = get_settings_url(uid, recipient)
+            messages.append(mails.build_mail(
+                to_addr=recipient.username,
                 mail=mails.TRANSACTIONAL,
                 mimetype='html',
                 name=recipient.fullname,
@@ -46,8 +50,9 @@ def email_transactional(recipient_ids, uid, event, user, node, timestamp, **cont
                 node_title=node.title,
                 subject=subject,
                 message=message,
-                url=get_settings_url(uid, recipient)
-            )
+                url=settings_urls[url_key],
+            ))
+    mails.send_mails(messages)
 
 
 def email_digest(recipient_ids, uid, event, user, node, timestamp, **context):
@@ -58,20 +63,41 @@ def email_digest(recipient_ids, uid, event, user, node, timestamp, **context):
     context['user'] = user
     node_lineage_ids = get_node_lineage(node) if node else []
 
-    for user_id in recipient_ids:
-        recipient = website_models.User.load(user_id)
-        context['localized_timestamp'] = localize_timestamp(timestamp, recipient)
-        message = mails.render_message(template, **context)
+    # Serialize through the model so that stored digests match those saved
+    # one at a time, then write them in a single insert
+    digests = [
+        NotificationDigest(
+            timestamp=timestamp,
+            event=event,
+            user_id=recipient._id,
+            message=message,
+            node_lineage=node_lineage_ids,
+        ).to_storage()
+        for message, recipients in render_for_recipients(recipient_ids, user, template, timestamp, context)
+        for recipient in recipients
+    ]
+    if digests:
+        NotificationDigest._storage[0].store.insert(digests)
+
+
+def render_for_recipients(recipient_ids, user, template, timestamp, context):
+    """Render ``template`` once for each timezone and locale among the
+    recipients, leaving out the user who caused the event.
+
+    :return: List of (message, list of recipients) tuples
+    """
+    variants = collections.OrderedDict()
+    for recipient in website_models.User.find(Q('_id', 'in', list(recipient_ids))):
+        if recipient._id == user._id:
+            continue
+        key = (recipient.timezone, recipient.locale)
+        variants.setdefault(key, []).append(recipient)
 
-        if user._id != recipient._id:
-            digest = NotificationDigest(
-                timestamp=timestamp,
-                event=event,
-                user_id=recipient._id,
-                message=message,
-                node_lineage=node_lineage_ids
-            )
-            digest.save()
+    rendered = []
+    for recipients in variants.values():
+        context['localized_timestamp'] = localize_timestamp(timestamp, recipients[0])
+        rendered.append((mails.render_message(template, **context), recipients))
+    return rendered
 
 
 EMAIL_FUNCTION_MAP = {
@@ -101,9 +127,7 @@ def notify(uid, event, user, node, timestamp, **context):
             node_subscribers.extend(subscribed_users)
 
             if subscribed_users and notification_type != 'none':
-                for recipient in subscribed_users:
-                    event = 'comment_replies' if context.get('target_user') == recipient else event
-                    send([recipient._id], notification_type, uid, event, user, node, timestamp, **context)
+                dispatch(subscribed_users, notification_type, uid, event, user, node, timestamp, **context)
 
     return check_parent(uid, event, node_subscribers, user, node, timestamp, **context)
 
@@ -113,7 +137,6 @@ def check_parent(uid, event, node_subscribers, user, orig_node, timestamp, **con
         and send transactional email to indirect subscribers.
     """
     node = website_models.Node.load(uid)
-    target_user = context.get('target_user', None)
 
     if node and node.parent_id:
         key = utils.to_subscription_key(node.parent_id, event)
@@ -125,18 +148,33 @@ def check_parent(uid, event, node_subscribers, user, orig_node, timestamp, **con
         for notification_type in constants.NOTIFICATION_TYPES:
             subscribed_users = getattr(subscription, notification_type, [])
 
+            recipients = []
             for u in subscribed_users:
                 if u not in node_subscribers and node.has_permission(u, 'read'):
-                    if notification_type != 'none':
-                        event = 'comment_replies' if target_user == u else event
-                        send([u._id], notification_type, uid, event, user, orig_node, timestamp, **context)
+                    recipients.append(u)
                     node_subscribers.append(u)
+            if recipients and notification_type != 'none':
+                dispatch(recipients, notification_type, uid, event, user, orig_node, timestamp, **context)
 
         return check_parent(node.parent_id, event, node_subscribers, user, orig_node, timestamp, **context)
 
     return node_subscribers
 
 
+def dispatch(recipients, notification_type, uid, event, user, node, timestamp, **context):
+    """Send a notification to ``recipients`` with one call to `send` per
+    event; the author of the comment replied to, if subscribed, is sent the
+    comment_replies event instead.
+    """
+    target_user = context.get('target_user')
+    recipient_ids = collections.OrderedDict()
+    for recipient in recipients:
+        recipient_event = 'comment_replies' if target_user == recipient else event
+        recipient_ids.setdefault(recipient_event, []).append(recipient._id)
+    for recipient_event, ids in recipient_ids.items():
+        send(ids, notification_type, uid, recipient_event, user, node, timestamp, **context)
+
+
 def send(recipient_ids, notification_type, uid, event, user, node, timestamp, **context):
     """Dispatch to the handler for the provided notification_type"""
 
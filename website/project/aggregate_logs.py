@@ -0,0 +1,364 @@
+# -*- coding: utf-8 -*-
+"""Materialized index of the logs shown in each node's activity feed.
+
+A node's feed contains its own logs and those of its primary descendants.
+Rather than walking the tree and querying log backrefs on every request, one
+document is kept per (feed root, log) pair:
+
+    {
+        '_id': '<root_id>:<log_id>',
+        'root': '<root_id>',
+        'log': '<log_id>',
+        'date': <datetime>,
+        'nodes': ['<node_id>', ...],  # Nodes under `root` whose `logs` contain the log
+    }
+
+Log ids are ObjectId strings, so ordering by `log` matches the order used by
+`Node.get_aggregate_logs_queryset`, and a page can be fetched with a single
+range query on the `(root, log)` index.
+
+Which descendants' logs a user may see is kept in one member document per
+(feed root, descendant) pair, so that a feed is served without walking the
+tree:
+
+    {
+        '_id': '<root_id>:<node_id>',
+        'root': '<root_id>',
+        'node': '<node_id>',
+        'parent': '<parent_id>',
+        'path': ['<node_id>', '<parent_id>', ...],  # Up to, excluding, `root`
+        'is_public': <bool>,
+        'readers': ['<user_id>', ...],
+        'admins': ['<user_id>', ...],
+    }
+
+The index is kept in sync by `Node.save`: components that are deleted or
+moved away are removed from the feeds of their former ancestors. Run
+`scripts/migrate_aggregate_logs.py` to backfill it.
+"""
+
+import logging
+
+from framework.mongo import database
+from framework.mongo.utils import bulk_insert_or_merge
+
+
+logger = logging.getLogger(__name__)
+
+COLLECTION_NAME = 'aggregatelogs'
+MEMBER_COLLECTION_NAME = 'aggregatelogmembers'
+
+# Changes to these node fields change who may see the node's logs
+MEMBER_FIELDS = frozenset(['is_public', 'contributors', 'permissions'])
+
+
+def get_collection(db=None):
+    return (db or database)[COLLECTION_NAME]
+
+
+def get_member_collection(db=None):
+    return (db or database)[MEMBER_COLLECTION_NAME]
+
+
+def ensure_indices(db=None):
+    collection = get_collection(db)
+    collection.ensure_index([('root', 1), ('log', -1)])
+    collection.ensure_index([('nodes', 1), ('root', 1)])
+    members = get_member_collection(db)
+    members.ensure_index([('root', 1), ('parent', 1)])
+    members.ensure_index([('node', 1), ('parent', 1)])
+
+
+def _entry_id(root_id, log_id):
+    return '{0}:{1}'.format(root_id, log_id)
+
+
+def _get_log_dates(log_ids, db=None):
+    cursor = (db or database)['nodelog'].find(
+        {'_id': {'$in': list(log_ids)}},
+        {'date': 1},
+    )
+    return dict((each['_id'], each.get('date')) for each in cursor)
+
+
+def _write_entries(entries, db=None):
+    bulk_insert_or_merge(get_collection(db), entries, 'nodes')
+
+
+def _build_entries(root_ids, node_id, log_ids, dates):
+    return [
+        {
+            '_id': _entry_id(root_id, log_id),
+            'root': root_id,
+            'log': log_id,
+            'date': dates.get(log_id),
+            'nodes': [node_id],
+        }
+        for root_id in root_ids
+        for log_id in log_ids
+    ]
+
+
+def index_logs(root_ids, node_id, log_ids, db=None):
+    """Add logs belonging to a node to the feeds of `root_ids`.
+
+    :param list root_ids: The node's id followed by the ids of its ancestors
+    :param str node_id: Node whose `logs` contain the logs
+    :param list log_ids: Log primary keys
+    """
+    if not log_ids:
+        return
+    dates = _get_log_dates(log_ids, db=db)
+    _write_entries(_build_entries(root_ids, node_id, log_ids, dates), db=db)
+
+
+def unindex_logs(root_ids, node_id, log_ids, db=None):
+    """Remove logs no longer belonging to a node from the feeds of `root_ids`.
+    """
+    if not log_ids:
+        return
+    collection = get_collection(db)
+    collection.update(
+        {'root': {'$in': list(root_ids)}, 'log': {'$in': list(log_ids)}},
+        {'$pull': {'nodes': node_id}},
+        multi=True,
+    )
+    collection.remove({'root': {'$in': list(root_ids)}, 'nodes': {'$size': 0}})
+
+
+def get_root_ids(node):
+    return [node._id] + [parent._id for parent in node.parents]
+
+
+def _get_visibility(node):
+    return {
+        'is_public': node.is_public,
+        'readers': [
+            user_id for user_id, perms in node.permissions.iteritems()
+            if 'read' in perms
+        ],
+        'admins': [
+            user_id for user_id, perms in node.permissions.iteritems()
+            if 'admin' in perms
+        ],
+    }
+
+
+def _build_members(node_root_ids, node):
+    """Build the member documents of a node in the feeds of its ancestors.
+
+    :param list node_root_ids: The node's id followed by the ids of the
+        ancestors whose feeds it is part of
+    """
+    visibility = _get_visibility(node)
+    return [
+        dict(
+            visibility,
+            _id=_entry_id(root_id, node._id),
+            root=root_id,
+            node=node._id,
+            parent=node_root_ids[1],
+            path=node_root_ids[:position],
+        )
+        for position, root_id in enumerate(node_root_ids)
+        if position
+    ]
+
+
+def _write_members(members, db=None):
+    collection = get_member_collection(db)
+    for member in members:
+        collection.save(member)
+
+
+def sync_member(node, db=None):
+    """Update who may see the logs of `node` in the feeds of its ancestors."""
+    get_member_collection(db).update(
+        {'node': node._id},
+        {'$set': _get_visibility(node)},
+        multi=True,
+    )
+
+
+def sync_node(node, appended=None, db=None):
+    """Bring the index in line with `node.logs` for the node's own feed and
+    the feeds of its ancestors.
+
+    :param Node node: Node whose `logs` changed
+    :param list appended: Ids of logs known to have been appended since the
+        last sync; if these account for every change, only they are written
+    :return: Tuple of (ids of logs added, ids of logs removed)
+    """
+    collection = get_collection(db)
+    # A deleted node is no longer part of its ancestors' feeds
+    root_ids = [node._id] if node.is_deleted else get_root_ids(node)
+    current = node.logs._to_primary_keys()
+    query = {'root': node._id, 'nodes': node._id}
+
+    if appended:
+        appended = [log_id for log_id in appended if log_id in current]
+        if collection.find(query).count() + len(appended) == len(current):
+            index_logs(root_ids, node._id, appended, db=db)
+            return appended, []
+
+    indexed = set(each['log'] for each in collection.find(query, {'log': 1}))
+    added = [log_id for log_id in current if log_id not in indexed]
+    removed = list(indexed - set(current))
+    index_logs(root_ids, node._id, added, db=db)
+    unindex_logs(root_ids, node._id, removed, db=db)
+    return added, removed
+
+
+def _collect_subtree_entries(node, root_ids, dates_for, entries, members):
+    node_root_ids = [node._id] + root_ids
+    log_ids = node.logs._to_primary_keys()
+    entries.extend(_build_entries(node_root_ids, node._id, log_ids, dates_for(log_ids)))
+    members.extend(_build_members(node_root_ids, node))
+    for child in node.nodes_primary:
+        if not child.is_deleted:
+            _collect_subtree_entries(child, node_root_ids, dates_for, entries, members)
+
+
+def index_subtree(node, root_ids=None, db=None):
+    """Index the logs of `node` and its primary descendants, both in their own
+    feeds and in the feeds of `root_ids`.
+
+    :param Node node: Top of the subtree
+    :param list root_ids: Ids of ancestors of `node`; defaults to its current
+        parents
+    """
+    if root_ids is None:
+        root_ids = get_root_ids(node)[1:]
+    entries = []
+    members = []
+    _collect_subtree_entries(
+        node, list(root_ids),
+        lambda log_ids: _get_log_dates(log_ids, db=db),
+        entries, members,
+    )
+    _write_entries(entries, db=db)
+    _write_members(members, db=db)
+
+
+def unindex_subtree(node_id, parent_id=None, db=None):
+    """Remove the logs of a node and its descendants from the feeds of the
+    node's ancestors, e.g. after it is deleted or moved.
+
+    :param str parent_id: Only remove them from the feeds the node is part
+        of as a child of this node; feeds it was since added to through a new
+        parent are kept
+    """
+    members = get_member_collection(db)
+    query = {'node': node_id}
+    if parent_id is not None:
+        query['parent'] = parent_id
+    root_ids = [each['root'] for each in members.find(query, {'root': 1})]
+    if not root_ids:
+        return
+    node_ids = [node_id] + [
+        each['node'] for each in members.find({'root': node_id}, {'node': 1})
+    ]
+    collection = get_collection(db)
+    collection.update(
+        {'root': {'$in': root_ids}, 'nodes': {'$in': node_ids}},
+        {'$pullAll': {'nodes': node_ids}},
+        multi=True,
+    )
+    collection.remove({'root': {'$in': root_ids}, 'nodes': {'$size': 0}})
+    members.remove({'root': {'$in': root_ids}, 'node': {'$in': node_ids}})
+
+
+def sync_children(node, db=None):
+    """Bring the feeds of `node` and its ancestors in line with its primary
+    children: index the subtrees of children that are not yet part of its
+    feed, e.g. after a component is created, forked or registered under it,
+    and unindex those of children that were removed from it.
+    """
+    root_ids = get_root_ids(node)
+    indexed = set(
+        each['node'] for each in get_member_collection(db).find(
+            {'root': node._id, 'parent': node._id}, {'node': 1},
+        )
+    )
+    children = [child for child in node.nodes_primary if not child.is_deleted]
+    for child in children:
+        if child._id not in indexed:
+            index_subtree(child, root_ids=root_ids, db=db)
+    for child_id in indexed - set(child._id for child in children):
+        unindex_subtree(child_id, parent_id=node._id, db=db)
+
+
+def _get_link_node_ids(private_key, db=None):
+    cursor = (db or database)['privatelink'].find(
+        {'key': private_key, 'is_deleted': False},
+        {'nodes': 1},
+    )
+    return set(node_id for each in cursor for node_id in each.get('nodes', []))
+
+
+def get_visible_node_ids(root_id, user_id=None, private_key=None, admin=False, db=None):
+    """Return the ids of `root_id` and of the descendants in its feed whose
+    logs a user may see, mirroring `Node.can_view`.
+
+    :param str user_id: Id of the user, or `None` if logged out
+    :param str private_key: Key of the view-only link used, if any
+    :param bool admin: The user is an admin of the root or of one of its
+        ancestors
+    :return: Tuple of (list of node ids, whether the user may see the whole
+        feed)
+    """
+    members = list(get_member_collection(db).find(
+        {'root': root_id},
+        {'node': 1, 'path': 1, 'is_public': 1, 'readers': 1, 'admins': 1},
+    ))
+    link_node_ids = _get_link_node_ids(private_key, db=db) if private_key else set()
+    admin_of = set(
+        each['node'] for each in members
+        if user_id is not None and user_id in each['admins']
+    )
+    visible = [
+        each['node'] for each in members
+        if (
+            each['is_public'] or
+            user_id in each['readers'] or
+            each['node'] in link_node_ids or
+            admin or
+            not admin_of.isdisjoint(each['path'])
+        )
+    ]
+    return [root_id] + visible, len(visible) == len(members)
+
+
+def _feed_query(root_id, node_ids, before=None):
+    query = {'root': root_id}
+    if node_ids is not None:
+        query['nodes'] = {'$in': list(node_ids)}
+    if before:
+        query['log'] = {'$lt': before}
+    return query
+
+
+def count_logs(root_id, node_ids=None, db=None):
+    """Count the logs in the feed of `root_id`, each once, optionally only
+    those that belong to `node_ids`. Without `node_ids` the count is answered
+    from the `(root, log)` index alone.
+    """
+    return get_collection(db).find(_feed_query(root_id, node_ids)).count()
+
+
+def find_log_ids(root_id, node_ids, limit, skip=0, before=None, db=None):
+    """Return ids of the most recent logs in the feed of `root_id` that belong
+    to `node_ids`, or to any node if `None`, newest first.
+
+    :param int limit: Maximum number of ids to return
+    :param int skip: Number of ids to skip, for offset pagination
+    :param str before: Return only logs older than this log id, for keyset
+        pagination
+    """
+    cursor = get_collection(db).find(
+        _feed_query(root_id, node_ids, before=before),
+        {'log': 1},
+    ).sort('log', -1)
+    if skip:
+        cursor = cursor.skip(skip)
+    return [each['log'] for each in cursor.limit(limit)]
@@ -0,0 +1,214 @@
+# -*- coding: utf-8 -*-
+"""Per-user projection of the nodes shown by the dashboard's project
+organizer.
+
+Rather than loading a user's whole `node__contributed` backref and computing
+parents, retraction and embargo flags and permissions node by node on every
+request, one row is kept per (user, node) pair for every node the user
+contributes to that is not deleted:
+
+    {
+        '_id': '<user_id>:<node_id>',
+        'user': '<user_id>',
+        'node': '<node_id>',
+        'title': '<title>',
+        'category': '<category>',
+        'parent': '<parent_id>',  # Or None
+        'ancestors': ['<parent_id>', '<grandparent_id>', ...],
+        'created': <datetime>,
+        'is_registration': <bool>,
+        'is_folder': <bool>,
+        'is_dashboard': <bool>,
+        'is_retracted': <bool>,
+        'pending_embargo': <bool>,
+        'permission': '<reduced permission of the user>',
+    }
+
+Rows are kept in sync by `Node.save` when a node's contributors, permissions,
+title or state change, and by `Retraction.save` and `Embargo.save` when a
+sanction's state changes. Run `scripts/migrate_dashboard_rows.py` to rebuild
+the projection.
+"""
+
+import logging
+
+from modularodm import Q
+
+from framework.mongo import database
+
+from website.util import permissions
+
+
+logger = logging.getLogger(__name__)
+
+COLLECTION_NAME = 'dashboardrows'
+
+# Changes to these node fields change the node's rows
+NODE_FIELDS = frozenset([
+    'contributors', 'permissions', 'title', 'category', 'is_deleted',
+    'is_registration', 'is_folder', 'is_dashboard',
+])
+
+# Retraction and embargo flags are inherited, so changes to these node fields
+# change the rows of the node's descendants too
+TREE_FIELDS = frozenset(['retraction', 'embargo'])
+
+
+def get_collection(db=None):
+    return (db or database)[COLLECTION_NAME]
+
+
+def ensure_indices(db=None):
+    collection = get_collection(db)
+    collection.ensure_index([('user', 1), ('title', -1)])
+    collection.ensure_index([('user', 1), ('created', 1)])
+    collection.ensure_index('node')
+    collection.ensure_index('ancestors')
+
+
+def _entry_id(user_id, node_id):
+    return '{0}:{1}'.format(user_id, node_id)
+
+
+def _build_row(node):
+    return {
+        'node': node._id,
+        'title': node.title,
+        'category': node.category,
+        'parent': node.parent_id,
+        'ancestors': [each._id for each in node.parents],
+        'created': node.date_created,
+        'is_registration': node.is_registration,
+        'is_folder': node.is_folder,
+        'is_dashboard': node.is_dashboard,
+        'is_retracted': node.is_retracted,
+        'pending_embargo': node.pending_embargo,
+    }
+
+
+def _build_entry(node, user_id, row):
+    perms = node.permissions.get(user_id)
+    return dict(
+        row,
+        _id=_entry_id(user_id, node._id),
+        user=user_id,
+        permission=permissions.reduce_permissions(perms) if perms else None,
+    )
+
+
+def sync_node(node, db=None):
+    """Bring the rows of ``node`` in line with its contributors and state.
+
+    :return list: Ids of the users with a row for the node
+    """
+    collection = get_collection(db)
+    if node.is_deleted:
+        user_ids = []
+    else:
+        user_ids = node.contributors._to_primary_keys()
+    collection.remove({'node': node._id, 'user': {'$nin': user_ids}})
+    if user_ids:
+        row = _build_row(node)
+        for user_id in user_ids:
+            collection.save(_build_entry(node, user_id, row))
+    return user_ids
+
+
+def sync_tree(node, db=None):
+    """Sync the rows of ``node`` and of its primary descendants."""
+    sync_node(node, db=db)
+    for descendant in node.get_descendants_recursive(lambda each: each.primary):
+        sync_node(descendant, db=db)
+
+
+def sync_new_children(node, db=None):
+    """Sync the subtrees of primary children of ``node`` whose rows do not
+    name it as their parent yet, e.g. after a component is created, forked or
+    registered under it.
+    """
+    collection = get_collection(db)
+    for child in node.nodes_primary:
+        entry = collection.find_one({'node': child._id}, {'parent': 1})
+        if entry is None and child.is_deleted:
+            continue
+        if entry is not None and entry['parent'] == node._id:
+            continue
+        sync_tree(child, db=db)
+
+
+def sync_sanction(field, sanction, db=None):
+    """Sync the rows of the registrations under a retraction or embargo.
+
+    :param str field: ``'retraction'`` or ``'embargo'``
+    """
+    from website.models import Node
+    for registration in Node.find(Q(field, 'eq', sanction)):
+        sync_tree(registration, db=db)
+
+
+def _find(user_id, query, fields, sort, db=None):
+    query = dict(query, user=user_id)
+    return list(get_collection(db).find(query, fields).sort(sort))
+
+
+def get_project_ids(user_id, db=None):
+    """Return ids of the top-level projects and components of a user's "All
+    my projects" smart folder, ordered by title, descending. A node is at the
+    top level unless the user also contributes to its parent.
+    """
+    entries = _find(
+        user_id,
+        {'is_registration': False, 'is_folder': False},
+        {'node': 1, 'parent': 1},
+        [('title', -1)],
+        db=db,
+    )
+    keys = set(each['node'] for each in entries)
+    return [each['node'] for each in entries if each['parent'] not in keys]
+
+
+def get_registration_ids(user_id, db=None):
+    """Return ids of the top-level registrations of a user's "All my
+    registrations" smart folder, ordered by title, descending. Retracted
+    registrations and registrations pending embargo approval are excluded; a
+    registration is at the top level unless the user also contributes to any
+    of its ancestors.
+    """
+    entries = _find(
+        user_id,
+        {
+            'is_registration': True,
+            'is_folder': False,
+            'is_retracted': False,
+            'pending_embargo': False,
+        },
+        {'node': 1, 'ancestors': 1},
+        [('title', -1)],
+        db=db,
+    )
+    keys = set(each['node'] for each in entries)
+    return [each['node'] for each in entries if keys.isdisjoint(each['ancestors'])]
+
+
+def get_node_ids(user_id, components=True, permission=None, db=None):
+    """Return ids of the projects, then the components, a user contributes
+    to, excluding registrations, oldest first.
+
+    :param bool components: Include components
+    :param str permission: Include only nodes the user has this permission on
+    """
+    query = {'is_registration': False}
+    if not components:
+        query['category'] = 'project'
+    if permission is not None:
+        query['permission'] = {'$in': [
+            each for each in permissions.PERMISSIONS
+            if permission in permissions.expand_permissions(each)
+        ]}
+    entries = _find(user_id, query, {'node': 1, 'category': 1, 'is_folder': 1}, [('created', 1)], db=db)
+    projects = [
+        each['node'] for each in entries
+        if each['category'] == 'project' and not each['is_folder']
+    ]
+    components = [each['node'] for each in entries if each['category'] != 'project']
+    return projects + components
@@ -26,6 +26,7 @@ from framework.mongo import StoredObject
 from framework.addons import AddonModelMixin
 from framework.auth import get_user, User, Auth
 from framework.auth import signals as auth_signals
+from framework.auth import watched_logs
 from framework.exceptions import PermissionsError
 from framework.guid.model import GuidStoredObject
 from framework.auth.utils import privacy_info_handle
@@ -41,6 +42,9 @@ from framework.utils import iso8601format
 from website import language, settings, security
 from website.util import web_url_for
 from website.util import api_url_for
+from website.util import hgrid_cache
+from website.util import waterbutler_auth_cache
+from website.project import permission_resolver
 from website.exceptions import (
     NodeStateError, InvalidRetractionApprovalToken,
     InvalidRetractionDisapprovalToken, InvalidEmbargoApprovalToken,
@@ -53,6 +57,9 @@ from website.util.permissions import CREATOR_PERMISSIONS
 from website.project.metadata.schemas import OSF_META_SCHEMAS
 from website.util.permissions import DEFAULT_CONTRIBUTOR_PERMISSIONS
 from website.project import signals as project_signals
+from website.project import aggregate_logs
+from website.project import dashboard_rows
+from website.conferences import submissions as conference_submissions
 
 html_parser = HTMLParser()
 
@@ -398,11 +405,19 @@ class NodeLog(StoredObject):
         return False
 
     def _render_log_contributor(self, contributor, anonymous=False):
-        user = User.load(contributor)
+        return self.render_contributor(User.load(contributor), self.node, anonymous=anonymous)
+
+    @staticmethod
+    def render_contributor(user, node, anonymous=False):
+        """Serialize a contributor named in a log of ``node``.
+
+        :param User user: Contributor, or `None` if not found
+        :param Node node: Node the log refers to, or `None`
+        """
         if not user:
             return None
-        if self.node:
-            fullname = user.display_full_name(node=self.node)
+        if node:
+            fullname = user.display_full_name(node=node)
         else:
             fullname = user.fullname
         return {
@@ -750,6 +765,9 @@ class Node(GuidStoredObject, AddonModelMixin, IdentifierMixin):
                 yield contrib
 
     def is_admin_parent(self, user):
+        resolver = permission_resolver.get_resolver()
+        if resolver is not None and user is not None:
+            return resolver.is_admin_parent(self, user)
         if self.has_permission(user, 'admin', check_parent=False):
             return True
         if self.parent_node:
@@ -822,6 +840,7 @@ class Node(GuidStoredObject, AddonModelMixin, IdentifierMixin):
             if permission in self.permissions[user._id]:
                 raise ValueError('User already has permission {0}'.format(permission))
             self.permissions[user._id].append(permission)
+        permission_resolver.clear()
         if save:
             self.save()
 
@@ -837,6 +856,7 @@ class Node(GuidStoredObject, AddonModelMixin, IdentifierMixin):
             self.permissions[user._id].remove(permission)
         except (KeyError, ValueError):
             raise ValueError('User does not have permission {0}'.format(permission))
+        permission_resolver.clear()
         if save:
             self.save()
 
@@ -855,11 +875,13 @@ class Node(GuidStoredObject, AddonModelMixin, IdentifierMixin):
                     user._id, self._id,
                 )
             )
+        permission_resolver.clear()
         if save:
             self.save()
 
     def set_permissions(self, user, permissions, save=False):
         self.permissions[user._id] = permissions
+        permission_resolver.clear()
         if save:
             self.save()
 
@@ -883,6 +905,9 @@ class Node(GuidStoredObject, AddonModelMixin, IdentifierMixin):
         """Checks if the given user has read permissions on any child nodes
             that are not registrations or deleted
         """
+        resolver = permission_resolver.get_resolver()
+        if resolver is not None and user is not None:
+            return resolver.can_read_children(self, user)
         if self.has_permission(user, 'read'):
             return True
 
@@ -1069,6 +1094,40 @@ class Node(GuidStoredObject, AddonModelMixin, IdentifierMixin):
 
         saved_fields = super(Node, self).save(*args, **kwargs)
 
+        # Keep the activity feed index in sync with `logs` and `nodes`
+        if 'logs' in saved_fields:
+            added, removed = aggregate_logs.sync_node(
+                self, appended=getattr(self, '_unindexed_log_ids', None)
+            )
+            watched_logs.fan_out(self._id, added)
+            watched_logs.retract(self._id, removed)
+        self._unindexed_log_ids = []
+        if 'nodes' in saved_fields:
+            aggregate_logs.sync_children(self)
+        if 'is_deleted' in saved_fields and not first_save:
+            if self.is_deleted:
+                aggregate_logs.unindex_subtree(self._id)
+            else:
+                aggregate_logs.index_subtree(self)
+        if aggregate_logs.MEMBER_FIELDS.intersection(saved_fields):
+            aggregate_logs.sync_member(self)
+        if hgrid_cache.NODE_FIELDS.intersection(saved_fields):
+            hgrid_cache.invalidate(self._id)
+        if waterbutler_auth_cache.NODE_FIELDS.intersection(saved_fields):
+            waterbutler_auth_cache.invalidate(node_id=self._id)
+        if permission_resolver.NODE_FIELDS.intersection(saved_fields):
+            permission_resolver.clear()
+        # Untagged nodes are never submissions, unless their tags were just removed
+        if conference_submissions.NODE_FIELDS.intersection(saved_fields) and \
+                (self.tags or 'tags' in saved_fields):
+            conference_submissions.sync_node(self)
+        if dashboard_rows.TREE_FIELDS.intersection(saved_fields):
+            dashboard_rows.sync_tree(self)
+        elif dashboard_rows.NODE_FIELDS.intersection(saved_fields):
+            dashboard_rows.sync_node(self)
+        if 'nodes' in saved_fields:
+            dashboard_rows.sync_new_children(self)
+
         if first_save and is_original and not suppress_log:
             # TODO: This logic also exists in self.use_as_template()
             for addon in settings.ADDONS_AVAILABLE:
@@ -1344,13 +1403,51 @@ class Node(GuidStoredObject, AddonModelMixin, IdentifierMixin):
                     if include(descendant):
                         yield descendant
 
+    def get_aggregate_log_node_ids(self, auth):
+        """Return ids of this node and the descendants whose logs ``auth``
+        may see in this node's activity feed. Deleted components are left out,
+        as they are removed from the feeds of their ancestors.
+        """
+        return [self._id] + [n._id
+                             for n in self.get_descendants_recursive(lambda n: not (n.primary and n.is_deleted))
+                             if n.can_view(auth)]
+
     def get_aggregate_logs_queryset(self, auth):
-        ids = [self._id] + [n._id
-                            for n in self.get_descendants_recursive()
-                            if n.can_view(auth)]
+        ids = self.get_aggregate_log_node_ids(auth)
         query = Q('__backrefs.logged.node.logs', 'in', ids)
         return NodeLog.find(query).sort('-_id')
 
+    def get_aggregate_logs(self, auth, count, page=0, before=None):
+        """Return a page of this node's activity feed, newest first, using
+        the materialized index in `website.project.aggregate_logs`.
+
+        :param Auth auth: Consolidated authorization
+        :param int count: Page size
+        :param int page: Page number; ignored if ``before`` is given
+        :param str before: Return logs older than this log id
+        :return: Tuple of (list of `NodeLog`, total number of logs in the feed)
+        """
+        user = auth.user if auth else None
+        ids, complete = aggregate_logs.get_visible_node_ids(
+            self._id,
+            user_id=user._id if user else None,
+            private_key=auth.private_key if auth else None,
+            admin=user is not None and self.is_admin_parent(user),
+        )
+        if complete:
+            ids = None
+        total = aggregate_logs.count_logs(self._id, ids)
+        log_ids = aggregate_logs.find_log_ids(
+            self._id, ids, count,
+            skip=0 if before else page * count,
+            before=before,
+        )
+        logs = {
+            log._id: log
+            for log in NodeLog.find(Q('_id', 'in', log_ids))
+        }
+        return [logs[log_id] for log_id in log_ids if log_id in logs], total
+
     @property
     def nodes_pointer(self):
         return [
@@ -1818,6 +1915,9 @@ class Node(GuidStoredObject, AddonModelMixin, IdentifierMixin):
             log.date = log_date
         log.save()
         self.logs.append(log)
+        if not hasattr(self, '_unindexed_log_ids'):
+            self._unindexed_log_ids = []
+        self._unindexed_log_ids.append(log._id)
         if save:
             self.save()
         if user:
@@ -2457,6 +2557,7 @@ class Node(GuidStoredObject, AddonModelMixin, IdentifierMixin):
         :param content: A string, the posted content.
         :param auth: All the auth information including user, API key.
         """
+        from website.addons.wiki import render_cache
         from website.addons.wiki.model import NodeWikiPage
 
         name = (name or '').strip()
@@ -2472,6 +2573,8 @@ class Node(GuidStoredObject, AddonModelMixin, IdentifierMixin):
             current.is_current = False
             version = current.version + 1
             current.save()
+            # Only current versions are rendered routinely
+            render_cache.invalidate([current._id])
 
         new_page = NodeWikiPage(
             page_name=name,
@@ -2514,6 +2617,7 @@ class Node(GuidStoredObject, AddonModelMixin, IdentifierMixin):
 
         """
         # TODO: Fix circular imports
+        from website.addons.wiki import render_cache
         from website.addons.wiki.exceptions import (
             PageCannotRenameError,
             PageConflictError,
@@ -2540,6 +2644,7 @@ class Node(GuidStoredObject, AddonModelMixin, IdentifierMixin):
         # rename the page first in case we hit a validation exception.
         old_name = page.page_name
         page.rename(new_name)
+        render_cache.invalidate(self.wiki_pages_versions.get(key, []))
 
         # TODO: merge historical records like update (prevents log breaks)
         # transfer the old page versions/current keys to the new name.
@@ -2780,7 +2885,7 @@ def validate_visible_contributors(schema, instance):
 class WatchConfig(StoredObject):
 
     _id = fields.StringField(primary=True, default=lambda: str(ObjectId()))
-    node = fields.ForeignField('Node', backref='watched')
+    node = fields.ForeignField('Node', backref='watched', index=True)
     digest = fields.BooleanField(default=False)
     immediate = fields.BooleanField(default=False)
 
@@ -2865,6 +2970,12 @@ class Retraction(StoredObject):
             self._id
         )
 
+    def save(self, *args, **kwargs):
+        saved_fields = super(Retraction, self).save(*args, **kwargs)
+        if 'state' in saved_fields:
+            dashboard_rows.sync_sanction('retraction', self)
+        return saved_fields
+
     @property
     def is_retracted(self):
         return self.state == self.RETRACTED
@@ -2980,6 +3091,12 @@ class Embargo(StoredObject):
             self._id
         )
 
+    def save(self, *args, **kwargs):
+        saved_fields = super(Embargo, self).save(*args, **kwargs)
+        if 'state' in saved_fields:
+            dashboard_rows.sync_sanction('embargo', self)
+        return saved_fields
+
     @property
     def embargo_end_date(self):
         if self.state == Embargo.ACTIVE:
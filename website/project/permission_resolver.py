@@ -0,0 +1,108 @@
+# -*- coding: utf-8 -*-
+"""Request-scoped memoization of inherited node permissions.
+
+Admins of a node may read all of its descendants, so `Node.is_admin_parent`
+and `Node.can_read_children` walk the tree on every call. Views that check
+every node of a tree (summaries, dashboards, activity feeds) repeat the same
+walks for each node. During a request, a `PermissionResolver` attached to
+``g`` remembers each node's parent and the per-user results, so each node of
+a tree is visited at most once per user.
+
+Results are dropped whenever a node's permissions, contributors, components
+or deletion state are saved, or its permissions are changed through the
+`Node` permission methods. Outside of a request no resolver is attached and
+the `Node` methods compute permissions directly.
+"""
+
+from flask import g
+
+
+# Changes to these node fields clear the resolver
+NODE_FIELDS = frozenset(['permissions', 'contributors', 'nodes', 'is_deleted'])
+
+
+class PermissionResolver(object):
+
+    def __init__(self):
+        self.clear()
+
+    def clear(self):
+        self._parents = {}
+        self._admin_parent = {}
+        self._read_children = {}
+
+    def get_parent(self, node):
+        try:
+            return self._parents[node._id]
+        except KeyError:
+            parent = self._parents[node._id] = node.parent_node
+            return parent
+
+    def is_admin_parent(self, node, user):
+        """Equivalent to `Node.is_admin_parent`, memoized for every node
+        on the path to the root.
+        """
+        key = user._id
+        chain = []
+        current = node
+        result = False
+        while current is not None:
+            cached = self._admin_parent.get((current._id, key))
+            if cached is not None:
+                result = cached
+                break
+            chain.append(current)
+            if current.has_permission(user, 'admin', check_parent=False):
+                result = True
+                break
+            current = self.get_parent(current)
+        # Every node visited shares the answer of the node the walk stopped at
+        for each in chain:
+            self._admin_parent[(each._id, key)] = result
+        return result
+
+    def can_read_children(self, node, user):
+        """Equivalent to `Node.can_read_children`, memoized per node."""
+        key = (node._id, user._id)
+        try:
+            return self._read_children[key]
+        except KeyError:
+            pass
+        result = node.has_permission(user, 'read') or any(
+            self.can_read_children(child, user)
+            for child in node.nodes
+            if child.primary and not child.is_deleted
+        )
+        self._read_children[key] = result
+        return result
+
+
+def get_resolver():
+    """Return the resolver of the current request, or `None`."""
+    try:
+        return g._permission_resolver
+    except (AttributeError, RuntimeError):
+        return None
+
+
+def clear():
+    resolver = get_resolver()
+    if resolver is not None:
+        resolver.clear()
+
+
+def resolver_before_request():
+    g._permission_resolver = PermissionResolver()
+
+
+def resolver_teardown_request(error=None):
+    try:
+        del g._permission_resolver
+    except AttributeError:
+        pass
+
+
+handlers = {
+    'before_request': resolver_before_request,
+    'teardown_request': resolver_teardown_request,
+}
@@ -23,4 +23,5 @@ def grid_data(auth, node, **kwargs):
     """View that returns the formatted data for rubeus.js/hgrid
     """
     data = request.args.to_dict()
-    return {'data': rubeus.to_hgrid(node, auth, **data)}
+    children_only = bool(data.pop('children', None))
+    return {'data': rubeus.to_hgrid(node, auth, children_only=children_only, **data)}
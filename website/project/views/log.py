@@ -10,7 +10,7 @@ from framework.auth.decorators import collect_auth
 from framework.transactions.handlers import no_auto_transaction
 
 
-from website.views import serialize_log, validate_page_num
+from website.views import serialize_log, serialize_logs, validate_page_num
 from website.project.model import NodeLog
 from website.project.model import has_anonymous_link
 from website.project.decorators import must_be_valid_project
@@ -31,27 +31,24 @@ def get_log(auth, log_id):
     return {'log': serialize_log(log, auth=auth)}
 
 
-def _get_logs(node, count, auth, page=0):
+def _get_logs(node, count, auth, page=0, before=None):
     """
 
     :param Node node:
     :param int count:
     :param auth:
+    :param str before: If given, return logs older than this log id instead
+        of the logs on page ``page``
     :return list: List of serialized logs,
             boolean: if there are more logs
 
     """
-    logs_set = node.get_aggregate_logs_queryset(auth)
-    total = logs_set.count()
+    logs_page, total = node.get_aggregate_logs(auth, count, page=page, before=before)
     pages = math.ceil(total / float(count))
     validate_page_num(page, pages)
 
-    start = page * count
-    stop = start + count
-    logs = [
-        serialize_log(log, auth=auth, anonymous=has_anonymous_link(node, auth))
-        for log in logs_set[start:stop]
-    ]
+    anonymous = has_anonymous_link(node, auth)
+    logs = serialize_logs(logs_page, auth=auth, anonymous=anonymous)
 
     return logs, total, pages
 
@@ -83,5 +80,12 @@ def get_logs(auth, node, **kwargs):
 
     # Serialize up to `count` logs in reverse chronological order; skip
     # logs that the current user / API key cannot access
-    logs, total, pages = _get_logs(node, count, auth, page)
-    return {'logs': logs, 'total': total, 'pages': pages, 'page': page}
+    before = request.args.get('before')
+    logs, total, pages = _get_logs(node, count, auth, page, before=before)
+    return {
+        'logs': logs,
+        'total': total,
+        'pages': pages,
+        'page': page,
+        'next': logs[-1]['id'] if len(logs) == count else None,
+    }
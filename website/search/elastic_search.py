@@ -227,12 +227,14 @@ def get_doctype_from_node(node):
         return node.category
 
 
-@requires_search
-def update_node(node, index=None):
-    index = index or INDEX
-    from website.addons.wiki.model import NodeWikiPage
+def serialize_node(node, category):
+    """Build the elasticsearch document for a public node.
 
-    category = get_doctype_from_node(node)
+    :param Node node: Node to serialize
+    :param str category: Document type, from `get_doctype_from_node`
+    :return: Document dict, or `None` for orphaned components
+    """
+    from website.addons.wiki.model import NodeWikiPage
 
     if category == 'project':
         elastic_document_id = node._id
@@ -243,53 +245,121 @@ def update_node(node, index=None):
             parent_id = node.parent_id
         except IndexError:
             # Skip orphaned components
-            return
-    if node.is_deleted or not node.is_public or node.archiving:
-        delete_doc(elastic_document_id, node)
-    else:
-        try:
-            normalized_title = six.u(node.title)
-        except TypeError:
-            normalized_title = node.title
-        normalized_title = unicodedata.normalize('NFKD', normalized_title).encode('ascii', 'ignore')
-
-        elastic_document = {
-            'id': elastic_document_id,
-            'contributors': [
-                {
-                    'fullname': x.fullname,
-                    'url': x.profile_url if x.is_active else None
-                }
-                for x in node.visible_contributors
-                if x is not None
-            ],
-            'title': node.title,
-            'normalized_title': normalized_title,
-            'category': category,
-            'public': node.is_public,
-            'tags': [tag._id for tag in node.tags if tag],
-            'description': node.description,
-            'url': node.url,
-            'is_registration': node.is_registration,
-            'is_retracted': node.is_retracted,
-            'pending_retraction': node.pending_retraction,
-            'embargo_end_date': node.embargo_end_date.strftime("%A, %b. %d, %Y") if node.embargo_end_date else False,
-            'pending_embargo': node.pending_embargo,
-            'registered_date': node.registered_date,
-            'wikis': {},
-            'parent_id': parent_id,
-            'date_created': node.date_created,
-            'boost': int(not node.is_registration) + 1,  # This is for making registered projects less relevant
+            return None
+
+    try:
+        normalized_title = six.u(node.title)
+    except TypeError:
+        normalized_title = node.title
+    normalized_title = unicodedata.normalize('NFKD', normalized_title).encode('ascii', 'ignore')
+
+    elastic_document = {
+        'id': elastic_document_id,
+        'contributors': [
+            {
+                'fullname': x.fullname,
+                'url': x.profile_url if x.is_active else None
+            }
+            for x in node.visible_contributors
+            if x is not None
+        ],
+        'title': node.title,
+        'normalized_title': normalized_title,
+        'category': category,
+        'public': node.is_public,
+        'tags': [tag._id for tag in node.tags if tag],
+        'description': node.description,
+        'url': node.url,
+        'is_registration': node.is_registration,
+        'is_retracted': node.is_retracted,
+        'pending_retraction': node.pending_retraction,
+        'embargo_end_date': node.embargo_end_date.strftime("%A, %b. %d, %Y") if node.embargo_end_date else False,
+        'pending_embargo': node.pending_embargo,
+        'registered_date': node.registered_date,
+        'wikis': {},
+        'parent_id': parent_id,
+        'date_created': node.date_created,
+        'boost': int(not node.is_registration) + 1,  # This is for making registered projects less relevant
+    }
+
+    if not node.is_retracted:
+        for wiki in [
+            NodeWikiPage.load(x)
+            for x in node.wiki_pages_current.values()
+        ]:
+            elastic_document['wikis'][wiki.page_name] = wiki.raw_text(node)
+
+    return elastic_document
+
+
+def should_delete_node(node):
+    return node.is_deleted or not node.is_public or node.archiving
+
+
+@requires_search
+def update_node(node, index=None):
+    index = index or INDEX
+
+    if should_delete_node(node):
+        delete_doc(node._id, node)
+        return
+
+    category = get_doctype_from_node(node)
+    elastic_document = serialize_node(node, category)
+    if elastic_document is not None:
+        es.index(index=index, doc_type=category, id=node._id, body=elastic_document,
+                 refresh=settings.ELASTIC_REFRESH_ON_WRITE)
+
+
+def node_bulk_action(node, index=None):
+    """Return the bulk helper action that brings the search document for
+    ``node`` up to date, or `None` if there is nothing to do.
+    """
+    index = index or INDEX
+    if should_delete_node(node):
+        return {
+            '_op_type': 'delete',
+            '_index': index,
+            '_type': 'registration' if node.is_registration else node.project_or_component,
+            '_id': node._id,
         }
+    category = get_doctype_from_node(node)
+    elastic_document = serialize_node(node, category)
+    if elastic_document is None:
+        return None
+    return {
+        '_op_type': 'index',
+        '_index': index,
+        '_type': category,
+        '_id': node._id,
+        '_source': elastic_document,
+    }
 
-        if not node.is_retracted:
-            for wiki in [
-                NodeWikiPage.load(x)
-                for x in node.wiki_pages_current.values()
-            ]:
-                elastic_document['wikis'][wiki.page_name] = wiki.raw_text(node)
 
-        es.index(index=index, doc_type=category, id=elastic_document_id, body=elastic_document, refresh=True)
+@requires_search
+def bulk_update_nodes(nodes, index=None):
+    """Index or delete the documents for ``nodes`` using bulk requests.
+
+    :return: Tuple of (number of documents written, list of failed actions)
+    """
+    index = index or INDEX
+    actions = (
+        action for action in
+        (node_bulk_action(node, index=index) for node in nodes)
+        if action is not None
+    )
+    written, errors = helpers.bulk(
+        es, actions,
+        chunk_size=settings.ELASTIC_BULK_SIZE,
+        raise_on_error=False,
+        refresh=settings.ELASTIC_REFRESH_ON_WRITE,
+    )
+    # Deleting a document that was never indexed is not an error
+    errors = [
+        error for error in errors
+        if error.get('delete', {}).get('status') != 404
+    ]
+    return written, errors
 
 
 def bulk_update_contributors(nodes, index=INDEX):
@@ -320,16 +390,8 @@ def bulk_update_contributors(nodes, index=INDEX):
     return helpers.bulk(es, actions)
 
 
-@requires_search
-def update_user(user, index=None):
-    index = index or INDEX
-    if not user.is_active:
-        try:
-            es.delete(index=index, doc_type='user', id=user._id, refresh=True, ignore=[404])
-        except NotFoundError:
-            pass
-        return
-
+def serialize_user(user):
+    """Build the elasticsearch document for an active user."""
     names = dict(
         fullname=user.fullname,
         given_name=user.given_name,
@@ -347,7 +409,7 @@ def update_user(user, index=None):
                 pass  # This is fine, will only happen in 2.x if val is already unicode
             normalized_names[key] = unicodedata.normalize('NFKD', val).encode('ascii', 'ignore')
 
-    user_doc = {
+    return {
         'id': user._id,
         'user': user.fullname,
         'normalized_user': normalized_names['fullname'],
@@ -364,7 +426,41 @@ def update_user(user, index=None):
         'boost': 2,  # TODO(fabianvf): Probably should make this a constant or something
     }
 
-    es.index(index=index, doc_type='user', body=user_doc, id=user._id, refresh=True)
+
+@requires_search
+def update_user(user, index=None):
+    index = index or INDEX
+    if not user.is_active:
+        try:
+            es.delete(index=index, doc_type='user', id=user._id,
+                      refresh=settings.ELASTIC_REFRESH_ON_WRITE, ignore=[404])
+        except NotFoundError:
+            pass
+        return
+
+    es.index(index=index, doc_type='user', body=serialize_user(user), id=user._id,
+             refresh=settings.ELASTIC_REFRESH_ON_WRITE)
+
+
+def user_bulk_action(user, index=None):
+    """Return the bulk helper action that brings the search document for
+    ``user`` up to date.
+    """
+    index = index or INDEX
+    if not user.is_active:
+        return {
+            '_op_type': 'delete',
+            '_index': index,
+            '_type': 'user',
+            '_id': user._id,
+        }
+    return {
+        '_op_type': 'index',
+        '_index': index,
+        '_type': 'user',
+        '_id': user._id,
+        '_source': serialize_user(user),
+    }
 
 
 @requires_search
@@ -422,7 +518,8 @@ def create_index(index=None):
 def delete_doc(elastic_document_id, node, index=None, category=None):
     index = index or INDEX
     category = category or 'registration' if node.is_registration else node.project_or_component
-    es.delete(index=index, doc_type=category, id=elastic_document_id, refresh=True, ignore=[404])
+    es.delete(index=index, doc_type=category, id=elastic_document_id,
+              refresh=settings.ELASTIC_REFRESH_ON_WRITE, ignore=[404])
 
 
 @requires_search
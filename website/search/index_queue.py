@@ -0,0 +1,178 @@
+# -*- coding: utf-8 -*-
+"""Coalescing queue for node search updates.
+
+`Node.save` used to rebuild and index a node's search document, forcing a
+segment refresh, inside the request. Instead, `enqueue_node` records the node
+id in the ``searchqueue`` collection and schedules `flush_queue_task`
+``ELASTIC_QUEUE_WINDOW`` seconds later; further saves of the same node inside
+that window only bump its pending entry. The flush indexes every pending node
+with the bulk helper and no forced refresh.
+
+Pending entries are kept in MongoDB rather than in process memory so that
+coalescing works across web workers, and so updates survive a worker restart.
+"""
+
+import time
+import logging
+import datetime
+
+from modularodm import Q
+
+from framework.mongo import database
+from framework.sentry import log_exception
+from framework.tasks import app
+from framework.tasks.handlers import enqueue_task
+
+from website import settings
+
+
+logger = logging.getLogger(__name__)
+
+COLLECTION_NAME = 'searchqueue'
+STATS_COLLECTION_NAME = 'searchqueuestats'
+STATS_ID = 'nodes'
+
+
+def get_collection(db=None):
+    return (db or database)[COLLECTION_NAME]
+
+
+def get_stats_collection(db=None):
+    return (db or database)[STATS_COLLECTION_NAME]
+
+
+def enqueue_node(node_id, db=None):
+    """Mark a node as needing reindexing, scheduling a flush if none is
+    pending.
+
+    Stats are deliberately not updated here: this runs inside request
+    transactions, and a single hot counter document would cause lock
+    conflicts between concurrent requests.
+    """
+    now = datetime.datetime.utcnow()
+    previous = get_collection(db).find_and_modify(
+        {'_id': node_id},
+        {
+            '$setOnInsert': {'enqueued': now},
+            '$set': {'updated': now},
+            '$inc': {'updates': 1},
+        },
+        upsert=True,
+        new=False,
+    )
+    # Reschedule if the flush for an old entry appears to have been lost
+    stale_after = datetime.timedelta(seconds=settings.ELASTIC_QUEUE_WINDOW * 10)
+    if previous is None or now - previous['enqueued'] > stale_after:
+        schedule_flush()
+
+
+def schedule_flush():
+    enqueue_task(flush_queue_task.si().set(countdown=settings.ELASTIC_QUEUE_WINDOW))
+
+
+def _claim(limit, db=None):
+    """Remove and return up to ``limit`` of the oldest pending entries.
+    Entries are removed before indexing so that saves made during the flush
+    queue the node again rather than being lost.
+    """
+    collection = get_collection(db)
+    entries = list(collection.find().sort('enqueued', 1).limit(limit))
+    if entries:
+        collection.remove({'_id': {'$in': [entry['_id'] for entry in entries]}})
+    return entries
+
+
+def _requeue(entries, db=None):
+    collection = get_collection(db)
+    for entry in entries:
+        collection.update(
+            {'_id': entry['_id']},
+            {
+                '$setOnInsert': {'enqueued': entry['enqueued']},
+                '$set': {'updated': entry['updated']},
+                '$inc': {'updates': entry.get('updates', 1)},
+            },
+            upsert=True,
+        )
+
+
+def _record_flush(entries, written, failed, duration, db=None):
+    updates = sum(entry.get('updates', 1) for entry in entries)
+    get_stats_collection(db).update(
+        {'_id': STATS_ID},
+        {
+            '$inc': {
+                'flushes': 1,
+                'enqueued': updates,
+                'coalesced': updates - len(entries),
+                'indexed': written,
+                'failed': failed,
+            },
+            '$set': {
+                'last_flush': datetime.datetime.utcnow(),
+                'last_flush_duration': duration,
+                'last_flush_rate': written / duration if duration else None,
+            },
+        },
+        upsert=True,
+    )
+
+
+def flush(db=None):
+    """Index every pending node in batches of ``ELASTIC_BULK_SIZE``.
+
+    :return: Number of documents written
+    """
+    # Avoid circular imports
+    from website.models import Node
+    from website.search import search
+
+    total = 0
+    while True:
+        entries = _claim(settings.ELASTIC_BULK_SIZE, db=db)
+        if not entries:
+            return total
+        start = time.time()
+        nodes = Node.find(Q('_id', 'in', [entry['_id'] for entry in entries]))
+        try:
+            written, errors = search.bulk_update_nodes(nodes) or (0, [])
+        except Exception:
+            _requeue(entries, db=db)
+            raise
+        for error in errors:
+            logger.error('Could not index search document: {0!r}'.format(error))
+        _record_flush(entries, written, len(errors), time.time() - start, db=db)
+        total += written
+
+
+@app.task(ignore_result=True)
+def flush_queue_task():
+    # Avoid circular imports
+    from website.search.exceptions import SearchUnavailableError
+    try:
+        flush()
+    except SearchUnavailableError as error:
+        # Pending updates were requeued; the next enqueue will retry
+        logger.exception(error)
+        log_exception()
+
+
+def get_stats(db=None):
+    """Return queue depth, lag and throughput counters.
+
+    ``lag`` is the age in seconds of the oldest pending update; ``coalesced``
+    counts saves that were merged into an already pending update.
+    """
+    collection = get_collection(db)
+    oldest = list(collection.find().sort('enqueued', 1).limit(1))
+    lag = (
+        (datetime.datetime.utcnow() - oldest[0]['enqueued']).total_seconds()
+        if oldest else 0
+    )
+    stats = get_stats_collection(db).find_one({'_id': STATS_ID}) or {}
+    stats.pop('_id', None)
+    stats.update({
+        'pending': collection.count(),
+        'lag': lag,
+    })
+    return stats
@@ -26,9 +26,19 @@ def search(query, index=None, doc_type=None):
 
 @requires_search
 def update_node(node, index=None):
+    if index is None and settings.ELASTIC_QUEUE_UPDATES:
+        # Avoid circular imports
+        from website.search import index_queue
+        index_queue.enqueue_node(node._id)
+        return
     index = index or settings.ELASTIC_INDEX
     search_engine.update_node(node, index=index)
 
+@requires_search
+def bulk_update_nodes(nodes, index=None):
+    index = index or settings.ELASTIC_INDEX
+    return search_engine.bulk_update_nodes(nodes, index=index)
+
 @requires_search
 def delete_node(node, index=None):
     index = index or settings.ELASTIC_INDEX
@@ -1,80 +1,296 @@
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
-'''Migration script for Search-enabled Models.'''
+'''Migration script for Search-enabled Models.
+
+Records are streamed from MongoDB in key order, in batches of
+``ELASTIC_BULK_SIZE``. Their documents are built by a pool of
+``ELASTIC_REINDEX_WORKERS`` processes and sent to the new index with bulk
+requests. Documents that fail to index are resent, and recorded in the
+checkpoint if they still fail, to be resent by the next run. Progress is
+checkpointed after every batch, so that an interrupted migration resumes
+where it stopped when run again. The alias is only moved to the new index
+once it holds every document sent to it and none are left failed.
+'''
 from __future__ import absolute_import
+from __future__ import division
 
+import time
 import logging
+import itertools
+import multiprocessing
+from collections import OrderedDict
 
 from elasticsearch import helpers
 from modularodm.query.querydialect import DefaultQueryDialect as Q
 
 from website import settings
 from framework.auth import User
+from framework.mongo import database, StoredObject
 from website.models import Node
 from website.app import init_app
 import website.search.search as search
 from scripts import utils as script_utils
+from website.search import elastic_search
 from website.search.elastic_search import es
 
 
 logger = logging.getLogger(__name__)
 
-def migrate_nodes(index):
-    logger.info("Migrating nodes to index: {}".format(index))
-    n_iter = 0
-    nodes = Node.find(Q('is_public', 'eq', True) & Q('is_deleted', 'eq', False))
-    for node in nodes:
-        search.update_node(node, index=index)
-        n_iter += 1
+CHECKPOINT_COLLECTION = 'searchmigration'
+
+# Documents migrated for each kind, as raw MongoDB queries
+SOURCES = OrderedDict([
+    ('node', (Node, {'is_public': True, 'is_deleted': False})),
+    ('user', (User, {})),
+])
+
+BULK_ACTIONS = {
+    'node': elastic_search.node_bulk_action,
+    'user': elastic_search.user_bulk_action,
+}
+
+
+class CountMismatchError(Exception):
+    """Raised when the new index does not hold every document sent to it, or
+    documents failed to index.
+    """
+
+
+def get_checkpoints(db=None):
+    return (db or database)[CHECKPOINT_COLLECTION]
+
+
+def load_checkpoint(index):
+    """Return the progress of the migration to ``index``, recorded by
+    `save_checkpoint`.
+    """
+    checkpoint = get_checkpoints().find_one({'_id': index}) or {}
+    checkpoint.setdefault('last', {})
+    checkpoint.setdefault('expected', {})
+    checkpoint.setdefault('failed', {})
+    return checkpoint
+
+
+def save_checkpoint(index, kind, last_id, expected, failed=(), resent=()):
+    """Record that every document of ``kind`` up to ``last_id`` was sent to
+    ``index``, ``expected`` more of which should now be indexed.
+
+    :param failed: Keys of the documents that failed to index
+    :param resent: Keys of previously failed documents that were indexed
+    """
+    update = {'$inc': {'expected.{0}'.format(kind): expected}}
+    if last_id is not None:
+        update['$set'] = {'last.{0}'.format(kind): last_id}
+    if failed:
+        update['$addToSet'] = {'failed.{0}'.format(kind): {'$each': list(failed)}}
+    if resent:
+        update['$pullAll'] = {'failed.{0}'.format(kind): list(resent)}
+    get_checkpoints().update({'_id': index}, update, upsert=True)
+
+
+def clear_checkpoint(index):
+    get_checkpoints().remove({'_id': index})
+
+
+def iter_batches(kind, after=None, batch_size=None):
+    """Stream the primary keys of the records of ``kind`` in key order, in
+    lists of ``batch_size``.
+
+    :param str after: Only yield keys greater than this one
+    """
+    model, query = SOURCES[kind]
+    batch_size = batch_size or settings.ELASTIC_BULK_SIZE
+    query = dict(query)
+    if after is not None:
+        query['_id'] = {'$gt': after}
+    cursor = model._storage[0].store.find(
+        query, fields=['_id'],
+    ).sort('_id', 1).batch_size(batch_size)
+    batch = []
+    for record in cursor:
+        batch.append(record['_id'])
+        if len(batch) == batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
 
-    logger.info('Nodes migrated: {}'.format(n_iter))
 
+def build_actions(args):
+    """Build the bulk index actions for a batch of records. Runs in the
+    worker processes, where building node documents, wiki text extraction
+    in particular, is spread over all cores.
 
-def migrate_users(index):
-    logger.info("Migrating users to index: {}".format(index))
-    n_migr = 0
-    n_iter = 0
-    for user in User.find():
-        if user.is_active:
-            search.update_user(user, index=index)
-            n_migr += 1
-        n_iter += 1
+    :param tuple args: Kind, list of keys and name of the index
+    :return: Tuple of the last key of the batch and the list of actions
+    """
+    kind, keys, index = args
+    model = SOURCES[kind][0]
+    try:
+        actions = []
+        for record in model.find(Q('_id', 'in', keys)):
+            action = BULK_ACTIONS[kind](record, index=index)
+            # A new index has no stale documents to delete
+            if action is not None and action['_op_type'] == 'index':
+                actions.append(action)
+        return keys[-1], actions
+    finally:
+        # Keep the memory of long-lived workers bounded
+        StoredObject._clear_caches()
 
-    logger.info('Users iterated: {0}\nUsers migrated: {1}'.format(n_iter, n_migr))
 
+def send_actions(kind, actions, client):
+    """Send bulk index actions, resending those that fail up to
+    ``ELASTIC_REINDEX_RETRIES`` times.
 
-def migrate(delete, index=None, app=None):
+    :return: Keys of the documents that could not be indexed
+    """
+    for attempt in range(settings.ELASTIC_REINDEX_RETRIES + 1):
+        _, errors = helpers.bulk(
+            client, actions,
+            chunk_size=settings.ELASTIC_BULK_SIZE,
+            raise_on_error=False,
+        )
+        failed = set()
+        for error in errors:
+            logger.error('Could not index {0}: {1}'.format(kind, error))
+            failed.add(error.values()[0]['_id'])
+        actions = [action for action in actions if action['_id'] in failed]
+        if not actions:
+            break
+    return [action['_id'] for action in actions]
+
+
+def resend_failed(kind, index, checkpoint, client=None):
+    """Send the documents of ``kind`` that failed to index in a previous run
+    again.
+    """
+    keys = checkpoint['failed'].get(kind)
+    if not keys:
+        return
+    logger.info('Resending {0} {1}s that failed to index'.format(len(keys), kind))
+    client = client or elastic_search.es
+    for start in range(0, len(keys), settings.ELASTIC_BULK_SIZE):
+        batch = keys[start:start + settings.ELASTIC_BULK_SIZE]
+        _, actions = build_actions((kind, batch, index))
+        failed = send_actions(kind, actions, client)
+        # Records that are no longer searchable are not expected either
+        resent = set(batch) - set(failed)
+        save_checkpoint(
+            index, kind, None, len(actions) - len(failed),
+            resent=resent,
+        )
+
+
+def migrate_kind(kind, index, checkpoint, pool=None, client=None):
+    """Index the documents of ``kind`` into ``index``, resuming after the
+    last batch recorded in ``checkpoint``.
+
+    Batches are built by ``pool`` while previous batches are sent to
+    elasticsearch, in order, so that the checkpoint only advances past
+    batches that were sent. Documents that still fail after retries are
+    recorded in the checkpoint and resent first by the next run.
+    """
+    client = client or elastic_search.es
+    resend_failed(kind, index, checkpoint, client=client)
+    after = checkpoint['last'].get(kind)
+    if after is not None:
+        logger.info('Resuming {0} migration after {1}'.format(kind, after))
+    tasks = (
+        (kind, keys, index)
+        for keys in iter_batches(kind, after=after)
+    )
+    results = pool.imap(build_actions, tasks) if pool else itertools.imap(build_actions, tasks)
+
+    start = time.time()
+    sent = failed = 0
+    for last_id, actions in results:
+        errors = send_actions(kind, actions, client)
+        save_checkpoint(index, kind, last_id, len(actions) - len(errors), failed=errors)
+        sent += len(actions)
+        failed += len(errors)
+        logger.info('{0}: {1} documents sent ({2:.1f}/s), {3} failed'.format(
+            kind, sent, sent / max(time.time() - start, 0.001), failed,
+        ))
+    logger.info('{0}s migrated: {1}'.format(kind.capitalize(), sent))
+
+
+def verify_counts(index, checkpoint, client=None):
+    """Check that ``index`` holds every document recorded in
+    ``checkpoint``.
+
+    :raises: `CountMismatchError` if documents are missing or unexpected, or
+        failed to index
+    """
+    failed = sum(len(keys) for keys in checkpoint['failed'].values())
+    if failed:
+        raise CountMismatchError(
+            '{0} documents failed to index into {1}; run the migration again '
+            'to resend them'.format(failed, index)
+        )
+    client = client or elastic_search.es
+    client.indices.refresh(index=index)
+    expected = sum(checkpoint['expected'].values())
+    indexed = client.count(index=index)['count']
+    if indexed != expected:
+        raise CountMismatchError(
+            '{0} holds {1} documents, expected {2}; not switching the alias'.format(
+                index, indexed, expected,
+            )
+        )
+    logger.info('{0} holds all {1} documents'.format(index, indexed))
+
+
+def reindex(index, workers=None, client=None):
+    """Index every searchable record into ``index``, resuming an
+    interrupted run into the same index.
+
+    :param int workers: Number of processes building documents; defaults to
+        ``ELASTIC_REINDEX_WORKERS``. With one worker, documents are built in
+        this process.
+    """
+    workers = workers or settings.ELASTIC_REINDEX_WORKERS
+    pool = multiprocessing.Pool(workers) if workers > 1 else None
+    try:
+        for kind in SOURCES:
+            migrate_kind(kind, index, load_checkpoint(index), pool=pool, client=client)
+    finally:
+        if pool is not None:
+            pool.terminate()
+            pool.join()
+    verify_counts(index, load_checkpoint(index), client=client)
+
+
+def migrate(delete, index=None, app=None, workers=None):
     index = index or settings.ELASTIC_INDEX
     app = app or init_app("website.settings", set_backends=True, routes=True)
 
     script_utils.add_file_logger(logger, __file__)
     ctx = app.test_request_context()
     ctx.push()
-    new_index = set_up_index(index)
+    try:
+        new_index = set_up_index(index)
 
-    migrate_nodes(new_index)
-    migrate_users(new_index)
+        reindex(new_index, workers=workers)
 
-    set_up_alias(index, new_index)
+        set_up_alias(index, new_index)
+        clear_checkpoint(new_index)
 
-    if delete:
-        delete_old(new_index)
-
-    ctx.pop()
+        if delete:
+            delete_old(new_index)
+    finally:
+        ctx.pop()
 
 
 def set_up_index(idx):
     alias = es.indices.get_aliases(index=idx)
 
     if not alias or not alias.keys() or idx in alias.keys():
-        # Deal with empty indices or the first migration
+        # Deal with empty indices or the first migration. The old index is
+        # replaced by the alias once the new one is verified
         index = '{}_v1'.format(idx)
         search.create_index(index=index)
-        logger.info("Reindexing {0} to {1}_v1".format(idx, idx))
-        helpers.reindex(es, idx, index)
-        logger.info("Deleting {} index".format(idx))
-        es.indices.delete(index=idx)
-        es.indices.put_alias(idx, index)
+        logger.info("{} index created".format(index))
     else:
         # Increment version
         version = int(alias.keys()[0].split('_v')[1]) + 1
@@ -87,7 +303,11 @@ def set_up_index(idx):
 
 def set_up_alias(old_index, index):
     alias = es.indices.get_aliases(index=old_index)
-    if alias:
+    if old_index in alias:
+        # First migration: the alias takes the place of the old index
+        logger.info("Deleting {} index".format(old_index))
+        es.indices.delete(index=old_index)
+    elif alias:
         logger.info("Removing old aliases to {}".format(old_index))
         es.indices.delete_alias(index=old_index, name='_all', ignore=404)
     logger.info("Creating new alias from {0} to {1}".format(old_index, index))
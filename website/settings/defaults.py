@@ -65,6 +65,20 @@ SEARCH_ENGINE = 'elastic'  # Can be 'elastic', or None
 ELASTIC_URI = 'localhost:9200'
 ELASTIC_TIMEOUT = 10
 ELASTIC_INDEX = 'website'
+# Queue node search updates and send them to elasticsearch in coalesced bulk
+# requests, instead of indexing synchronously on every save
+ELASTIC_QUEUE_UPDATES = True
+# Seconds to wait for further saves of a node before indexing it
+ELASTIC_QUEUE_WINDOW = 5
+# Maximum number of documents per bulk request
+ELASTIC_BULK_SIZE = 500
+# Processes building documents during a full reindex
+ELASTIC_REINDEX_WORKERS = 4
+# Times a full reindex resends documents that failed to index
+ELASTIC_REINDEX_RETRIES = 2
+# Refresh the index after every write so changes are searchable immediately.
+# Expensive; only meant for tests.
+ELASTIC_REFRESH_ON_WRITE = False
 SHARE_ELASTIC_URI = ELASTIC_URI
 SHARE_ELASTIC_INDEX = 'share'
 # For old indices
@@ -74,6 +88,16 @@ SHARE_ELASTIC_INDEX_TEMPLATE = 'share_v{}'
 # TODO: Override SECRET_KEY in local.py in production
 COOKIE_NAME = 'osf'
 SECRET_KEY = 'CHANGEME'
+# Seconds after their last write that sessions expire
+SESSION_TTL = 60 * 60 * 24 * 30
+# Minimum seconds between writes of unchanged sessions to refresh their expiry
+SESSION_TOUCH_INTERVAL = 60 * 60
+# Cache of loaded sessions: None, 'memory' (single-process deployments only)
+# or 'redis'
+SESSION_CACHE_BACKEND = None
+SESSION_CACHE_SIZE = 10000
+SESSION_CACHE_TTL = 60 * 5
+SESSION_REDIS_URL = 'redis://localhost:6379/0'
 
 # TODO: Remove after migration to OSF Storage
 COPY_GIT_REPOS = False
@@ -90,6 +114,15 @@ SUPPORT_EMAIL = 'support@osf.io'
 MAIL_SERVER = 'smtp.sendgrid.net'
 MAIL_USERNAME = 'osf-smtp'
 MAIL_PASSWORD = ''  # Set this in local.py
+# Keep SMTP sessions open between messages; a session is replaced after
+# sending SMTP_MAX_MESSAGES messages or being idle for SMTP_IDLE_TIMEOUT seconds
+SMTP_POOL = True
+SMTP_MAX_MESSAGES = 100
+SMTP_IDLE_TIMEOUT = 60
+# Users whose email digests are sent together by scripts/send_digest.py, and
+# threads rendering and sending each batch
+DIGEST_BATCH_SIZE = 100
+DIGEST_SEND_WORKERS = 4
 
 # Mandrill
 MANDRILL_USERNAME = None
@@ -125,6 +158,13 @@ DB_PORT = os_env.get('OSF_DB_PORT', 27017)
 DB_NAME = 'osf20130903'
 DB_USER = None
 DB_PASS = None
+# Share one pooled MongoClient per worker process instead of connecting and
+# authenticating on every request
+DB_POOL = True
+# Maximum number of idle sockets kept open by each worker's pool
+DB_POOL_SIZE = 100
+# Seconds between liveness pings of the pooled client
+DB_POOL_HEALTH_CHECK_INTERVAL = 30
 
 # Cache settings
 SESSION_HISTORY_LENGTH = 5
@@ -189,6 +229,8 @@ CELERY_IMPORTS = (
     'framework.email.tasks',
     'framework.analytics.tasks',
     'website.mailchimp_utils',
+    'website.search.index_queue',
+    'website.addons.osfstorage.bulk_copy',
     'scripts.send_digest'
 )
 
@@ -243,6 +285,48 @@ MAX_MOST_IN_COMMON_LENGTH = 15
 
 # Google Analytics
 GOOGLE_ANALYTICS_ID = None
+
+# HTTP client for third-party add-on APIs; see website.addons.base.http_client
+# Response cache: None, 'memory', 'file' or 'redis'
+ADDON_HTTP_CACHE_BACKEND = 'memory'
+# Maximum size of the in-process response cache
+ADDON_HTTP_CACHE_MAX_BYTES = 32 * 1024 * 1024
+# Seconds cached responses are kept, even if they are still fresh or can be
+# revalidated
+ADDON_HTTP_CACHE_TTL = 60 * 60 * 24
+ADDON_HTTP_CACHE_DIR = '/tmp/addon_http_cache'
+ADDON_HTTP_CACHE_REDIS_URL = 'redis://localhost:6379/1'
+# Connection pools kept per provider, and connections kept per pool
+ADDON_HTTP_POOL_CONNECTIONS = 10
+ADDON_HTTP_POOL_MAXSIZE = 10
+
+# Cache the citations in folders of citation manager accounts. Cached folders
+# are checked for changes after CITATION_CACHE_FRESH seconds, and dropped if
+# unused for CITATION_CACHE_TTL seconds
+CITATION_CACHE = True
+CITATION_CACHE_FRESH = 60
+CITATION_CACHE_TTL = 60 * 60 * 24 * 30
+
+# Cache add-on file trees shown in the Files grid, for at most
+# HGRID_CACHE_TTL seconds
+HGRID_CACHE = True
+HGRID_CACHE_TTL = 300
+
+# Buffer page counter increments in each process and write them together from
+# a background thread, every ANALYTICS_FLUSH_INTERVAL seconds or once
+# ANALYTICS_FLUSH_SIZE pages have pending increments
+ANALYTICS_BUFFER_COUNTERS = True
+ANALYTICS_FLUSH_INTERVAL = 30
+ANALYTICS_FLUSH_SIZE = 1000
+# Serve counters read in bulk, e.g. the download counts of file listings, from
+# an in-process cache of at most ANALYTICS_COUNTER_CACHE_SIZE pages for
+# ANALYTICS_COUNTER_CACHE_TTL seconds; set the TTL to 0 to disable
+ANALYTICS_COUNTER_CACHE_TTL = 10
+ANALYTICS_COUNTER_CACHE_SIZE = 10000
+# Size in bits of the per-session filters of visited pages used for unique
+# counts. Sessions keep an exact set of page digests, 16 bytes each, until it
+# would reach this size
+ANALYTICS_VISITED_FILTER_BITS = 8192
 GOOGLE_SITE_VERIFICATION = None
 
 # Pingdom
@@ -252,6 +336,20 @@ DEFAULT_HMAC_SECRET = 'changeme'
 DEFAULT_HMAC_ALGORITHM = hashlib.sha256
 WATERBUTLER_URL = 'http://localhost:7777'
 WATERBUTLER_ADDRS = ['127.0.0.1']
+# Cache the responses to WaterButler's authorization requests for at most
+# WATERBUTLER_AUTH_CACHE_TTL seconds
+WATERBUTLER_AUTH_CACHE = True
+WATERBUTLER_AUTH_CACHE_TTL = 60
+# Cache the file metadata fetched from WaterButler for file views. Entries are
+# fresh for the provider's TTL in seconds and served while being refetched in
+# the background until they are WATERBUTLER_METADATA_CACHE_STALE_TTL seconds
+# old
+WATERBUTLER_METADATA_CACHE = True
+WATERBUTLER_METADATA_CACHE_TTL = {
+    'default': 60,
+    'osfstorage': 300,
+}
+WATERBUTLER_METADATA_CACHE_STALE_TTL = 3600
 
 # Test identifier namespaces
 DOI_NAMESPACE = 'doi:10.5072/FK2'
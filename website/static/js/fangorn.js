@@ -1014,7 +1014,8 @@ function _fangornResolveLazyLoad(item) {
     }
 
     if (item.data.provider === undefined) {
-        return false;
+        // Components are expanded from the grid data endpoint
+        return (item.data.urls && item.data.urls.fetch) || false;
     }
     return waterbutler.buildTreeBeardMetadata(item);
 }
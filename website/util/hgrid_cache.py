@@ -0,0 +1,106 @@
+# -*- coding: utf-8 -*-
+"""Cache of the add-on file trees shown in the Files grid.
+
+`rubeus.NodeFileCollector` calls every add-on's `get_hgrid_data`, which for
+third-party add-ons means requests to external APIs on every load of the Files
+tab. The serialized add-on roots of each node are cached per permission level:
+
+    {
+        '_id': '<node_id>:<level>:<args hash>',
+        'node': '<node_id>',
+        'data': '<JSON-encoded list of add-on roots>',
+        'created': <datetime>,
+    }
+
+Entries are dropped when the node's add-on settings, permissions, components
+or logs change, and expire after ``HGRID_CACHE_TTL`` seconds to pick up
+changes made directly on third-party services.
+"""
+
+import json
+import hashlib
+import logging
+import datetime
+
+from framework.mongo import database
+from framework.mongo.utils import save_cache_entry
+
+from website import settings
+
+
+logger = logging.getLogger(__name__)
+
+COLLECTION_NAME = 'hgridcache'
+
+# Changes to these node fields invalidate cached entries
+NODE_FIELDS = frozenset([
+    'contributors', 'permissions', 'is_public', 'is_deleted', 'nodes', 'logs',
+])
+
+
+def get_collection(db=None):
+    return (db or database)[COLLECTION_NAME]
+
+
+def ensure_indices(db=None):
+    collection = get_collection(db)
+    collection.ensure_index('node')
+    collection.ensure_index('created', expireAfterSeconds=settings.HGRID_CACHE_TTL)
+
+
+def get_level(node, auth):
+    """Return the cache level for a user viewing a node, or `None` if the
+    result should not be cached.
+    """
+    if auth.private_key:
+        return None
+    user = auth.user
+    if user is None:
+        return 'public'
+    permissions = node.get_permissions(user)
+    level = next(
+        (each for each in ('admin', 'write', 'read') if each in permissions),
+        'public',
+    )
+    if 'high_upload_limit' in user.system_tags:
+        level += '+high'
+    return level
+
+
+def _entry_id(node_id, level, extra):
+    # Ignore cache-busting parameters such as jQuery's `_`
+    args = sorted(
+        (key, value) for key, value in extra.items()
+        if not key.startswith('_')
+    )
+    digest = hashlib.sha1(json.dumps(args)).hexdigest()
+    return '{0}:{1}:{2}'.format(node_id, level, digest)
+
+
+def load(node_id, level, extra, db=None):
+    """Return the cached add-on roots for a node, or `None`."""
+    entry = get_collection(db).find_one({'_id': _entry_id(node_id, level, extra)})
+    if entry is None:
+        return None
+    age = datetime.datetime.utcnow() - entry['created']
+    if age > datetime.timedelta(seconds=settings.HGRID_CACHE_TTL):
+        return None
+    return json.loads(entry['data'])
+
+
+def store(node_id, level, extra, data, db=None):
+    try:
+        serialized = json.dumps(data)
+    except TypeError as error:
+        logger.warning('Could not serialize file tree of {0}: {1}'.format(node_id, error))
+        return
+    save_cache_entry(get_collection(db), {
+        '_id': _entry_id(node_id, level, extra),
+        'node': node_id,
+        'data': serialized,
+        'created': datetime.datetime.utcnow(),
+    }, 'file tree of {0}'.format(node_id))
+
+
+def invalidate(node_id, db=None):
+    get_collection(db).remove({'node': node_id})
@@ -9,8 +9,10 @@ from modularodm import Q
 
 from framework.auth.decorators import Auth
 
+from website import settings
 from website.util import paths
 from website.util import sanitize
+from website.util import hgrid_cache
 from website.settings import (
     ALL_MY_PROJECTS_ID, ALL_MY_REGISTRATIONS_ID, ALL_MY_PROJECTS_NAME,
     ALL_MY_REGISTRATIONS_NAME, DISK_SAVING_MODE
@@ -39,15 +41,20 @@ def default_urls(node_api, short_name):
     }
 
 
-def to_hgrid(node, auth, **data):
+def to_hgrid(node, auth, children_only=False, **data):
     """Converts a node into a rubeus grid format
 
     :param Node node: the node to be parsed
     :param Auth auth: the user authorization object
+    :param bool children_only: Return only the children of the node, for
+        expanding a component
     :returns: rubeus-formatted dict
 
     """
-    return NodeFileCollector(node, auth, **data).to_hgrid()
+    collector = NodeFileCollector(node, auth, **data)
+    if children_only:
+        return collector.to_hgrid_children()
+    return collector.to_hgrid()
 
 
 def to_project_hgrid(node, auth, **data):
@@ -420,29 +427,42 @@ class NodeFileCollector(object):
 
     def to_hgrid(self):
         """Return the Rubeus.JS representation of the node's file data, including
-        addons and components
+        addons and components. Components are not expanded; their contents are
+        fetched from `urls.fetch` when opened.
         """
         root = self._serialize_node(self.node)
         return [root]
 
+    def to_hgrid_children(self):
+        """Return the Rubeus.JS representation of the node's addons and
+        components, for lazily expanding the node.
+        """
+        return self._serialize_node(self.node)['children']
+
     def _collect_components(self, node, visited):
         rv = []
         for child in node.nodes:
             if child.resolve()._id not in visited and not child.is_deleted and node.can_view(self.auth):
                 visited.append(child.resolve()._id)
-                rv.append(self._serialize_node(child, visited=visited))
+                rv.append(self._serialize_node(child, visited=visited, expand=False))
         return rv
 
-    def _serialize_node(self, node, visited=None):
+    def _serialize_node(self, node, visited=None, expand=True):
         """Returns the rubeus representation of a node folder.
+
+        :param bool expand: Include the node's addons and components; if
+            false, the node is expanded lazily from `urls.fetch`
         """
         visited = visited or []
         visited.append(node.resolve()._id)
         can_view = node.can_view(auth=self.auth)
-        if can_view:
+        fetch_url = None
+        if can_view and expand:
             children = self._collect_addons(node) + self._collect_components(node, visited)
         else:
             children = []
+            if can_view:
+                fetch_url = node.resolve().api_url_for('grid_data', children=1)
         return {
             # TODO: Remove safe_unescape_html when mako html safe comes in
             'name': u'{0}: {1}'.format(node.project_or_component.capitalize(), sanitize.safe_unescape_html(node.title))
@@ -456,7 +476,7 @@ class NodeFileCollector(object):
             },
             'urls': {
                 'upload': None,
-                'fetch': None,
+                'fetch': fetch_url,
             },
             'children': children,
             'isPointer': not node.primary,
@@ -466,12 +486,19 @@ class NodeFileCollector(object):
         }
 
     def _collect_addons(self, node):
+        level = hgrid_cache.get_level(node, self.auth) if settings.HGRID_CACHE else None
+        if level is not None:
+            cached = hgrid_cache.load(node._id, level, self.extra)
+            if cached is not None:
+                return cached
         rv = []
         for addon in node.get_addons():
             if addon.config.has_hgrid_files:
                 # WARNING: get_hgrid_data can return None if the addon is added but has no credentials.
                 temp = addon.config.get_hgrid_data(addon, self.auth, **self.extra)
                 rv.extend(sort_by_name(temp) or [])
+        if level is not None:
+            hgrid_cache.store(node._id, level, self.extra, rv)
         return rv
 
 
@@ -0,0 +1,150 @@
+# -*- coding: utf-8 -*-
+"""Cache of the grants returned by `get_auth`.
+
+WaterButler calls `get_auth` before every file operation, so a bulk upload
+loads the user and node, checks permissions up the node's ancestors and
+serializes the add-on's settings once per file. Granted responses are cached
+per (node, provider, action, user):
+
+    {
+        '_id': '<node_id>:<provider>:<action>:<user_id>',
+        'nodes': ['<node_id>', '<ancestor_id>', ...],
+        'provider': '<provider>',
+        'user': '<user_id>',  # Or None
+        'grant': '<signed, JSON-encoded response, without credentials>',
+        'created': <datetime>,
+    }
+
+Provider credentials are never cached; `get_auth` serializes them from the
+add-on on every request. Grants are signed with ``SECRET_KEY`` and entries
+that fail verification are ignored. Entries are dropped when the permissions
+of the node or of any of its ancestors change, when the node's add-on
+settings or the settings of the user who authorized it change, and when the
+requesting user is disabled or merged. Entries expire after
+``WATERBUTLER_AUTH_CACHE_TTL`` seconds. Denied requests and requests through
+view-only links are never cached. Hit and miss counters of the current
+process are available from `get_stats`.
+"""
+
+import logging
+import datetime
+
+import itsdangerous
+
+from framework.mongo import database
+from framework.mongo.utils import save_cache_entry
+from framework.utils import Counters, ratio
+
+from website import settings
+
+
+logger = logging.getLogger(__name__)
+
+COLLECTION_NAME = 'waterbutlerauth'
+SALT = 'waterbutler-auth'
+
+# Changes to these node fields invalidate the grants of the node and its
+# descendants
+NODE_FIELDS = frozenset([
+    'contributors', 'permissions', 'is_public', 'is_deleted', 'nodes',
+])
+
+# Changes to these user fields invalidate the grants to the user
+USER_FIELDS = frozenset(['date_disabled', 'merged_by'])
+
+
+class GrantStats(Counters):
+    """Thread-safe cache counters of this process."""
+    FIELDS = ('hits', 'misses', 'invalid', 'invalidations')
+
+    def add_rates(self, counts):
+        counts['hit_rate'] = ratio(counts['hits'], counts['hits'] + counts['misses'])
+
+
+stats = GrantStats()
+
+
+def get_stats():
+    """Return hit, miss and invalidation counts and the hit rate of the
+    current process.
+    """
+    return stats.to_dict()
+
+
+def get_collection(db=None):
+    return (db or database)[COLLECTION_NAME]
+
+
+def ensure_indices(db=None):
+    collection = get_collection(db)
+    collection.ensure_index('nodes')
+    collection.ensure_index('provider')
+    collection.ensure_index('user')
+    collection.ensure_index('created', expireAfterSeconds=settings.WATERBUTLER_AUTH_CACHE_TTL)
+
+
+def _serializer():
+    return itsdangerous.URLSafeSerializer(settings.SECRET_KEY, salt=SALT)
+
+
+def _entry_id(node_id, provider, action, user_id):
+    return '{0}:{1}:{2}:{3}'.format(node_id, provider, action, user_id or '')
+
+
+def load(node_id, provider, action, user_id, db=None):
+    """Return the cached grant of ``action`` on a node's add-on to a user,
+    or `None`.
+
+    :param str user_id: Id of the user, or `None` for anonymous requests
+    """
+    entry = get_collection(db).find_one({'_id': _entry_id(node_id, provider, action, user_id)})
+    if entry is not None:
+        age = datetime.datetime.utcnow() - entry['created']
+        if age <= datetime.timedelta(seconds=settings.WATERBUTLER_AUTH_CACHE_TTL):
+            try:
+                grant = _serializer().loads(entry['grant'])
+            except itsdangerous.BadSignature:
+                logger.warning('Ignoring WaterButler grant with a bad signature: {0}'.format(entry['_id']))
+                stats.increment('invalid')
+            else:
+                stats.increment('hits')
+                return grant
+    stats.increment('misses')
+    return None
+
+
+def store(node, provider, action, user_id, grant, db=None):
+    """Cache a grant of ``action`` on a node's add-on to a user.
+
+    :param dict grant: Response of `get_auth`, without the credentials
+    """
+    nodes = [node._id]
+    parent = node.parent_node
+    while parent:
+        nodes.append(parent._id)
+        parent = parent.parent_node
+    save_cache_entry(get_collection(db), {
+        '_id': _entry_id(node._id, provider, action, user_id),
+        'nodes': nodes,
+        'provider': provider,
+        'user': user_id,
+        'grant': _serializer().dumps(grant),
+        'created': datetime.datetime.utcnow(),
+    }, 'WaterButler grant for {0}'.format(node._id))
+
+
+def invalidate(node_id=None, provider=None, user_id=None, db=None):
+    """Drop the grants of a node and its descendants, optionally only those
+    of a provider, or the grants to a user.
+    """
+    query = {}
+    if node_id is not None:
+        query['nodes'] = node_id
+    if provider is not None:
+        query['provider'] = provider
+    if user_id is not None:
+        query['user'] = user_id
+    if 'nodes' not in query and 'user' not in query:
+        raise ValueError('Either node_id or user_id is required')
+    get_collection(db).remove(query)
+    stats.increment('invalidations')
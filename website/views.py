@@ -9,6 +9,7 @@ from flask import request
 
 from framework import utils
 from framework import sentry
+from framework.auth import watched_logs
 from framework.auth.core import User
 from framework.flask import redirect  # VOL-aware redirect
 from framework.routing import proxy_url
@@ -30,6 +31,7 @@ from website.project import model
 from website.util import web_url_for
 from website.util import permissions
 from website.project import new_dashboard
+from website.project import dashboard_rows
 from website.settings import ALL_MY_PROJECTS_ID
 from website.settings import ALL_MY_REGISTRATIONS_ID
 
@@ -144,39 +146,51 @@ def get_dashboard(auth, nid=None, **kwargs):
     return return_value
 
 
-@must_be_logged_in
-def get_all_projects_smart_folder(auth, **kwargs):
-    # TODO: Unit tests
-    user = auth.user
+def _get_page_args():
+    """Read the optional ``page`` and ``size`` query parameters of the
+    dashboard views.
 
-    contributed = user.node__contributed
-    nodes = contributed.find(
-        Q('is_deleted', 'eq', False) &
-        Q('is_registration', 'eq', False) &
-        Q('is_folder', 'eq', False)
-    ).sort('-title')
+    :return: Tuple of (page, size); size is `None` if not paginated
+    """
+    size = request.args.get('size')
+    try:
+        page = int(request.args.get('page', 0))
+        size = int(size) if size is not None else None
+    except ValueError:
+        raise HTTPError(http.BAD_REQUEST)
+    if page < 0 or (size is not None and size < 1):
+        raise HTTPError(http.BAD_REQUEST)
+    return page, size
 
-    keys = nodes.get_keys()
-    return [rubeus.to_project_root(node, auth, **kwargs) for node in nodes if node.parent_id not in keys]
 
-@must_be_logged_in
-def get_all_registrations_smart_folder(auth, **kwargs):
-    # TODO: Unit tests
-    user = auth.user
-    contributed = user.node__contributed
+def _load_page(node_ids):
+    """Load the nodes of the requested page of ``node_ids`` with one query,
+    preserving their order.
+    """
+    page, size = _get_page_args()
+    if size is not None:
+        node_ids, _ = paginate(node_ids, len(node_ids), page, size)
+        node_ids = list(node_ids)
+    nodes = _load_by_ids(Node, node_ids)
+    return [nodes[each] for each in node_ids if each in nodes]
 
-    nodes = contributed.find(
 
-        Q('is_deleted', 'eq', False) &
-        Q('is_registration', 'eq', True) &
-        Q('is_folder', 'eq', False)
-    ).sort('-title')
+@must_be_logged_in
+def get_all_projects_smart_folder(auth, **kwargs):
+    """Return the top-level nodes of the "All my projects" smart folder. Pass
+    ``page`` and ``size`` query parameters to fetch one page of nodes.
+    """
+    node_ids = dashboard_rows.get_project_ids(auth.user._id)
+    return [rubeus.to_project_root(node, auth, **kwargs) for node in _load_page(node_ids)]
 
-    # Note(hrybacki): is_retracted and pending_embargo are property methods
-    # and cannot be directly queried
-    nodes = filter(lambda node: not node.is_retracted and not node.pending_embargo, nodes)
-    keys = [node._id for node in nodes]
-    return [rubeus.to_project_root(node, auth, **kwargs) for node in nodes if node.ids_above.isdisjoint(keys)]
+@must_be_logged_in
+def get_all_registrations_smart_folder(auth, **kwargs):
+    """Return the top-level registrations of the "All my registrations" smart
+    folder. Pass ``page`` and ``size`` query parameters to fetch one page of
+    registrations.
+    """
+    node_ids = dashboard_rows.get_registration_ids(auth.user._id)
+    return [rubeus.to_project_root(node, auth, **kwargs) for node in _load_page(node_ids)]
 
 @must_be_logged_in
 def get_dashboard_nodes(auth):
@@ -188,31 +202,10 @@ def get_dashboard_nodes(auth):
         parameter forces ALL components to be excluded from the request.
     :param-query permissions: Filter upon projects for which the current user
         has the specified permissions. Examples: 'write', 'admin'
+    :param-query page: Page number
+    :param-query size: Page size; all nodes are returned if not given
     """
-    user = auth.user
-
-    contributed = user.node__contributed  # nodes user contributed to
-
-    nodes = contributed.find(
-        Q('category', 'eq', 'project') &
-        Q('is_deleted', 'eq', False) &
-        Q('is_registration', 'eq', False) &
-        Q('is_folder', 'eq', False)
-    )
-
-    if request.args.get('no_components') not in [True, 'true', 'True', '1', 1]:
-        comps = contributed.find(
-            # components only
-            Q('category', 'ne', 'project') &
-            # exclude deleted nodes
-            Q('is_deleted', 'eq', False) &
-            # exclude registrations
-            Q('is_registration', 'eq', False)
-        )
-    else:
-        comps = []
-
-    nodes = list(nodes) + list(comps)
+    perm = None
     if request.args.get('permissions'):
         perm = request.args['permissions'].strip().lower()
         if perm not in permissions.PERMISSIONS:
@@ -220,10 +213,13 @@ def get_dashboard_nodes(auth):
                 message_short='Invalid query parameter',
                 message_long='{0} is not in {1}'.format(perm, permissions.PERMISSIONS)
             ))
-        response_nodes = [node for node in nodes if node.has_permission(user, permission=perm)]
-    else:
-        response_nodes = nodes
-    return _render_nodes(response_nodes, auth)
+
+    node_ids = dashboard_rows.get_node_ids(
+        auth.user._id,
+        components=request.args.get('no_components') not in [True, 'true', 'True', '1', 1],
+        permission=perm,
+    )
+    return _render_nodes(_load_page(node_ids), auth)
 
 
 @must_be_logged_in
@@ -269,32 +265,94 @@ def watched_logs_get(**kwargs):
             message_long='Invalid value for "size".'
         ))
 
-    total = sum(1 for x in user.get_recent_log_ids())
-    paginated_logs, pages = paginate(user.get_recent_log_ids(), total, page, size)
-    logs = (model.NodeLog.load(id) for id in paginated_logs)
+    before = request.args.get('before')
+    total = user.count_recent_logs()
+    pages = math.ceil(total / float(size))
+    validate_page_num(page, pages)
+    log_ids = watched_logs.find_log_ids(
+        user._id,
+        limit=size,
+        skip=0 if before else page * size,
+        before=before,
+    )
+    logs = {
+        log._id: log
+        for log in model.NodeLog.find(Q('_id', 'in', log_ids))
+    }
 
     return {
-        "logs": [serialize_log(log) for log in logs],
+        "logs": serialize_logs([logs[log_id] for log_id in log_ids if log_id in logs]),
         "total": total,
         "pages": pages,
-        "page": page
+        "page": page,
+        "next": log_ids[-1] if len(log_ids) == size else None,
     }
 
 
 def serialize_log(node_log, auth=None, anonymous=False):
     '''Return a dictionary representation of the log.'''
-    return {
-        'id': str(node_log._primary_key),
-        'user': node_log.user.serialize()
-        if isinstance(node_log.user, User)
-        else {'fullname': node_log.foreign_user},
-        'contributors': [node_log._render_log_contributor(c) for c in node_log.params.get("contributors", [])],
-        'action': node_log.action,
-        'params': sanitize.safe_unescape_html(node_log.params),
-        'date': utils.iso8601format(node_log.date),
-        'node': node_log.node.serialize(auth) if node_log.node else None,
-        'anonymous': anonymous
-    }
+    return serialize_logs([node_log], auth=auth, anonymous=anonymous)[0]
+
+
+def _load_by_ids(schema, ids):
+    # Logs may name contributors that are not user ids
+    ids = [each for each in ids if each and isinstance(each, basestring)]
+    if not ids:
+        return {}
+    return dict(
+        (each._id, each)
+        for each in schema.find(Q('_id', 'in', list(set(ids))))
+    )
+
+
+def serialize_logs(node_logs, auth=None, anonymous=False):
+    """Return dictionary representations of a page of logs. The users and
+    nodes the logs refer to are loaded with one query each, and each node is
+    serialized once.
+    """
+    user_ids = {}
+    node_ids = []
+    for node_log in node_logs:
+        user_ids[node_log._id] = node_log.to_storage().get('user')
+        node_ids.extend([node_log.params.get('node'), node_log.params.get('project')])
+    contributor_ids = [
+        contributor
+        for node_log in node_logs
+        for contributor in node_log.params.get('contributors') or []
+    ]
+    users = _load_by_ids(User, user_ids.values() + contributor_ids)
+    nodes = _load_by_ids(Node, node_ids)
+
+    serialized_nodes = {}
+
+    def serialize_node(node):
+        if node._id not in serialized_nodes:
+            serialized_nodes[node._id] = node.serialize(auth)
+        return serialized_nodes[node._id]
+
+    ret = []
+    for node_log in node_logs:
+        # Same fallback as `NodeLog.node`
+        node = nodes.get(node_log.params.get('node')) or nodes.get(node_log.params.get('project'))
+        user = users.get(user_ids[node_log._id])
+        ret.append({
+            'id': str(node_log._primary_key),
+            'user': user.serialize()
+            if user is not None
+            else {'fullname': node_log.foreign_user},
+            'contributors': [
+                model.NodeLog.render_contributor(
+                    users.get(c) if isinstance(c, basestring) else None, node
+                )
+                for c in node_log.params.get('contributors') or []
+            ],
+            'action': node_log.action,
+            'params': sanitize.safe_unescape_html(node_log.params),
+            'date': utils.iso8601format(node_log.date),
+            'node': serialize_node(node) if node else None,
+            'anonymous': anonymous
+        })
+    return ret
 
 
 def reproducibility():